@@ -14,6 +14,8 @@ from dotenv import load_dotenv
 # Importar módulos do projeto
 from ai_principal.pdf_extraction.main import process_pdf_file as extract_pdf
 from ai_principal.pdf_extraction.main import process_directory as extract_directory
+from ai_principal.pdf_extraction.extraction_cache import ExtractionCache
+from ai_principal.pdf_extraction.excel_reference import ExcelReferenceProcessor
 from ai_principal.rag_preprocessing.processor import RAGProcessor
 from ai_principal.rag_preprocessing.supabase_indexer import SupabaseIndexer
 from ai_principal.mcp_server.server import MCPServer
@@ -35,6 +37,9 @@ def cmd_extract(args):
     Args:
         args: Argumentos da linha de comando
     """
+    # Cache de extrações (desativado com --no-cache ou quando não configurado)
+    cache_dir = None if getattr(args, 'no_cache', False) else getattr(args, 'cache_dir', None)
+    
     try:
         if args.pdf:
             # Processar um único PDF
@@ -42,7 +47,9 @@ def cmd_extract(args):
             result = extract_pdf(
                 args.pdf,
                 reference_path=args.reference,
-                output_dir=args.output
+                output_dir=args.output,
+                cache=ExtractionCache(cache_dir) if cache_dir else None,
+                table_engine=getattr(args, 'table_engine', "pdfplumber")
             )
             logger.info(f"Extração concluída: {len(result.get('exams', []))} exames encontrados")
             return result
@@ -54,7 +61,11 @@ def cmd_extract(args):
                 args.dir,
                 reference_path=args.reference,
                 output_dir=args.output,
-                file_pattern=args.pattern
+                file_pattern=args.pattern,
+                workers=getattr(args, 'workers', 1),
+                return_data=False,
+                cache_dir=cache_dir,
+                table_engine=getattr(args, 'table_engine', "pdfplumber")
             )
             logger.info(f"Extração concluída: {len(results)} PDFs processados")
             return results
@@ -70,10 +81,16 @@ def cmd_process(args):
     Args:
         args: Argumentos da linha de comando
     """
+    # Cache de embeddings (desativado com --no-embedding-cache ou quando não configurado)
+    embedding_cache_dir = None if getattr(args, 'no_embedding_cache', False) else getattr(args, 'embedding_cache_dir', None)
+    
     try:
         processor = RAGProcessor(
             chunk_size=args.chunk_size,
-            chunk_overlap=args.chunk_overlap
+            chunk_overlap=args.chunk_overlap,
+            chunk_unit=args.chunk_unit,
+            chunk_strategy=args.chunk_strategy,
+            embedding_cache_dir=embedding_cache_dir
         )
         
         if args.json:
@@ -308,7 +325,9 @@ def cmd_workflow(args):
         print("\n[2/3] Pré-processando dados para RAG...")
         processor = RAGProcessor(
             chunk_size=args.chunk_size,
-            chunk_overlap=args.chunk_overlap
+            chunk_overlap=args.chunk_overlap,
+            chunk_unit=args.chunk_unit,
+            chunk_strategy=args.chunk_strategy
         )
         
         chunks = processor.process_exam_file(extract_json_path)
@@ -333,4 +352,30 @@ def cmd_workflow(args):
     except Exception as e:
         logger.error(f"Erro durante o fluxo de trabalho: {e}")
         print(f"\nErro: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+def cmd_reference(args):
+    """
+    Comando para gerenciar a planilha de referência
+    
+    Args:
+        args: Argumentos da linha de comando
+    """
+    try:
+        if args.reference_command == "compile":
+            # Compilar a planilha em um snapshot binário
+            logger.info(f"Compilando planilha de referência: {args.sheet}")
+            processor = ExcelReferenceProcessor(args.sheet, snapshot_path=args.output)
+            snapshot_path = processor.compile_snapshot()
+            
+            print(f"Snapshot gravado em: {snapshot_path}")
+            print(f"Exames indexados: {len(processor.reference_data)}")
+            
+            return {"snapshot": snapshot_path, "exams": len(processor.reference_data)}
+        
+        logger.error("Subcomando de referência não informado")
+        return {"error": "Subcomando de referência não informado"}
+    
+    except Exception as e:
+        logger.error(f"Erro ao compilar a planilha de referência: {e}")
+        return {"error": str(e)}
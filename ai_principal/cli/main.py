@@ -11,7 +11,9 @@ from typing import Dict, List, Any, Optional
 from dotenv import load_dotenv
 
 # Importar comandos
-from .commands import cmd_extract, cmd_process, cmd_query, cmd_server, cmd_workflow
+from .commands import cmd_extract, cmd_process, cmd_query, cmd_server, cmd_workflow, cmd_reference
+from ai_principal.pdf_extraction.extraction_cache import EXTRACTION_CACHE_DIR
+from ai_principal.rag_preprocessing.embedding_cache import EMBEDDING_CACHE_DIR
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -66,6 +68,11 @@ def main():
     extract_parser.add_argument("--reference", type=str, help="Caminho para planilha de referência")
     extract_parser.add_argument("--output", type=str, help="Diretório para arquivos de saída")
     extract_parser.add_argument("--pattern", type=str, default="*.pdf", help="Padrão para filtrar arquivos (para --dir)")
+    extract_parser.add_argument("--workers", type=int, default=1, help="Número de processos paralelos (para --dir)")
+    extract_parser.add_argument("--cache-dir", type=str, default=EXTRACTION_CACHE_DIR, help="Diretório do cache de extrações")
+    extract_parser.add_argument("--no-cache", action="store_true", help="Desativar o cache de extrações")
+    extract_parser.add_argument("--table-engine", type=str, default="pdfplumber", choices=["pdfplumber", "pymupdf", "auto"],
+                                help="Motor de extração de tabelas")
     
     # Comando process
     process_parser = subparsers.add_parser("process", help="Pré-processar dados extraídos para RAG")
@@ -74,8 +81,16 @@ def main():
     process_group.add_argument("--dir", type=str, help="Caminho para diretório com JSONs")
     process_parser.add_argument("--output", type=str, help="Diretório para arquivos de saída")
     process_parser.add_argument("--pattern", type=str, default="*_extracted.json", help="Padrão para filtrar arquivos (para --dir)")
-    process_parser.add_argument("--chunk-size", type=int, default=1000, help="Tamanho máximo de cada chunk em caracteres")
-    process_parser.add_argument("--chunk-overlap", type=int, default=200, help="Sobreposição entre chunks em caracteres")
+    process_parser.add_argument("--chunk-size", type=int, default=1000, help="Tamanho máximo de cada chunk (em --chunk-unit)")
+    process_parser.add_argument("--chunk-overlap", type=int, default=200, help="Sobreposição entre chunks: últimos exames do chunk anterior repetidos até esse tamanho (em --chunk-unit)")
+    process_parser.add_argument("--chunk-unit", type=str, default="chars", choices=["chars", "tokens"],
+                                help="Unidade de --chunk-size e --chunk-overlap")
+    process_parser.add_argument("--chunk-strategy", type=str, default="grouped",
+                                choices=["grouped", "per_exam", "per_panel", "summary_only"],
+                                help="Estratégia de chunking dos resultados")
+    process_parser.add_argument("--embedding-cache-dir", type=str, default=EMBEDDING_CACHE_DIR,
+                                help="Diretório do cache de embeddings")
+    process_parser.add_argument("--no-embedding-cache", action="store_true", help="Desativar o cache de embeddings")
     process_parser.add_argument("--index", action="store_true", help="Indexar chunks no Supabase após processamento")
     
     # Comando query
@@ -96,8 +111,20 @@ def main():
     workflow_parser.add_argument("--pdf", type=str, required=True, help="Caminho para o arquivo PDF")
     workflow_parser.add_argument("--reference", type=str, help="Caminho para planilha de referência")
     workflow_parser.add_argument("--output", type=str, help="Diretório para arquivos de saída")
-    workflow_parser.add_argument("--chunk-size", type=int, default=1000, help="Tamanho máximo de cada chunk em caracteres")
-    workflow_parser.add_argument("--chunk-overlap", type=int, default=200, help="Sobreposição entre chunks em caracteres")
+    workflow_parser.add_argument("--chunk-size", type=int, default=1000, help="Tamanho máximo de cada chunk (em --chunk-unit)")
+    workflow_parser.add_argument("--chunk-overlap", type=int, default=200, help="Sobreposição entre chunks: últimos exames do chunk anterior repetidos até esse tamanho (em --chunk-unit)")
+    workflow_parser.add_argument("--chunk-unit", type=str, default="chars", choices=["chars", "tokens"],
+                                 help="Unidade de --chunk-size e --chunk-overlap")
+    workflow_parser.add_argument("--chunk-strategy", type=str, default="grouped",
+                                 choices=["grouped", "per_exam", "per_panel", "summary_only"],
+                                 help="Estratégia de chunking dos resultados")
+    
+    # Comando reference
+    reference_parser = subparsers.add_parser("reference", help="Gerenciar a planilha de referência")
+    reference_subparsers = reference_parser.add_subparsers(dest="reference_command", help="Ação sobre a planilha")
+    compile_parser = reference_subparsers.add_parser("compile", help="Compilar a planilha em um snapshot binário")
+    compile_parser.add_argument("sheet", type=str, help="Caminho para a planilha de referência (.xlsx)")
+    compile_parser.add_argument("--output", type=str, help="Caminho do snapshot (padrão: diretório de cache)")
     
     # Versão
     parser.add_argument('--version', action='version', version='BioLab.Ai CLI v0.1.0')
@@ -117,6 +144,8 @@ def main():
             cmd_server(args)
         elif args.command == "workflow":
             cmd_workflow(args)
+        elif args.command == "reference":
+            cmd_reference(args)
         else:
             parser.print_help()
             return 1
@@ -6,9 +6,11 @@ Cada ferramenta implementa uma função específica que pode ser chamada por LLM
 através do protocolo MCP.
 """
 
+import os
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel, Field
 from .supabase_client import SupabaseVectorStore
+from ai_principal.pdf_extraction.excel_reference import get_reference_processor
 
 # Modelos de dados para as ferramentas MCP
 
@@ -94,8 +96,15 @@ class MCPTools:
         Returns:
             Valores de referência para o exame
         """
-        # Implementação a ser concluída - buscar valores na base
-        # Por enquanto retornamos valores estáticos para teste
+        # Planilha de referência configurada: mesmo processador (e índice de
+        # nomes) compartilhado pela extração neste processo
+        reference_path = os.getenv("BIOLAB_REFERENCE_PATH")
+        if reference_path:
+            processor = get_reference_processor(reference_path)
+            reference = processor.get_reference_for_exam(request.exam_code, request.gender, request.age)
+            return {"exam_code": request.exam_code, **reference}
+        
+        # Sem planilha configurada retornamos valores estáticos para teste
         return {
             "exam_code": request.exam_code,
             "min_value": 3.5,
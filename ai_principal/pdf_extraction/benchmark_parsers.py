@@ -0,0 +1,120 @@
+"""
+Benchmark dos parsers de exames em texto livre com entradas adversariais
+Compara os padrões regex originais com os parsers lineares de `text_parsers`
+"""
+
+import re
+import time
+import argparse
+import logging
+from typing import Callable, Dict, List, Any
+from .text_parsers import parse_generic_exams, parse_ramos_exams
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Padrões usados anteriormente pelos extratores, mantidos apenas para comparação
+LEGACY_GENERIC_PATTERN = re.compile(
+    r"([\w\s-]+?):\s+([\d.,]+)\s*([a-zA-Z%/]+)?\s*(?:Valor\s+de\s+Referência|Referência):\s+([\w\s.,<>-]+)",
+    re.IGNORECASE
+)
+LEGACY_RAMOS_PATTERN = re.compile(r"([\w\s]+):\s+([\d.,]+)\s+([a-zA-Z%/]+)(?:\s+Referência:\s+([\d.,\s-]+))?")
+
+def _legacy_generic(text: str) -> int:
+    return sum(1 for _ in LEGACY_GENERIC_PATTERN.finditer(text))
+
+def _legacy_ramos(text: str) -> int:
+    return sum(1 for _ in LEGACY_RAMOS_PATTERN.finditer(text))
+
+def _repeat_to_size(unit: str, size: int) -> str:
+    """Repete um trecho até atingir o tamanho desejado em caracteres"""
+    return (unit * (size // len(unit) + 1))[:size]
+
+def build_inputs(size: int) -> Dict[str, str]:
+    """
+    Gera textos adversariais (sem exames válidos no formato genérico) do tamanho pedido
+
+    Args:
+        size: Tamanho de cada texto em caracteres
+
+    Returns:
+        Dicionário nome do caso -> texto
+    """
+    return {
+        # Uma única sequência enorme de palavras, sem ':' no final
+        "sem_dois_pontos": _repeat_to_size("RESULTADO DO EXAME COLETADO\n", size - 1) + ".",
+        # Muitos ':' seguidos de texto não numérico
+        "muitos_dois_pontos": _repeat_to_size("Material do exame coletado: SANGUE\n", size),
+        # Resultado e unidade presentes, mas sem a palavra-chave de referência
+        "sem_referencia": _repeat_to_size("HEMOGLOBINA TOTAL: 15,5 g/dL Obs\n", size),
+    }
+
+def _time_call(func: Callable[[str], Any], text: str) -> float:
+    start = time.perf_counter()
+    func(text)
+    return time.perf_counter() - start
+
+def run_benchmark(size: int, legacy_max_chars: int) -> List[Dict[str, Any]]:
+    """
+    Mede o tempo dos parsers lineares e dos padrões originais
+
+    Os padrões originais têm custo quadrático nesses casos, então só são
+    executados até `legacy_max_chars` caracteres.
+
+    Args:
+        size: Tamanho dos textos para os parsers lineares
+        legacy_max_chars: Tamanho máximo dos textos para os padrões originais
+
+    Returns:
+        Lista de resultados por caso e parser
+    """
+    parsers = [
+        ("generico", parse_generic_exams, _legacy_generic),
+        ("ramos", parse_ramos_exams, _legacy_ramos),
+    ]
+    legacy_size = min(size, legacy_max_chars)
+    inputs = build_inputs(size)
+    legacy_inputs = build_inputs(legacy_size)
+
+    results = []
+    for case, text in inputs.items():
+        for parser_name, linear, legacy in parsers:
+            results.append({
+                "case": case,
+                "parser": parser_name,
+                "size": size,
+                "linear_seconds": _time_call(linear, text),
+                "legacy_size": legacy_size,
+                "legacy_seconds": _time_call(legacy, legacy_inputs[case]),
+                "linear_legacy_size_seconds": _time_call(linear, legacy_inputs[case])
+            })
+    return results
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """Imprime o resultado do benchmark em formato de tabela"""
+    print(f"{'Caso':<20} {'Parser':<9} {'Chars':>10} {'Linear (s)':>11} "
+          f"{'Chars orig.':>12} {'Original (s)':>13} {'Linear (s)':>11}")
+    for r in results:
+        print(f"{r['case']:<20} {r['parser']:<9} {r['size']:>10} {r['linear_seconds']:>11.4f} "
+              f"{r['legacy_size']:>12} {r['legacy_seconds']:>13.4f} {r['linear_legacy_size_seconds']:>11.4f}")
+
+def main():
+    """Função principal para execução via linha de comando"""
+    parser = argparse.ArgumentParser(description="Benchmark adversarial dos parsers de exames em texto")
+    parser.add_argument("--size", type=int, default=4_000_000, help="Tamanho dos textos em caracteres")
+    parser.add_argument("--legacy-max-chars", type=int, default=20_000,
+                        help="Tamanho máximo dos textos para os padrões regex originais")
+
+    args = parser.parse_args()
+
+    try:
+        print_report(run_benchmark(args.size, args.legacy_max_chars))
+    except Exception as e:
+        logger.error(f"Erro durante o benchmark: {e}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Benchmark da leitura da planilha de referência com planilhas sintéticas
+Compara a construção linha a linha original (`iterrows`) com a versão
+vetorizada de `excel_reference.build_exam_reference`
+"""
+
+import time
+import random
+import argparse
+import logging
+import pandas as pd
+from typing import Dict, List, Any
+from .excel_reference import build_exam_reference
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def legacy_build_exam_reference(df: pd.DataFrame) -> Dict[str, Any]:
+    """Construção original, linha a linha, mantida apenas para comparação"""
+    df = df.copy(deep=False)
+    df.columns = [col.strip().lower() for col in df.columns]
+
+    column_mapping = {}
+    for col in df.columns:
+        if 'exame' in col or 'teste' in col:
+            column_mapping[col] = 'exame'
+        elif 'alternativo' in col or 'sinonimo' in col:
+            column_mapping[col] = 'nome_alternativo'
+        elif 'unidade' in col or 'medida' in col:
+            column_mapping[col] = 'unidade'
+        elif 'referencia' in col or 'valor' in col:
+            column_mapping[col] = 'referencia'
+        elif 'sexo' in col or 'genero' in col:
+            column_mapping[col] = 'sexo'
+        elif 'idade' in col or 'faixa' in col:
+            column_mapping[col] = 'idade'
+
+    if column_mapping:
+        df = df.rename(columns=column_mapping)
+
+    available_columns = set(df.columns)
+    exam_reference = {}
+
+    if 'sexo' in available_columns and 'idade' in available_columns:
+        for _, row in df.iterrows():
+            exam_name = str(row.get('exame', '')).strip().lower()
+            if not exam_name or pd.isna(exam_name):
+                continue
+
+            alt_names = str(row.get('nome_alternativo', '')).strip().lower()
+            alt_names_list = [name.strip() for name in alt_names.split(',')] if alt_names and not pd.isna(alt_names) else []
+            all_names = [exam_name] + alt_names_list
+
+            sex = str(row.get('sexo', '')).strip().upper()
+            age_range = str(row.get('idade', '')).strip()
+            unit = str(row.get('unidade', '')).strip()
+            reference = str(row.get('referencia', '')).strip()
+
+            for name in all_names:
+                if name not in exam_reference:
+                    exam_reference[name] = {
+                        'name': exam_name,
+                        'alternative_names': alt_names_list,
+                        'units': [],
+                        'references': []
+                    }
+
+                if unit and unit not in exam_reference[name]['units']:
+                    exam_reference[name]['units'].append(unit)
+
+                if reference:
+                    ref_entry = {'value': reference, 'unit': unit}
+                    if sex and not pd.isna(sex):
+                        ref_entry['sex'] = sex
+                    if age_range and not pd.isna(age_range):
+                        ref_entry['age_range'] = age_range
+                    exam_reference[name]['references'].append(ref_entry)
+    else:
+        for _, row in df.iterrows():
+            exam_name = str(row.get('exame', '')).strip().lower()
+            if not exam_name or pd.isna(exam_name):
+                continue
+
+            alt_names = str(row.get('nome_alternativo', '')).strip().lower()
+            alt_names_list = [name.strip() for name in alt_names.split(',')] if alt_names and not pd.isna(alt_names) else []
+            all_names = [exam_name] + alt_names_list
+
+            unit = str(row.get('unidade', '')).strip()
+            reference = str(row.get('referencia', '')).strip()
+
+            for name in all_names:
+                if name not in exam_reference:
+                    exam_reference[name] = {
+                        'name': exam_name,
+                        'alternative_names': alt_names_list,
+                        'units': [unit] if unit and not pd.isna(unit) else [],
+                        'references': [{'value': reference, 'unit': unit}] if reference and not pd.isna(reference) else []
+                    }
+                elif unit and not pd.isna(unit) and unit not in exam_reference[name]['units']:
+                    exam_reference[name]['units'].append(unit)
+                    if reference and not pd.isna(reference):
+                        exam_reference[name]['references'].append({'value': reference, 'unit': unit})
+
+    return exam_reference
+
+def build_sheet(rows: int, exams: int, by_sex_and_age: bool, seed: int = 42) -> pd.DataFrame:
+    """
+    Gera uma planilha sintética no formato da planilha de referência
+
+    Cada exame aparece em várias linhas (laboratórios, sexos e faixas etárias
+    diferentes), com muitas unidades e nomes alternativos, e algumas células vazias.
+
+    Args:
+        rows: Quantidade de linhas
+        exams: Quantidade de exames distintos
+        by_sex_and_age: Incluir as colunas de sexo e faixa etária
+        seed: Semente do gerador aleatório
+
+    Returns:
+        DataFrame da planilha
+    """
+    rng = random.Random(seed)
+    units = ["mg/dL", "g/dL", "U/L", "mmol/L", "µmol/L", "%", "fL", "pg", "mil/mm³", ""]
+    age_ranges = ["0-5", "6-17", "18-50", ">50", "<18", "Adulto", ""]
+
+    data = {
+        "Exame": [],
+        "Nome Alternativo": [],
+        "Unidade": [],
+        "Valor de Referencia": []
+    }
+    if by_sex_and_age:
+        data["Sexo"] = []
+        data["Faixa Etaria"] = []
+
+    for _ in range(rows):
+        exam = rng.randrange(exams)
+        data["Exame"].append(f" Exame {exam} ")
+        data["Nome Alternativo"].append(
+            ", ".join(f"Sinonimo {exam}.{k}" for k in range(rng.randint(0, 3))) or None
+        )
+        data["Unidade"].append(rng.choice(units) or None)
+        data["Valor de Referencia"].append(f"{rng.randint(0, 50)} - {rng.randint(51, 400)}")
+        if by_sex_and_age:
+            data["Sexo"].append(rng.choice(["M", "F", "m", ""]) or None)
+            data["Faixa Etaria"].append(rng.choice(age_ranges) or None)
+
+    return pd.DataFrame(data)
+
+def _time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def run_benchmark(rows: int, exams: int, check: bool = True) -> List[Dict[str, Any]]:
+    """
+    Mede a construção original e a vetorizada nas duas variantes de planilha
+
+    Args:
+        rows: Quantidade de linhas das planilhas
+        exams: Quantidade de exames distintos
+        check: Verificar se os dois resultados são idênticos
+
+    Returns:
+        Lista de resultados por variante
+    """
+    results = []
+    for by_sex_and_age in (True, False):
+        df = build_sheet(rows, exams, by_sex_and_age)
+        legacy_seconds, legacy = _time_call(legacy_build_exam_reference, df)
+        vectorized_seconds, vectorized = _time_call(build_exam_reference, df)
+
+        if check and legacy != vectorized:
+            raise AssertionError("Resultados divergentes entre a construção original e a vetorizada")
+
+        results.append({
+            "variant": "sexo/idade" if by_sex_and_age else "simples",
+            "rows": rows,
+            "names": len(vectorized),
+            "legacy_seconds": legacy_seconds,
+            "vectorized_seconds": vectorized_seconds
+        })
+    return results
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """Imprime o resultado do benchmark em formato de tabela"""
+    print(f"{'Variante':<12} {'Linhas':>8} {'Nomes':>8} {'iterrows (s)':>13} {'Vetorizado (s)':>15} {'Ganho':>7}")
+    for r in results:
+        speedup = r["legacy_seconds"] / r["vectorized_seconds"] if r["vectorized_seconds"] else float("inf")
+        print(f"{r['variant']:<12} {r['rows']:>8} {r['names']:>8} {r['legacy_seconds']:>13.3f} "
+              f"{r['vectorized_seconds']:>15.3f} {speedup:>6.1f}x")
+
+def main():
+    """Função principal para execução via linha de comando"""
+    parser = argparse.ArgumentParser(description="Benchmark da leitura da planilha de referência")
+    parser.add_argument("--rows", type=int, default=100_000, help="Quantidade de linhas da planilha sintética")
+    parser.add_argument("--exams", type=int, default=2_000, help="Quantidade de exames distintos")
+    parser.add_argument("--no-check", action="store_true", help="Não comparar os resultados das duas versões")
+
+    args = parser.parse_args()
+
+    try:
+        print_report(run_benchmark(args.rows, args.exams, check=not args.no_check))
+    except Exception as e:
+        logger.error(f"Erro durante o benchmark: {e}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    main()
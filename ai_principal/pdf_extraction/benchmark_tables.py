@@ -0,0 +1,159 @@
+"""
+Benchmark dos motores de extração de tabelas (pdfplumber x PyMuPDF)
+Compara tempo e concordância das células em um corpus de PDFs
+"""
+
+import os
+import time
+import argparse
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any
+from .document_session import PDFDocumentSession
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ENGINES = ("pdfplumber", "pymupdf")
+
+def _extract_tables(pdf_path: str, engine: str) -> List[List[List[str]]]:
+    """
+    Extrai todas as tabelas de um PDF com uma sessão nova (sem cache)
+
+    Args:
+        pdf_path: Caminho para o arquivo PDF
+        engine: 'pdfplumber' ou 'pymupdf'
+
+    Returns:
+        Lista de tabelas do documento
+    """
+    tables = []
+    with PDFDocumentSession(pdf_path) as session:
+        for i in range(session.page_count):
+            if engine == "pdfplumber":
+                tables.extend(session.get_page_tables(i))
+                session.release_page(i)
+            else:
+                tables.extend(session.get_page_tables_pymupdf(i))
+    return tables
+
+def _cell_counter(tables: List[List[List[str]]]) -> Counter:
+    """Multiconjunto das células não vazias, com espaços normalizados"""
+    cells = Counter()
+    for table in tables:
+        for row in table:
+            for cell in row:
+                if cell:
+                    normalized = " ".join(str(cell).split())
+                    if normalized:
+                        cells[normalized] += 1
+    return cells
+
+def _cell_f1(reference: Counter, candidate: Counter) -> float:
+    """F1 entre os multiconjuntos de células de referência e candidato"""
+    if not reference and not candidate:
+        return 1.0
+    overlap = sum((reference & candidate).values())
+    if overlap == 0:
+        return 0.0
+    precision = overlap / sum(candidate.values())
+    recall = overlap / sum(reference.values())
+    return 2 * precision * recall / (precision + recall)
+
+def run_benchmark(dir_path: str, file_pattern: str = "*.pdf", repeat: int = 1) -> Dict[str, Any]:
+    """
+    Executa o benchmark sobre todos os PDFs de um diretório
+
+    A concordância é medida contra o pdfplumber, que é o motor de referência
+    usado pelo `GenericLabExtractor`.
+
+    Args:
+        dir_path: Diretório com os PDFs do corpus
+        file_pattern: Padrão para filtrar arquivos
+        repeat: Número de repetições por arquivo (usa o menor tempo)
+
+    Returns:
+        Dicionário com os totais por motor e os resultados por arquivo
+    """
+    pdf_files = sorted(Path(dir_path).glob(file_pattern))
+    if not pdf_files:
+        raise FileNotFoundError(f"Nenhum PDF correspondente a '{file_pattern}' em: {dir_path}")
+
+    totals = {engine: {"seconds": 0.0, "tables": 0, "f1_sum": 0.0} for engine in ENGINES}
+    files = []
+
+    for pdf_file in pdf_files:
+        entry = {"file": pdf_file.name}
+        cells = {}
+        for engine in ENGINES:
+            best = None
+            tables = []
+            for _ in range(max(repeat, 1)):
+                start = time.perf_counter()
+                try:
+                    tables = _extract_tables(str(pdf_file), engine)
+                except Exception as e:
+                    logger.error(f"Erro ao extrair tabelas de {pdf_file} com {engine}: {e}")
+                    tables = []
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            cells[engine] = _cell_counter(tables)
+            entry[engine] = {"seconds": best, "tables": len(tables)}
+            totals[engine]["seconds"] += best
+            totals[engine]["tables"] += len(tables)
+
+        for engine in ENGINES:
+            f1 = _cell_f1(cells["pdfplumber"], cells[engine])
+            entry[engine]["cell_f1"] = f1
+            totals[engine]["f1_sum"] += f1
+
+        files.append(entry)
+
+    for engine in ENGINES:
+        totals[engine]["cell_f1"] = totals[engine].pop("f1_sum") / len(files)
+
+    return {"files": files, "totals": totals}
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Imprime o resultado do benchmark em formato de tabela"""
+    print(f"{'Arquivo':<40} {'Motor':<11} {'Tempo (s)':>10} {'Tabelas':>8} {'F1 células':>11}")
+    for entry in report["files"]:
+        for engine in ENGINES:
+            result = entry[engine]
+            print(f"{entry['file'][:40]:<40} {engine:<11} {result['seconds']:>10.4f} "
+                  f"{result['tables']:>8} {result['cell_f1']:>11.3f}")
+
+    print()
+    print(f"{'Total':<40} {'Motor':<11} {'Tempo (s)':>10} {'Tabelas':>8} {'F1 médio':>11}")
+    for engine in ENGINES:
+        total = report["totals"][engine]
+        print(f"{'':<40} {engine:<11} {total['seconds']:>10.4f} {total['tables']:>8} {total['cell_f1']:>11.3f}")
+
+    plumber = report["totals"]["pdfplumber"]["seconds"]
+    pymupdf = report["totals"]["pymupdf"]["seconds"]
+    if pymupdf > 0:
+        print(f"\nAceleração do PyMuPDF sobre o pdfplumber: {plumber / pymupdf:.1f}x")
+
+def main():
+    """Função principal para execução via linha de comando"""
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de extração de tabelas")
+    parser.add_argument("--dir", type=str, required=True, help="Diretório com o corpus de PDFs")
+    parser.add_argument("--pattern", type=str, default="*.pdf", help="Padrão para filtrar arquivos")
+    parser.add_argument("--repeat", type=int, default=1, help="Repetições por arquivo (usa o menor tempo)")
+
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmark(args.dir, file_pattern=args.pattern, repeat=args.repeat)
+        print_report(report)
+    except Exception as e:
+        logger.error(f"Erro durante o benchmark: {e}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    main()
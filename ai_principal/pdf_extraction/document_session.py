@@ -0,0 +1,258 @@
+"""
+Sessão de documento compartilhada entre os extratores de PDF
+Mantém um único handle PyMuPDF e um único handle pdfplumber por arquivo
+e guarda em cache o texto e as tabelas de cada página
+"""
+
+import os
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+import fitz  # PyMuPDF
+import pdfplumber
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PDFDocumentSession:
+    """
+    Sessão de leitura de um PDF
+
+    Abre cada biblioteca no máximo uma vez e mantém caches por página,
+    de modo que a fábrica, a classe base e os extratores especializados
+    paguem o custo de extração uma única vez por página.
+    """
+
+    def __init__(self, pdf_path: str):
+        """
+        Inicializa a sessão com o caminho para o PDF
+
+        Args:
+            pdf_path: Caminho para o arquivo PDF
+        """
+        self.pdf_path = pdf_path
+
+        # Validar existência do arquivo
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
+
+        self._fitz_doc = None
+        self._plumber_pdf = None
+        self._page_count: Optional[int] = None
+        self._metadata: Optional[Dict[str, Any]] = None
+
+        # Caches por página (índice da página -> conteúdo)
+        self._text_pymupdf: Dict[int, str] = {}
+        self._text_pdfplumber: Dict[int, str] = {}
+        self._tables: Dict[int, List[List[List[str]]]] = {}
+        self._tables_pymupdf: Dict[int, List[List[List[str]]]] = {}
+        self._ruling_lines: Dict[int, Tuple[int, int]] = {}
+
+    @property
+    def fitz_doc(self) -> "fitz.Document":
+        """Handle PyMuPDF, aberto sob demanda"""
+        if self._fitz_doc is None:
+            self._fitz_doc = fitz.open(self.pdf_path)
+        return self._fitz_doc
+
+    @property
+    def plumber_pdf(self) -> "pdfplumber.PDF":
+        """Handle pdfplumber, aberto sob demanda"""
+        if self._plumber_pdf is None:
+            self._plumber_pdf = pdfplumber.open(self.pdf_path)
+        return self._plumber_pdf
+
+    @property
+    def page_count(self) -> int:
+        """Número de páginas do documento"""
+        if self._page_count is None:
+            self._page_count = self.fitz_doc.page_count
+        return self._page_count
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Metadados brutos do PDF segundo o PyMuPDF"""
+        if self._metadata is None:
+            self._metadata = self.fitz_doc.metadata or {}
+        return self._metadata
+
+    def get_page_text_pymupdf(self, page_index: int) -> str:
+        """
+        Obtém o texto de uma página usando PyMuPDF
+
+        Args:
+            page_index: Índice da página (base 0)
+
+        Returns:
+            Texto da página
+        """
+        if page_index not in self._text_pymupdf:
+            self._text_pymupdf[page_index] = self.fitz_doc[page_index].get_text()
+        return self._text_pymupdf[page_index]
+
+    def get_page_text_pdfplumber(self, page_index: int) -> str:
+        """
+        Obtém o texto de uma página usando pdfplumber
+
+        Args:
+            page_index: Índice da página (base 0)
+
+        Returns:
+            Texto da página
+        """
+        if page_index not in self._text_pdfplumber:
+            page = self.plumber_pdf.pages[page_index]
+            self._text_pdfplumber[page_index] = page.extract_text() or ""
+        return self._text_pdfplumber[page_index]
+
+    def get_page_tables(self, page_index: int) -> List[List[List[str]]]:
+        """
+        Obtém as tabelas de uma página usando pdfplumber
+
+        Args:
+            page_index: Índice da página (base 0)
+
+        Returns:
+            Lista de tabelas da página
+        """
+        if page_index not in self._tables:
+            page = self.plumber_pdf.pages[page_index]
+            self._tables[page_index] = page.extract_tables() or []
+        return self._tables[page_index]
+
+    def get_page_tables_pymupdf(self, page_index: int) -> List[List[List[str]]]:
+        """
+        Obtém as tabelas de uma página usando o `find_tables` do PyMuPDF
+
+        Detecta a grade a partir dos desenhos vetoriais e preenche as células
+        com as palavras contidas em cada caixa, sem acionar o pdfplumber.
+
+        Args:
+            page_index: Índice da página (base 0)
+
+        Returns:
+            Lista de tabelas da página, no mesmo formato do pdfplumber
+        """
+        if page_index not in self._tables_pymupdf:
+            finder = self.fitz_doc[page_index].find_tables()
+            self._tables_pymupdf[page_index] = [table.extract() for table in finder.tables]
+        return self._tables_pymupdf[page_index]
+
+    def get_page_words(self, page_index: int) -> List[Tuple]:
+        """
+        Obtém as palavras posicionadas de uma página usando PyMuPDF
+
+        Não fica em cache: quem consome (ex.: reconstrução de linhas)
+        processa a página e guarda apenas o resultado.
+
+        Args:
+            page_index: Índice da página (base 0)
+
+        Returns:
+            Lista de tuplas (x0, y0, x1, y1, palavra, bloco, linha, índice)
+        """
+        return self.fitz_doc[page_index].get_text("words")
+
+    def get_page_ruling_lines(self, page_index: int) -> Tuple[int, int]:
+        """
+        Conta as linhas de grade (horizontais e verticais) desenhadas na página
+
+        Usa os desenhos vetoriais do PyMuPDF, sem acionar o pdfplumber.
+        Retângulos finos contam como linhas; retângulos maiores contam como
+        duas linhas de cada orientação (bordas de células).
+
+        Args:
+            page_index: Índice da página (base 0)
+
+        Returns:
+            Tupla (linhas horizontais, linhas verticais)
+        """
+        if page_index not in self._ruling_lines:
+            horizontal = 0
+            vertical = 0
+            for drawing in self.fitz_doc[page_index].get_drawings():
+                for item in drawing.get("items", []):
+                    if item[0] == "l":
+                        p1, p2 = item[1], item[2]
+                        if abs(p1.y - p2.y) < 1:
+                            horizontal += 1
+                        elif abs(p1.x - p2.x) < 1:
+                            vertical += 1
+                    elif item[0] == "re":
+                        rect = item[1]
+                        if rect.height < 2:
+                            horizontal += 1
+                        elif rect.width < 2:
+                            vertical += 1
+                        else:
+                            horizontal += 2
+                            vertical += 2
+            self._ruling_lines[page_index] = (horizontal, vertical)
+        return self._ruling_lines[page_index]
+
+    def release_page(self, page_index: int) -> None:
+        """
+        Libera tudo o que a sessão guarda de uma página já consumida
+
+        Remove o texto, as tabelas e as linhas de grade da página dos caches
+        da sessão e descarta os objetos de layout do pdfplumber (caracteres,
+        linhas, retângulos), mantendo a memória estável em documentos longos
+        lidos em streaming. Consultas posteriores à página extraem de novo.
+
+        Args:
+            page_index: Índice da página (base 0)
+        """
+        for cache in (self._text_pymupdf, self._text_pdfplumber, self._tables,
+                      self._tables_pymupdf, self._ruling_lines):
+            cache.pop(page_index, None)
+
+        if self._plumber_pdf is not None:
+            # `Page.close()` só existe a partir do pdfplumber 0.11; `flush_cache()`
+            # existe na versão fixada em requirements.txt (0.10.2)
+            page = self._plumber_pdf.pages[page_index]
+            page.flush_cache()
+            textmap = getattr(page, "get_textmap", None)
+            if hasattr(textmap, "cache_clear"):
+                textmap.cache_clear()
+
+    def get_text_pymupdf(self) -> str:
+        """Texto completo do documento segundo o PyMuPDF"""
+        return "".join(self.get_page_text_pymupdf(i) for i in range(self.page_count))
+
+    def get_text_pdfplumber(self) -> str:
+        """Texto completo do documento segundo o pdfplumber"""
+        return "".join(self.get_page_text_pdfplumber(i) for i in range(self.page_count))
+
+    def get_tables(self) -> List[List[List[str]]]:
+        """Todas as tabelas do documento, na ordem das páginas"""
+        tables = []
+        for i in range(self.page_count):
+            tables.extend(self.get_page_tables(i))
+        return tables
+
+    def close(self) -> None:
+        """
+        Fecha os handles abertos
+
+        Os caches das páginas não liberadas (`release_page`) são mantidos,
+        então consultas já feitas continuam disponíveis sem reabrir o arquivo.
+        """
+        if self._fitz_doc is not None:
+            try:
+                self._fitz_doc.close()
+            except Exception as e:
+                logger.warning(f"Erro ao fechar documento PyMuPDF: {e}")
+            self._fitz_doc = None
+
+        if self._plumber_pdf is not None:
+            try:
+                self._plumber_pdf.close()
+            except Exception as e:
+                logger.warning(f"Erro ao fechar documento pdfplumber: {e}")
+            self._plumber_pdf = None
+
+    def __enter__(self) -> "PDFDocumentSession":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -3,28 +3,85 @@ Módulo para processamento da planilha de referência de exames
 """
 
 import os
-import pandas as pd
+import json
+import math
+import threading
 import logging
-from typing import Dict, List, Any, Optional
+import numpy as np
+from enum import IntEnum
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+from .extraction_cache import file_sha256
+from .name_index import ExamNameIndex
+from .reference_snapshot import (
+    ReferenceSnapshot, SNAPSHOT_SUFFIX, default_snapshot_path, write_snapshot
+)
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class Sex(IntEnum):
+    """
+    Código de sexo das referências
+    
+    ANY indica referência sem sexo definido (vale para todos); OTHER agrupa
+    valores não reconhecidos da planilha (ex.: 'NAN' de células vazias), que
+    não correspondem a M nem a F e são comparados pelo texto original.
+    """
+    ANY = 0
+    M = 1
+    F = 2
+    OTHER = 3
+    
+    @classmethod
+    def from_value(cls, value: Optional[str]) -> "Sex":
+        """Converte o valor textual ('M', 'F', vazio, ...) no código correspondente"""
+        if not value:
+            return cls.ANY
+        if value == "M":
+            return cls.M
+        if value == "F":
+            return cls.F
+        return cls.OTHER
+
 class ExcelReferenceProcessor:
     """
     Processa a planilha de referência de exames para obter valores de referência
     """
     
-    def __init__(self, excel_path: str):
+    def __init__(self, excel_path: str,
+                 snapshot_path: Optional[str] = None,
+                 use_snapshot: bool = True):
         """
         Inicializa o processador com o caminho para a planilha Excel
         
         Args:
-            excel_path: Caminho para o arquivo Excel
+            excel_path: Caminho para o arquivo Excel, ou diretamente para um
+                        snapshot compilado (extensão .blref)
+            snapshot_path: Caminho do snapshot compilado da planilha
+                           (padrão: diretório de cache do BioLab)
+            use_snapshot: Ler e manter atualizado o snapshot compilado
         """
         self.excel_path = excel_path
         self.reference_data = {}
+        self.snapshot_path = snapshot_path or default_snapshot_path(excel_path)
+        self.use_snapshot = use_snapshot
+        self.snapshot_only = excel_path.endswith(SNAPSHOT_SUFFIX)
+        if self.snapshot_only:
+            self.snapshot_path = excel_path
+        
+        # Tabela de referências pré-processada: para cada nome, o índice da
+        # primeira referência nos vetores de faixa etária (em anos, intervalo
+        # [início, fim)) e de código de sexo
+        self._ref_starts: Dict[str, int] = {}
+        self._age_min = np.empty(0, dtype=np.float64)
+        self._age_max = np.empty(0, dtype=np.float64)
+        self._sex = np.empty(0, dtype=np.uint8)
+        self._entries: List[Dict[str, Any]] = []
+        self._entry_names: Dict[str, int] = {}
+        self._entry_ref_starts: List[int] = []
+        self._snapshot: Optional[ReferenceSnapshot] = None
+        self._name_index: Optional[ExamNameIndex] = None
         
         # Validar existência do arquivo
         if not os.path.exists(excel_path):
@@ -32,145 +89,180 @@ class ExcelReferenceProcessor:
     
     def load_reference_data(self) -> Dict[str, Any]:
         """
-        Carrega os dados de referência da planilha Excel
+        Carrega os dados de referência
+        
+        Usa o snapshot compilado quando ele corresponde ao conteúdo atual da
+        planilha (sem importar pandas); caso contrário lê a planilha e
+        regrava o snapshot.
         
         Returns:
             Dicionário com dados de referência
         """
+        if self.use_snapshot or self.snapshot_only:
+            snapshot = self._open_snapshot()
+            if snapshot is not None:
+                self._load_snapshot(snapshot)
+                logger.info(f"Carregados dados de referência para {len(self.reference_data)} exames "
+                            f"(snapshot {self.snapshot_path})")
+                return self.reference_data
+            if self.snapshot_only:
+                return {}
+        
+        exam_reference = self._read_sheet()
+        self._build_index(exam_reference)
+        
+        if self.use_snapshot and exam_reference:
+            try:
+                self._write_snapshot(self.snapshot_path, file_sha256(self.excel_path))
+            except Exception as e:
+                logger.warning(f"Não foi possível gravar o snapshot de referências: {e}")
+        
+        return self.reference_data
+    
+    def compile_snapshot(self, output_path: Optional[str] = None) -> str:
+        """
+        Lê a planilha e grava o snapshot compilado
+        
+        Args:
+            output_path: Caminho do snapshot (padrão: `snapshot_path`)
+            
+        Returns:
+            Caminho do snapshot gravado
+        """
+        if self.snapshot_only:
+            raise ValueError("O processador foi criado a partir de um snapshot, não de uma planilha")
+        
+        exam_reference = self._read_sheet()
+        if not exam_reference:
+            raise ValueError(f"Nenhum dado de referência lido de {self.excel_path}")
+        
+        self._build_index(exam_reference)
+        output_path = output_path or self.snapshot_path
+        self._write_snapshot(output_path, file_sha256(self.excel_path))
+        return output_path
+    
+    def _open_snapshot(self) -> Optional[ReferenceSnapshot]:
+        """Abre o snapshot se existir e corresponder à planilha atual"""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        
+        try:
+            snapshot = ReferenceSnapshot(self.snapshot_path)
+        except Exception as e:
+            if self.snapshot_only:
+                logger.error(f"Snapshot de referências inválido: {self.snapshot_path} ({e})")
+            else:
+                logger.warning(f"Snapshot de referências inválido, será recompilado: {self.snapshot_path} ({e})")
+            return None
+        
+        if not self.snapshot_only and snapshot.source_sha256 != file_sha256(self.excel_path):
+            logger.info(f"Planilha de referência alterada, recompilando o snapshot: {self.excel_path}")
+            snapshot.close()
+            return None
+        
+        return snapshot
+    
+    def _load_snapshot(self, snapshot: ReferenceSnapshot) -> None:
+        """Adota as estruturas de um snapshot aberto"""
+        if self._snapshot is not None:
+            self._snapshot.close()
+        
+        self._snapshot = snapshot
+        self._name_index = None
+        self.reference_data = {name: snapshot.entries[i] for name, i in snapshot.names.items()}
+        self._ref_starts = {name: snapshot.ref_starts[i] for name, i in snapshot.names.items()}
+        self._age_min = snapshot.age_min
+        self._age_max = snapshot.age_max
+        self._sex = snapshot.sex
+    
+    def _build_index(self, exam_reference: Dict[str, Any]) -> None:
+        """
+        Agrupa entradas idênticas e pré-processa faixas etárias e sexo
+        
+        Args:
+            exam_reference: Dicionário nome -> dados do exame lido da planilha
+        """
+        entries = []
+        entry_ids: Dict[str, int] = {}
+        self._entry_names = {}
+        self._entry_ref_starts = []
+        age_min = []
+        age_max = []
+        sex_codes = []
+        
+        for name, info in exam_reference.items():
+            key = json.dumps(info, sort_keys=True, ensure_ascii=False)
+            entry_id = entry_ids.get(key)
+            if entry_id is None:
+                entry_id = entry_ids[key] = len(entries)
+                entries.append(info)
+                self._entry_ref_starts.append(len(age_min))
+                for ref in info['references']:
+                    low, high = parse_age_range(ref.get('age_range'))
+                    age_min.append(low)
+                    age_max.append(high)
+                    sex_codes.append(Sex.from_value(ref.get('sex')))
+            self._entry_names[name] = entry_id
+        
+        self._entries = entries
+        self._name_index = None
+        self.reference_data = {name: entries[i] for name, i in self._entry_names.items()}
+        self._ref_starts = {name: self._entry_ref_starts[i] for name, i in self._entry_names.items()}
+        self._age_min = np.asarray(age_min, dtype=np.float64)
+        self._age_max = np.asarray(age_max, dtype=np.float64)
+        self._sex = np.asarray(sex_codes, dtype=np.uint8)
+    
+    def _write_snapshot(self, snapshot_path: str, source_sha256: str) -> None:
+        """Grava o snapshot das estruturas construídas por `_build_index`"""
+        write_snapshot(
+            snapshot_path,
+            self._entries,
+            self._entry_names,
+            self._entry_ref_starts,
+            self._age_min,
+            self._age_max,
+            self._sex,
+            source_sha256=source_sha256,
+            source=os.path.realpath(self.excel_path)
+        )
+        logger.info(f"Snapshot de referências gravado em: {snapshot_path}")
+    
+    def _read_sheet(self) -> Dict[str, Any]:
+        """
+        Lê e processa a planilha Excel
+        
+        Returns:
+            Dicionário com dados de referência
+        """
+        # pandas só é necessário quando a planilha precisa ser lida
+        import pandas as pd
+        
         try:
             # Carregar a planilha
             df = pd.read_excel(self.excel_path)
             
-            # Limpar e padronizar nomes das colunas
-            df.columns = [col.strip().lower() for col in df.columns]
+            # Processar as colunas de forma vetorizada
+            exam_reference = build_exam_reference(df)
             
-            # Verificar se temos as colunas necessárias
-            required_columns = ['exame', 'nome_alternativo', 'unidade', 'referencia']
-            
-            # Ajustar nomes das colunas se necessário para variações comuns
-            column_mapping = {}
-            for col in df.columns:
-                if 'exame' in col or 'teste' in col:
-                    column_mapping[col] = 'exame'
-                elif 'alternativo' in col or 'sinonimo' in col:
-                    column_mapping[col] = 'nome_alternativo'
-                elif 'unidade' in col or 'medida' in col:
-                    column_mapping[col] = 'unidade'
-                elif 'referencia' in col or 'valor' in col:
-                    column_mapping[col] = 'referencia'
-                elif 'sexo' in col or 'genero' in col:
-                    column_mapping[col] = 'sexo'
-                elif 'idade' in col or 'faixa' in col:
-                    column_mapping[col] = 'idade'
-            
-            # Renomear colunas
-            if column_mapping:
-                df = df.rename(columns=column_mapping)
-            
-            # Verificar se agora temos as colunas necessárias
-            available_columns = set(df.columns)
-            
-            # Criar dicionário para consulta
-            exam_reference = {}
-            
-            # Se temos colunas específicas por sexo/idade, estruturar adequadamente
-            if 'sexo' in available_columns and 'idade' in available_columns:
-                # Agrupamento por exame, sexo e idade
-                for _, row in df.iterrows():
-                    exam_name = str(row.get('exame', '')).strip().lower()
-                    if not exam_name or pd.isna(exam_name):
-                        continue
-                    
-                    # Nomes alternativos (podem ser múltiplos separados por vírgula)
-                    alt_names = str(row.get('nome_alternativo', '')).strip().lower()
-                    alt_names_list = [name.strip() for name in alt_names.split(',')] if alt_names and not pd.isna(alt_names) else []
-                    
-                    # Criar lista completa de nomes (principal + alternativos)
-                    all_names = [exam_name] + alt_names_list
-                    
-                    # Obter valores específicos por sexo/idade
-                    sex = str(row.get('sexo', '')).strip().upper()
-                    age_range = str(row.get('idade', '')).strip()
-                    unit = str(row.get('unidade', '')).strip()
-                    reference = str(row.get('referencia', '')).strip()
-                    
-                    # Adicionar a todos os nomes do exame
-                    for name in all_names:
-                        if name not in exam_reference:
-                            exam_reference[name] = {
-                                'name': exam_name,  # Nome oficial
-                                'alternative_names': alt_names_list,
-                                'units': [],
-                                'references': []
-                            }
-                        
-                        # Adicionar unidade se não existir
-                        if unit and unit not in exam_reference[name]['units']:
-                            exam_reference[name]['units'].append(unit)
-                        
-                        # Adicionar referência por sexo/idade
-                        if reference:
-                            ref_entry = {
-                                'value': reference,
-                                'unit': unit
-                            }
-                            
-                            # Adicionar sexo e idade se fornecidos
-                            if sex and not pd.isna(sex):
-                                ref_entry['sex'] = sex
-                            
-                            if age_range and not pd.isna(age_range):
-                                ref_entry['age_range'] = age_range
-                            
-                            exam_reference[name]['references'].append(ref_entry)
-            else:
-                # Estrutura mais simples sem sexo/idade
-                for _, row in df.iterrows():
-                    exam_name = str(row.get('exame', '')).strip().lower()
-                    if not exam_name or pd.isna(exam_name):
-                        continue
-                    
-                    # Nomes alternativos
-                    alt_names = str(row.get('nome_alternativo', '')).strip().lower()
-                    alt_names_list = [name.strip() for name in alt_names.split(',')] if alt_names and not pd.isna(alt_names) else []
-                    
-                    # Criar lista completa de nomes
-                    all_names = [exam_name] + alt_names_list
-                    
-                    # Obter valores gerais
-                    unit = str(row.get('unidade', '')).strip()
-                    reference = str(row.get('referencia', '')).strip()
-                    
-                    # Adicionar a todos os nomes do exame
-                    for name in all_names:
-                        if name not in exam_reference:
-                            exam_reference[name] = {
-                                'name': exam_name,  # Nome oficial
-                                'alternative_names': alt_names_list,
-                                'units': [unit] if unit and not pd.isna(unit) else [],
-                                'references': [{
-                                    'value': reference,
-                                    'unit': unit
-                                }] if reference and not pd.isna(reference) else []
-                            }
-                        elif unit and not pd.isna(unit) and unit not in exam_reference[name]['units']:
-                            exam_reference[name]['units'].append(unit)
-                            
-                            if reference and not pd.isna(reference):
-                                exam_reference[name]['references'].append({
-                                    'value': reference,
-                                    'unit': unit
-                                })
-            
-            self.reference_data = exam_reference
             logger.info(f"Carregados dados de referência para {len(exam_reference)} exames")
             
-            return self.reference_data
+            return exam_reference
             
         except Exception as e:
             logger.error(f"Erro ao processar planilha de referência: {e}")
             return {}
     
+    @property
+    def name_index(self) -> ExamNameIndex:
+        """
+        Índice de busca aproximada sobre os nomes de exames
+        
+        Construído na primeira consulta após cada carga dos dados
+        """
+        if self._name_index is None:
+            self._name_index = ExamNameIndex(self.reference_data)
+        return self._name_index
+    
     def get_reference_for_exam(self, exam_name: str, 
                               sex: Optional[str] = None, 
                               age: Optional[int] = None) -> Dict[str, Any]:
@@ -185,89 +277,330 @@ class ExcelReferenceProcessor:
         Returns:
             Dicionário com valores de referência
         """
+        return self.get_references_for_exams([exam_name], sex, age)[0]
+    
+    def get_references_for_exams(self, exam_names: Sequence[str],
+                                 sex: Optional[str] = None,
+                                 age: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Obtém valores de referência para todos os exames de um laudo
+        
+        As referências de todos os exames são filtradas de uma vez: os
+        índices de todas elas na tabela pré-processada são reunidos em um
+        único vetor e sexo e idade são aplicados como uma máscara NumPy.
+        
+        Args:
+            exam_names: Nomes dos exames
+            sex: Sexo do paciente (M/F)
+            age: Idade do paciente
+            
+        Returns:
+            Lista, na ordem de `exam_names`, de dicionários com valores de
+            referência (ou com a chave 'error' se o exame não for encontrado)
+        """
         if not self.reference_data:
             self.load_reference_data()
         
-        # Normalizar nome do exame
-        exam_name_clean = exam_name.strip().lower()
+        # Cada nome distinto é resolvido uma única vez
+        resolved: Dict[str, Optional[str]] = {}
+        for exam_name in exam_names:
+            if exam_name not in resolved:
+                resolved[exam_name] = self._resolve_exam_key(exam_name)
+        keys = [resolved[exam_name] for exam_name in exam_names]
+        found = [key for key in keys if key is not None]
         
-        # Verificar correspondência direta
-        if exam_name_clean in self.reference_data:
-            exam_info = self.reference_data[exam_name_clean]
-        else:
-            # Verificar por correspondência parcial (contém)
-            potential_matches = []
-            for ref_name in self.reference_data:
-                if exam_name_clean in ref_name or ref_name in exam_name_clean:
-                    potential_matches.append(ref_name)
+        # Máscara de sexo/idade sobre as referências de todos os exames encontrados
+        masks = iter(())
+        literal_sex = bool(sex) and Sex.from_value(sex) == Sex.OTHER
+        if (sex or age) and found:
+            counts = np.fromiter((len(self.reference_data[key]['references']) for key in found),
+                                 dtype=np.int64, count=len(found))
+            starts = np.fromiter((self._ref_starts[key] for key in found), dtype=np.int64, count=len(found))
+            ends = np.cumsum(counts)
+            positions = np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - counts), counts)
             
-            if not potential_matches:
-                # Tentar matching mais flexível com nomes alternativos
-                for ref_name, exam_info in self.reference_data.items():
-                    for alt_name in exam_info['alternative_names']:
-                        if exam_name_clean in alt_name or alt_name in exam_name_clean:
-                            potential_matches.append(ref_name)
-                            break
+            mask = np.ones(len(positions), dtype=bool)
+            if sex:
+                ref_sex = self._sex[positions]
+                code = Sex.from_value(sex)
+                mask &= (ref_sex == Sex.ANY) | (ref_sex == code)
+            if age:
+                mask &= (self._age_min[positions] <= age) & (age < self._age_max[positions])
             
-            if not potential_matches:
-                return {"error": f"Exame não encontrado: {exam_name}"}
+            masks = iter(np.split(mask, ends[:-1]))
+        
+        results = []
+        for exam_name, exam_key in zip(exam_names, keys):
+            if exam_key is None:
+                results.append({"error": f"Exame não encontrado: {exam_name}"})
+                continue
+            
+            exam_info = self.reference_data[exam_key]
+            references = exam_info['references']
+            
+            # Se houver referências compatíveis, usar; caso contrário, usar todas
+            if sex or age:
+                selected = np.flatnonzero(next(masks))
+                if literal_sex:
+                    # Códigos não reconhecidos são comparados pelo texto original
+                    selected = [i for i in selected if references[i].get('sex', sex) == sex]
+                if len(selected):
+                    references = [references[i] for i in selected]
             
-            # Usar a correspondência mais próxima
-            # (poderia ser aprimorado com algoritmos de matching mais sofisticados)
-            exam_info = self.reference_data[potential_matches[0]]
-        
-        # Extrair referências
-        references = exam_info['references']
-        
-        # Filtrar por sexo e idade, se fornecidos
-        if sex or age:
-            filtered_refs = []
-            for ref in references:
-                sex_match = True
-                age_match = True
-                
-                # Verificar compatibilidade de sexo
-                if sex and 'sex' in ref and ref['sex'] != sex:
-                    sex_match = False
-                
-                # Verificar compatibilidade de idade
-                if age and 'age_range' in ref:
-                    age_range = ref['age_range']
-                    # Formatos comuns: "0-5", ">50", "<18", "Adulto"
-                    if '-' in age_range:
-                        try:
-                            min_age, max_age = map(int, age_range.split('-'))
-                            if age < min_age or age > max_age:
-                                age_match = False
-                        except:
-                            pass
-                    elif age_range.startswith('>'):
-                        try:
-                            min_age = int(age_range[1:])
-                            if age <= min_age:
-                                age_match = False
-                        except:
-                            pass
-                    elif age_range.startswith('<'):
-                        try:
-                            max_age = int(age_range[1:])
-                            if age >= max_age:
-                                age_match = False
-                        except:
-                            pass
-                
-                if sex_match and age_match:
-                    filtered_refs.append(ref)
+            results.append({
+                "name": exam_info['name'],
+                "alternative_names": exam_info['alternative_names'],
+                "units": exam_info['units'],
+                "references": references
+            })
+        
+        return results
+    
+    def enrich_exams(self, exams: List[Dict[str, Any]],
+                     sex: Optional[str] = None,
+                     age: Optional[int] = None) -> int:
+        """
+        Anexa `reference_data` a todos os exames de um laudo em uma única consulta
+        
+        Args:
+            exams: Exames extraídos (modificados no próprio lugar)
+            sex: Sexo do paciente (M/F)
+            age: Idade do paciente
+            
+        Returns:
+            Quantidade de exames enriquecidos
+        """
+        named = [exam for exam in exams if exam.get('name')]
+        if not named:
+            return 0
+        
+        enriched = 0
+        references = self.get_references_for_exams([exam['name'] for exam in named], sex, age)
+        for exam, ref_data in zip(named, references):
+            if 'error' not in ref_data:
+                exam['reference_data'] = ref_data
+                enriched += 1
+        
+        return enriched
+    
+    def _resolve_exam_key(self, exam_name: str) -> Optional[str]:
+        """
+        Nome indexado correspondente a um nome de exame
+        
+        Args:
+            exam_name: Nome do exame como aparece no laudo
             
-            # Se encontrou referências filtradas, usar; caso contrário, usar todas
-            if filtered_refs:
-                references = filtered_refs
-        
-        result = {
-            "name": exam_info['name'],
-            "alternative_names": exam_info['alternative_names'],
-            "units": exam_info['units'],
-            "references": references
+        Returns:
+            Chave em `reference_data` ou None se não houver candidato
+        """
+        # Verificar correspondência direta
+        exam_name_clean = exam_name.strip().lower()
+        if exam_name_clean in self.reference_data:
+            return exam_name_clean
+        
+        # Candidato mais similar entre nomes principais e alternativos
+        return self.name_index.best_match(exam_name_clean)
+
+def build_exam_reference(df: "pd.DataFrame") -> Dict[str, Any]:
+    """
+    Constrói o dicionário de referências a partir da planilha carregada
+    
+    Opera coluna a coluna: os textos são normalizados com os métodos `.str`
+    do pandas, os nomes alternativos são expandidos em linhas (`explode`),
+    e a primeira ocorrência de cada nome e de cada par (nome, unidade) é
+    marcada por hash (`duplicated`), sem buscas em listas. Unidades e
+    referências são então agregadas por nome em uma única passada sobre as
+    colunas já ordenadas. O resultado é o mesmo da leitura linha a linha anterior,
+    inclusive a ordem dos nomes, unidades e referências.
+    
+    Args:
+        df: Planilha de referência
+        
+    Returns:
+        Dicionário nome (principal ou alternativo) -> dados do exame
+    """
+    import pandas as pd
+    
+    df = df.copy(deep=False)
+    
+    # Limpar e padronizar nomes das colunas
+    df.columns = [col.strip().lower() for col in df.columns]
+    
+    # Ajustar nomes das colunas se necessário para variações comuns
+    column_mapping = {}
+    for col in df.columns:
+        if 'exame' in col or 'teste' in col:
+            column_mapping[col] = 'exame'
+        elif 'alternativo' in col or 'sinonimo' in col:
+            column_mapping[col] = 'nome_alternativo'
+        elif 'unidade' in col or 'medida' in col:
+            column_mapping[col] = 'unidade'
+        elif 'referencia' in col or 'valor' in col:
+            column_mapping[col] = 'referencia'
+        elif 'sexo' in col or 'genero' in col:
+            column_mapping[col] = 'sexo'
+        elif 'idade' in col or 'faixa' in col:
+            column_mapping[col] = 'idade'
+    
+    # Renomear colunas
+    if column_mapping:
+        df = df.rename(columns=column_mapping)
+    
+    available_columns = set(df.columns)
+    if 'exame' not in available_columns:
+        return {}
+    
+    # Referências por sexo/idade quando a planilha tem as duas colunas
+    by_sex_and_age = 'sexo' in available_columns and 'idade' in available_columns
+    
+    def column_text(column: str) -> "pd.Series":
+        if column not in available_columns:
+            return pd.Series("", index=df.index, dtype=object)
+        # str() por célula, como na leitura original: células vazias viram 'nan'
+        return df[column].map(str).astype(object).str.strip()
+    
+    rows = pd.DataFrame({
+        'exam': column_text('exame').str.lower(),
+        'alt': column_text('nome_alternativo').str.lower(),
+        'unit': column_text('unidade'),
+        'reference': column_text('referencia'),
+        'sex': column_text('sexo').str.upper() if by_sex_and_age else "",
+        'age_range': column_text('idade') if by_sex_and_age else ""
+    })
+    rows = rows[rows['exam'] != ""].reset_index(drop=True)
+    if rows.empty:
+        return {}
+    
+    # Nomes alternativos, um por linha (podem ser múltiplos separados por vírgula)
+    alt_names = rows['alt'][rows['alt'] != ""].str.split(',').explode().str.strip()
+    
+    # Todos os nomes de cada linha, na ordem: principal e depois alternativos
+    names = pd.concat([
+        pd.DataFrame({'row': rows.index, 'pos': 0, 'name': rows['exam']}),
+        pd.DataFrame({
+            'row': alt_names.index,
+            'pos': alt_names.groupby(level=0).cumcount().to_numpy() + 1,
+            'name': alt_names.to_numpy()
+        })
+    ], ignore_index=True)
+    names = names.sort_values(['row', 'pos'], kind='stable').reset_index(drop=True)
+    names = names.join(rows[['exam', 'unit', 'reference', 'sex', 'age_range']], on='row')
+    
+    # Primeira ocorrência de cada nome (define o nome oficial e os alternativos)
+    # e primeira ocorrência de cada unidade por nome
+    first_name = ~names['name'].duplicated()
+    first_unit = (names['unit'] != "") & ~names.duplicated(['name', 'unit'])
+    
+    # As linhas já estão na ordem de leitura, então basta anexar por nome
+    units: Dict[str, List[str]] = {}
+    for name, unit in zip(names.loc[first_unit, 'name'], names.loc[first_unit, 'unit']):
+        units.setdefault(name, []).append(unit)
+    
+    # Sem sexo/idade, uma referência só entra junto com uma unidade nova
+    has_reference = names['reference'] != ""
+    ref_rows = names[has_reference if by_sex_and_age else has_reference & (first_name | first_unit)]
+    
+    references: Dict[str, List[Dict[str, Any]]] = {}
+    for name, value, unit, sex, age_range in zip(ref_rows['name'], ref_rows['reference'], ref_rows['unit'],
+                                                 ref_rows['sex'], ref_rows['age_range']):
+        ref_entry = {'value': value, 'unit': unit}
+        if sex:
+            ref_entry['sex'] = sex
+        if age_range:
+            ref_entry['age_range'] = age_range
+        references.setdefault(name, []).append(ref_entry)
+    
+    # Listas de nomes alternativos apenas das linhas que criam entradas
+    first_rows = names.loc[first_name, 'row']
+    creating = alt_names[alt_names.index.isin(first_rows.unique())]
+    alt_lists: Dict[int, List[str]] = {}
+    for row, alt_name in zip(creating.index, creating):
+        alt_lists.setdefault(row, []).append(alt_name)
+    
+    exam_reference = {}
+    for name, row, exam in zip(names.loc[first_name, 'name'], first_rows, names.loc[first_name, 'exam']):
+        exam_reference[name] = {
+            'name': exam,  # Nome oficial
+            'alternative_names': alt_lists.get(row, []),
+            'units': units.get(name, []),
+            'references': references.get(name, [])
         }
+    
+    return exam_reference
+
+def parse_age_range(age_range: Optional[str]) -> Tuple[float, float]:
+    """
+    Converte uma faixa etária textual em um intervalo numérico [início, fim)
+    
+    Formatos reconhecidos (idades inteiras, em anos): "0-5" (inclusivo nas
+    duas pontas), ">50" e "<18". Faixas ausentes ou em formatos não
+    reconhecidos ("Adulto") não restringem a idade.
+    
+    Args:
+        age_range: Faixa etária da planilha
         
-        return result
\ No newline at end of file
+    Returns:
+        Tupla (início inclusivo, fim exclusivo)
+    """
+    unbounded = (-math.inf, math.inf)
+    if not age_range:
+        return unbounded
+    
+    try:
+        if '-' in age_range:
+            min_age, max_age = map(int, age_range.split('-'))
+            return float(min_age), float(max_age + 1)
+        if age_range.startswith('>'):
+            return float(int(age_range[1:]) + 1), math.inf
+        if age_range.startswith('<'):
+            return -math.inf, float(int(age_range[1:]))
+    except ValueError:
+        pass
+    
+    return unbounded
+
+# Processadores já carregados neste processo, por caminho da planilha.
+# A assinatura (mtime, tamanho) invalida a entrada quando o arquivo é editado
+_reference_processors: Dict[str, Tuple[Tuple[int, int], ExcelReferenceProcessor]] = {}
+_reference_processors_lock = threading.Lock()
+
+def get_reference_processor(excel_path: str) -> ExcelReferenceProcessor:
+    """
+    Obtém o processador de referências compartilhado do processo
+
+    A planilha é lida uma única vez por processo (e por versão do arquivo):
+    chamadas seguintes com o mesmo caminho devolvem o mesmo processador já
+    carregado, enquanto o mtime e o tamanho do arquivo não mudarem. Usado
+    pela extração em lote, pelo workflow da CLI e por processos de servidor.
+
+    Args:
+        excel_path: Caminho para o arquivo Excel
+
+    Returns:
+        Processador com os dados de referência carregados
+    """
+    if not os.path.exists(excel_path):
+        raise FileNotFoundError(f"Arquivo não encontrado: {excel_path}")
+
+    key = os.path.realpath(excel_path)
+    stat = os.stat(key)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _reference_processors_lock:
+        cached = _reference_processors.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        if cached:
+            logger.info(f"Planilha de referência alterada, recarregando: {excel_path}")
+
+        logger.info(f"Carregando valores de referência da planilha: {excel_path}")
+        processor = ExcelReferenceProcessor(excel_path)
+        processor.load_reference_data()
+        _reference_processors[key] = (signature, processor)
+        return processor
+
+def clear_reference_processors() -> None:
+    """Descarta os processadores de referência carregados neste processo"""
+    with _reference_processors_lock:
+        _reference_processors.clear()
@@ -0,0 +1,207 @@
+"""
+Cache persistente de extrações de PDF, endereçado pelo conteúdo do arquivo
+Evita reprocessar PDFs que não mudaram entre execuções em lote
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+from typing import Dict, Any, Optional, Tuple
+from . import __version__
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Diretório padrão do cache e limite de tamanho (em MB)
+EXTRACTION_CACHE_DIR = os.path.expanduser(os.getenv("BIOLAB_CACHE_DIR", os.path.join("~", ".cache", "biolab")))
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("BIOLAB_EXTRACTION_CACHE_MAX_MB", "512"))
+
+# Versão do formato extraído. Deve ser incrementada sempre que a saída dos
+# extratores mudar, invalidando as entradas antigas.
+EXTRACTION_SCHEMA_VERSION = "5"
+EXTRACTION_VERSION = f"{__version__}+{EXTRACTION_SCHEMA_VERSION}"
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo
+
+    Args:
+        path: Caminho para o arquivo
+        block_size: Tamanho do bloco de leitura em bytes
+
+    Returns:
+        Hash hexadecimal do conteúdo
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """
+    Cache em SQLite de payloads `_extracted.json`
+
+    As entradas são identificadas por (SHA-256 do PDF, versão da extração).
+    A classe do extrator não faz parte da chave: ela é escolhida a partir do
+    próprio conteúdo do PDF, então é determinada pelo hash e pela versão, e
+    fica gravada junto com o payload para ser devolvida sem abrir o PDF.
+    A remoção é LRU por tamanho total dos payloads comprimidos.
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_bytes: Optional[int] = None,
+                 version: str = EXTRACTION_VERSION):
+        """
+        Inicializa o cache, criando o banco se necessário
+
+        Args:
+            cache_dir: Diretório do banco SQLite
+            max_bytes: Tamanho máximo total dos payloads em bytes
+            version: Versão da extração usada na chave
+        """
+        self.cache_dir = cache_dir or EXTRACTION_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+        self.version = version
+        self.db_path = os.path.join(self.cache_dir, "extraction_cache.sqlite")
+
+        # Contadores da execução atual
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+
+        # Bancos antigos tinham a classe do extrator na chave primária
+        columns = self._conn.execute("PRAGMA table_info(extractions)").fetchall()
+        if any(name == "extractor" and pk for _, name, _, _, _, pk in columns):
+            logger.info(f"Recriando o cache de extrações com a nova chave: {self.db_path}")
+            self._conn.execute("DROP TABLE extractions")
+
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                sha256 TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (sha256, version)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extractions_access ON extractions (last_access)"
+        )
+        self._conn.commit()
+
+    def _version_key(self, variant: str) -> str:
+        """Versão usada na chave, incluindo opções que alteram a saída"""
+        return f"{self.version}:{variant}" if variant else self.version
+
+    def get(self, sha256: str, variant: str = "") -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Busca a extração de um PDF pelo hash do conteúdo
+
+        Args:
+            sha256: Hash do conteúdo do PDF
+            variant: Opções de extração que alteram a saída (ex.: motor de tabelas)
+
+        Returns:
+            Tupla (classe do extrator, payload) ou None se não estiver no cache
+        """
+        version = self._version_key(variant)
+        row = self._conn.execute(
+            "SELECT extractor, payload FROM extractions WHERE sha256 = ? AND version = ?",
+            (sha256, version)
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        extractor, payload = row
+        try:
+            data = json.loads(zlib.decompress(payload).decode('utf-8'))
+        except Exception as e:
+            logger.warning(f"Entrada de cache corrompida para {sha256}: {e}")
+            self.misses += 1
+            return None
+
+        self._conn.execute(
+            "UPDATE extractions SET last_access = ? WHERE sha256 = ? AND version = ?",
+            (time.time(), sha256, version)
+        )
+        self._conn.commit()
+        self.hits += 1
+        return extractor, data
+
+    def put(self, sha256: str, extractor: str, data: Dict[str, Any], variant: str = "") -> None:
+        """
+        Armazena a extração de um PDF
+
+        Args:
+            sha256: Hash do conteúdo do PDF
+            extractor: Nome da classe do extrator usado
+            data: Payload extraído (conteúdo do `_extracted.json`)
+            variant: Opções de extração que alteram a saída (ex.: motor de tabelas)
+        """
+        payload = zlib.compress(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extractions (sha256, extractor, version, payload, size, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (sha256, extractor, self._version_key(variant), payload, len(payload), time.time())
+        )
+        self._conn.commit()
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove as entradas acessadas há mais tempo até respeitar o limite de tamanho
+
+        Returns:
+            Número de entradas removidas
+        """
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        rows = self._conn.execute(
+            "SELECT sha256, version, size FROM extractions ORDER BY last_access ASC"
+        ).fetchall()
+        for sha256, version, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM extractions WHERE sha256 = ? AND version = ?",
+                (sha256, version)
+            )
+            total -= size
+            removed += 1
+
+        self._conn.commit()
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Retorna os contadores da execução atual
+
+        Returns:
+            Dicionário com acertos, falhas e remoções
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def close(self) -> None:
+        """Fecha a conexão com o banco"""
+        self._conn.close()
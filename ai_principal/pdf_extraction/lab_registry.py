@@ -0,0 +1,147 @@
+"""
+Registro de assinaturas de laboratórios para seleção de extratores
+Cada extrator especializado declara como reconhecer os laudos do seu
+laboratório; a detecção lê apenas os metadados e a primeira página do PDF
+"""
+
+import re
+import logging
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+from .aho_corasick import AhoCorasick
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class LabSignature:
+    """
+    Assinatura de um laboratório
+    """
+
+    def __init__(self,
+                 name: str,
+                 text_markers: Sequence[str] = (),
+                 metadata_markers: Optional[Dict[str, Sequence[str]]] = None,
+                 first_page_patterns: Sequence[str] = (),
+                 priority: int = 0):
+        """
+        Inicializa a assinatura
+
+        Args:
+            name: Nome do laboratório
+            text_markers: Termos procurados no texto da primeira página
+                          (sem distinção de maiúsculas/minúsculas)
+            metadata_markers: Termos procurados nos metadados do PDF, por campo
+                              (ex.: {'producer': ['LabSoft'], 'author': [...]})
+            first_page_patterns: Expressões regulares aplicadas à primeira página
+            priority: Critério de desempate entre laboratórios com a mesma pontuação
+        """
+        self.name = name
+        self.text_markers = [marker.lower() for marker in text_markers]
+        self.metadata_markers = {
+            field: [marker.lower() for marker in markers]
+            for field, markers in (metadata_markers or {}).items()
+        }
+        self.first_page_patterns = list(first_page_patterns)
+        self.priority = priority
+
+class LabRegistry:
+    """
+    Registro de extratores por assinatura de laboratório
+
+    Todos os termos de texto de todos os laboratórios são compilados em um
+    único autômato de Aho–Corasick e todas as expressões regulares em uma
+    única alternância, de modo que a primeira página é varrida uma vez
+    independentemente da quantidade de laboratórios registrados.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[type, LabSignature]] = []
+        self._automaton: Optional[AhoCorasick] = None
+        self._marker_owners: List[int] = []
+        self._combined_pattern: Optional["re.Pattern"] = None
+        self._pattern_owners: Dict[str, int] = {}
+
+    def register(self, extractor_cls: type) -> type:
+        """
+        Registra um extrator que declara o atributo de classe `SIGNATURE`
+
+        Pode ser usado como decorador de classe.
+
+        Args:
+            extractor_cls: Classe do extrator
+
+        Returns:
+            A própria classe
+        """
+        signature = getattr(extractor_cls, "SIGNATURE", None)
+        if not isinstance(signature, LabSignature):
+            raise ValueError(f"{extractor_cls.__name__} não declara uma LabSignature em SIGNATURE")
+
+        self._entries.append((extractor_cls, signature))
+        self._automaton = None
+        self._combined_pattern = None
+        return extractor_cls
+
+    def _compile(self) -> None:
+        """Compila o autômato de termos e a alternância de expressões regulares"""
+        markers = []
+        self._marker_owners = []
+        alternatives = []
+        self._pattern_owners = {}
+
+        for index, (_, signature) in enumerate(self._entries):
+            for marker in signature.text_markers:
+                markers.append(marker)
+                self._marker_owners.append(index)
+            for pattern in signature.first_page_patterns:
+                group = f"sig{len(alternatives)}"
+                alternatives.append(f"(?P<{group}>{pattern})")
+                self._pattern_owners[group] = index
+
+        self._automaton = AhoCorasick(markers)
+        self._combined_pattern = re.compile("|".join(alternatives), re.MULTILINE) if alternatives else None
+
+    def detect(self, metadata: Dict[str, Any], first_page_text: str) -> Optional[Tuple[type, LabSignature, int]]:
+        """
+        Identifica o laboratório a partir dos metadados e da primeira página
+
+        Args:
+            metadata: Metadados brutos do PDF (title, author, producer, ...)
+            first_page_text: Texto da primeira página
+
+        Returns:
+            Tupla (classe do extrator, assinatura, pontuação) ou None
+        """
+        if not self._entries:
+            return None
+        if self._automaton is None:
+            self._compile()
+
+        scores = [0] * len(self._entries)
+
+        # Termos de texto: uma única passada sobre a primeira página
+        for _, marker_id in self._automaton.iter_matches(first_page_text.lower()):
+            scores[self._marker_owners[marker_id]] += 1
+
+        # Expressões regulares: uma única alternância sobre a primeira página
+        if self._combined_pattern is not None:
+            for match in self._combined_pattern.finditer(first_page_text):
+                scores[self._pattern_owners[match.lastgroup]] += 1
+
+        # Metadados do PDF
+        for index, (_, signature) in enumerate(self._entries):
+            for field, markers in signature.metadata_markers.items():
+                value = str((metadata or {}).get(field) or "").lower()
+                if value and any(marker in value for marker in markers):
+                    scores[index] += 1
+
+        best = max(range(len(self._entries)), key=lambda i: (scores[i], self._entries[i][1].priority, -i))
+        if scores[best] == 0:
+            return None
+
+        extractor_cls, signature = self._entries[best]
+        return extractor_cls, signature, scores[best]
+
+# Registro global usado pela ExtractorFactory
+lab_registry = LabRegistry()
@@ -0,0 +1,201 @@
+"""
+Reconstrução de linhas de resultados a partir da geometria das palavras
+Recupera exames em laudos onde o texto sai "empilhado" (nome, valor, unidade
+e referência em linhas separadas), usando as coordenadas do PyMuPDF
+"""
+
+import re
+import logging
+import unicodedata
+from typing import Dict, List, Any, Optional, Sequence
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Valor numérico de resultado, opcionalmente seguido da unidade na mesma célula
+VALUE_CELL_PATTERN = re.compile(r"^([<>≤≥]?\s*[-+]?\d+(?:[.,]\d+)*)(?:\s+(.+))?$")
+# Início típico de um valor de referência ("13,0 a 16,5", "Até 1,0", "< 190")
+REFERENCE_START_PATTERN = re.compile(r"^(?:[<>≤≥]|\d|até\b|ate\b|inferior|superior|maior|menor)", re.IGNORECASE)
+# Unidades de tempo não são unidades de resultado ("Idade: 45 anos")
+TIME_UNIT_PATTERN = re.compile(r"^(?:anos?|mes(?:es)?|dias?|horas?)\b", re.IGNORECASE)
+
+# Termos das células de cabeçalho de uma tabela de resultados (sem acentos)
+HEADER_TERMS = ("exame", "resultado", "referencia", "unidade", "valor", "parametro", "analito")
+
+# Primeira palavra (sem acentos) dos rótulos do cabeçalho do paciente
+PATIENT_FIELD_LABELS = frozenset({
+    "paciente", "nome", "idade", "sexo", "genero", "data", "nascimento", "cpf", "rg", "id",
+    "prontuario", "medico", "medica", "solicitante", "convenio", "peso", "altura", "telefone",
+    "registro", "atendimento", "pedido", "crm", "dr", "dra", "protocolo", "os"
+})
+
+def _fold(text: str) -> str:
+    """Texto em minúsculas e sem acentos, para comparar rótulos"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+class LayoutRowReconstructor:
+    """
+    Agrupa palavras em linhas lógicas e identifica colunas de resultado
+
+    As palavras são ordenadas uma vez pela posição vertical e varridas em
+    uma única passada: cada palavra entra na linha corrente se o seu centro
+    vertical estiver dentro da tolerância, senão abre uma nova linha. Dentro
+    de cada linha, espaços horizontais largos separam as colunas (nome,
+    valor, unidade, referência). O custo total é O(n log n) no número de
+    palavras, dominado pela ordenação.
+    """
+
+    def __init__(self, row_tolerance: float = 0.4, column_gap: float = 0.8, max_name_length: int = 60):
+        """
+        Inicializa o reconstrutor
+
+        Args:
+            row_tolerance: Tolerância vertical, em frações da altura da palavra,
+                           para considerar duas palavras na mesma linha
+            column_gap: Espaço horizontal mínimo, em frações da altura da palavra,
+                        para separar duas colunas
+            max_name_length: Tamanho máximo aceito para o nome de um exame
+        """
+        self.row_tolerance = row_tolerance
+        self.column_gap = column_gap
+        self.max_name_length = max_name_length
+
+    def build_rows(self, words: Sequence[Sequence[Any]]) -> List[List[str]]:
+        """
+        Agrupa as palavras de uma página em linhas e colunas
+
+        Args:
+            words: Palavras no formato de `page.get_text("words")`
+                   (x0, y0, x1, y1, texto, ...)
+
+        Returns:
+            Lista de linhas, cada uma como lista de células de texto
+        """
+        ordered = sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+
+        rows = []
+        current = []
+        current_center = None
+        for word in ordered:
+            center = (word[1] + word[3]) / 2
+            height = max(word[3] - word[1], 1.0)
+            if current and abs(center - current_center) > self.row_tolerance * height:
+                rows.append(self._split_columns(current))
+                current = []
+            if not current:
+                current_center = center
+            current.append(word)
+
+        if current:
+            rows.append(self._split_columns(current))
+
+        return rows
+
+    def _split_columns(self, row_words: List[Sequence[Any]]) -> List[str]:
+        """Separa as palavras de uma linha em células pelos espaços horizontais largos"""
+        row_words = sorted(row_words, key=lambda w: w[0])
+
+        cells = []
+        cell = [row_words[0][4]]
+        previous = row_words[0]
+        for word in row_words[1:]:
+            height = max(previous[3] - previous[1], 1.0)
+            if word[0] - previous[2] > self.column_gap * height:
+                cells.append(" ".join(cell))
+                cell = []
+            cell.append(word[4])
+            previous = word
+        cells.append(" ".join(cell))
+
+        return cells
+
+    def parse_row(self, cells: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Interpreta uma linha como resultado de exame
+
+        A primeira célula numérica após o nome é o resultado; a célula
+        seguinte é a unidade, a menos que já pareça uma referência; o
+        restante das células forma o valor de referência.
+
+        Args:
+            cells: Células da linha
+
+        Returns:
+            Dicionário do exame ou None se a linha não for um resultado
+        """
+        for j in range(1, len(cells)):
+            match = VALUE_CELL_PATTERN.match(cells[j])
+            if match:
+                break
+        else:
+            return None
+
+        name = " ".join(cells[:j]).strip().rstrip(":").strip()
+        if sum(ch.isalpha() for ch in name) < 2 or len(name) > self.max_name_length:
+            return None
+
+        result = match.group(1).replace(" ", "")
+        unit = (match.group(2) or "").strip()
+        rest = cells[j + 1:]
+
+        if not unit and rest and not REFERENCE_START_PATTERN.match(rest[0]):
+            unit = rest[0]
+            rest = rest[1:]
+
+        return {
+            "name": name,
+            "result": result,
+            "unit": unit,
+            "reference": "   ".join(cell.strip() for cell in rest),
+            "source": "layout"
+        }
+
+    def is_header_row(self, cells: List[str]) -> bool:
+        """
+        Indica se a linha é o cabeçalho de uma tabela de resultados
+
+        Pelo menos duas células com termos de cabeçalho ("Exame",
+        "Resultado", "Referência", "Unidade", ...) e nenhuma célula numérica.
+        """
+        if any(VALUE_CELL_PATTERN.match(cell) for cell in cells):
+            return False
+        folded = [_fold(cell) for cell in cells]
+        return sum(1 for cell in folded if any(term in cell for term in HEADER_TERMS)) >= 2
+
+    def is_patient_field(self, name: str) -> bool:
+        """Indica se o nome é um rótulo do cabeçalho do paciente ("Idade", "Data da Coleta", ...)"""
+        words = _fold(name).replace(":", " ").split()
+        return bool(words) and words[0] in PATIENT_FIELD_LABELS
+
+    def extract_exams(self, words: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+        """
+        Extrai os exames de uma página a partir das palavras posicionadas
+
+        Uma linha só é aceita com evidência de tabela de resultados: um
+        cabeçalho de tabela acima dela na página, ou colunas de unidade ou de
+        referência na própria linha. Rótulos do cabeçalho do paciente
+        ("Idade:   45 anos") são descartados.
+
+        Args:
+            words: Palavras no formato de `page.get_text("words")`
+
+        Returns:
+            Lista de dicionários com dados dos exames
+        """
+        exams = []
+        header_seen = False
+        for cells in self.build_rows(words):
+            if self.is_header_row(cells):
+                header_seen = True
+                continue
+
+            exam = self.parse_row(cells)
+            if not exam or self.is_patient_field(exam["name"]):
+                continue
+
+            has_unit = bool(exam["unit"]) and not TIME_UNIT_PATTERN.match(exam["unit"])
+            if header_seen or has_unit or exam["reference"]:
+                exams.append(exam)
+        return exams
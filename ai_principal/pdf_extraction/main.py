@@ -3,13 +3,17 @@ Módulo principal para processamento de PDFs de exames
 """
 
 import os
+import sys
+import time
 import argparse
 import logging
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from .specialized_extractors import ExtractorFactory
-from .excel_reference import ExcelReferenceProcessor
+from .excel_reference import get_reference_processor
+from .extraction_cache import ExtractionCache, EXTRACTION_CACHE_DIR, file_sha256
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -17,7 +21,9 @@ logger = logging.getLogger(__name__)
 
 def process_pdf_file(pdf_path: str, 
                     reference_path: Optional[str] = None,
-                    output_dir: Optional[str] = None) -> Dict[str, Any]:
+                    output_dir: Optional[str] = None,
+                    cache: Optional[ExtractionCache] = None,
+                    table_engine: str = "pdfplumber") -> Dict[str, Any]:
     """
     Processa um arquivo PDF de exame
     
@@ -25,6 +31,8 @@ def process_pdf_file(pdf_path: str,
         pdf_path: Caminho para o arquivo PDF
         reference_path: Caminho para a planilha de referência (opcional)
         output_dir: Diretório para os arquivos de saída (opcional)
+        cache: Cache de extrações (opcional). Em caso de acerto, o PDF não é aberto
+        table_engine: Motor de extração de tabelas ('pdfplumber', 'pymupdf' ou 'auto')
         
     Returns:
         Dicionário com os dados extraídos
@@ -43,12 +51,23 @@ def process_pdf_file(pdf_path: str,
     else:
         output_dir = os.path.dirname(pdf_path)
     
-    # Criar extrator apropriado para o formato do PDF
-    extractor = ExtractorFactory.create_extractor(pdf_path)
+    # Consultar o cache pelo hash do conteúdo do PDF
+    digest = file_sha256(pdf_path) if cache else None
+    cached = cache.get(digest, variant=table_engine) if cache else None
     
-    # Extrair dados do PDF
-    logger.info(f"Extraindo dados do PDF: {pdf_path}")
-    extracted_data = extractor.extract_all()
+    if cached:
+        extractor_name, extracted_data = cached
+        logger.info(f"Extração recuperada do cache ({extractor_name}): {pdf_path}")
+    else:
+        # Criar extrator apropriado para o formato do PDF
+        extractor = ExtractorFactory.create_extractor(pdf_path, table_engine=table_engine)
+        
+        # Extrair dados do PDF
+        logger.info(f"Extraindo dados do PDF: {pdf_path}")
+        extracted_data = extractor.extract_all()
+        
+        if cache:
+            cache.put(digest, type(extractor).__name__, extracted_data, variant=table_engine)
     
     # Salvar dados extraídos
     pdf_name = Path(pdf_path).stem
@@ -62,46 +81,167 @@ def process_pdf_file(pdf_path: str,
     # Enriquecer com valores de referência, se disponível
     if reference_path and extracted_data.get('exams'):
         try:
-            # Carregar processador de referências
-            logger.info(f"Carregando valores de referência da planilha: {reference_path}")
-            reference_processor = ExcelReferenceProcessor(reference_path)
-            reference_processor.load_reference_data()
+            # Processador de referências compartilhado: a planilha é lida uma
+            # única vez por processo, e não a cada PDF
+            reference_processor = get_reference_processor(reference_path)
             
             # Dados do paciente para filtros
             patient = extracted_data.get('patient', {})
-            sex = patient.get('gender')
-            age = patient.get('age')
-            
-            # Enriquecer cada exame com valores de referência
-            for exam in extracted_data['exams']:
-                exam_name = exam.get('name', '')
-                if not exam_name:
-                    continue
-                
-                # Obter referências para este exame
-                ref_data = reference_processor.get_reference_for_exam(exam_name, sex, age)
-                
-                # Adicionar dados de referência ao exame
-                if 'error' not in ref_data:
-                    exam['reference_data'] = ref_data
-            
-            # Salvar dados enriquecidos
-            output_enriched_path = os.path.join(output_dir, f"{pdf_name}_enriched.json")
             
-            with open(output_enriched_path, 'w', encoding='utf-8') as f:
-                json.dump(extracted_data, f, ensure_ascii=False, indent=2)
+            # Enriquecer todos os exames do laudo em uma única consulta
+            reference_processor.enrich_exams(extracted_data['exams'], patient.get('gender'), patient.get('age'))
             
-            logger.info(f"Dados enriquecidos salvos em: {output_enriched_path}")
+            _save_enriched(pdf_path, output_dir, extracted_data)
             
         except Exception as e:
             logger.error(f"Erro ao enriquecer dados com valores de referência: {e}")
     
     return extracted_data
 
+def _save_enriched(pdf_path: str, output_dir: str, data: Dict[str, Any]) -> str:
+    """
+    Salva os dados enriquecidos com valores de referência
+    
+    Args:
+        pdf_path: Caminho para o arquivo PDF
+        output_dir: Diretório dos arquivos de saída
+        data: Dados extraídos e enriquecidos
+        
+    Returns:
+        Caminho do arquivo salvo
+    """
+    output_enriched_path = os.path.join(output_dir, f"{Path(pdf_path).stem}_enriched.json")
+    
+    with open(output_enriched_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    
+    logger.info(f"Dados enriquecidos salvos em: {output_enriched_path}")
+    return output_enriched_path
+
+def _summarize_result(pdf_path: str,
+                      output_dir: Optional[str],
+                      data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resume o resultado de um PDF sem o texto bruto e as tabelas
+    
+    Args:
+        pdf_path: Caminho para o arquivo PDF
+        output_dir: Diretório dos arquivos de saída (opcional)
+        data: Dados extraídos do PDF
+        
+    Returns:
+        Dicionário com caminhos de saída e contadores
+    """
+    pdf_name = Path(pdf_path).stem
+    output_dir = output_dir or os.path.dirname(pdf_path)
+    exams = data.get('exams', [])
+    
+    summary = {
+        "pdf_path": pdf_path,
+        "extracted_json": os.path.join(output_dir, f"{pdf_name}_extracted.json"),
+        "enriched_json": None,
+        "exams": len(exams),
+        "pages": data.get('metadata', {}).get('pages') or 0
+    }
+    
+    if any('reference_data' in exam for exam in exams):
+        summary["enriched_json"] = os.path.join(output_dir, f"{pdf_name}_enriched.json")
+    
+    return summary
+
+# Cache de extrações aberto por processo (conexões SQLite não são compartilhadas entre processos)
+_process_caches: Dict[str, ExtractionCache] = {}
+
+def _get_process_cache(cache_dir: Optional[str]) -> Optional[ExtractionCache]:
+    """
+    Obtém o cache de extrações deste processo para o diretório informado
+    
+    Args:
+        cache_dir: Diretório do cache (None desativa o cache)
+        
+    Returns:
+        Instância do cache ou None
+    """
+    if not cache_dir:
+        return None
+    if cache_dir not in _process_caches:
+        _process_caches[cache_dir] = ExtractionCache(cache_dir)
+    return _process_caches[cache_dir]
+
+def _process_pdf_worker(pdf_path: str,
+                        reference_path: Optional[str],
+                        output_dir: Optional[str],
+                        return_data: bool,
+                        cache_dir: Optional[str] = None,
+                        table_engine: str = "pdfplumber") -> Dict[str, Any]:
+    """
+    Processa um PDF isoladamente, capturando qualquer erro
+    
+    Executada nos processos do pool, por isso precisa estar no nível do módulo.
+    
+    Returns:
+        Dicionário com 'data' (dados completos ou resumo), 'pages', 'cached' e 'error'
+    """
+    try:
+        cache = _get_process_cache(cache_dir)
+        hits_before = cache.hits if cache else 0
+        
+        data = process_pdf_file(pdf_path, reference_path=reference_path, output_dir=output_dir,
+                                cache=cache, table_engine=table_engine)
+        summary = _summarize_result(pdf_path, output_dir, data)
+        return {
+            "data": data if return_data else summary,
+            "pages": summary["pages"],
+            "cached": cache is not None and cache.hits > hits_before,
+            "error": None
+        }
+    except Exception as e:
+        return {"data": None, "pages": 0, "cached": False, "error": str(e)}
+
+class _ThroughputCounter:
+    """
+    Contador de vazão exibido em uma única linha do terminal (PDFs/s e páginas/s)
+    """
+    
+    def __init__(self, total: int, enabled: bool = True):
+        self.total = total
+        self.enabled = enabled
+        self.done = 0
+        self.pages = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+    
+    def update(self, pages: int, error: bool = False) -> None:
+        self.done += 1
+        self.pages += pages
+        if error:
+            self.errors += 1
+        self._render(end="")
+    
+    def finish(self) -> None:
+        self._render(end="\n")
+    
+    def _render(self, end: str) -> None:
+        if not self.enabled:
+            return
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        sys.stderr.write(
+            f"\r{self.done}/{self.total} PDFs | "
+            f"{self.done / elapsed:.2f} PDFs/s | "
+            f"{self.pages / elapsed:.1f} páginas/s | "
+            f"{self.errors} erros{end}"
+        )
+        sys.stderr.flush()
+
 def process_directory(dir_path: str, 
                      reference_path: Optional[str] = None,
                      output_dir: Optional[str] = None,
-                     file_pattern: str = "*.pdf") -> List[Dict[str, Any]]:
+                     file_pattern: str = "*.pdf",
+                     workers: int = 1,
+                     return_data: bool = True,
+                     show_progress: bool = True,
+                     cache_dir: Optional[str] = None,
+                     table_engine: str = "pdfplumber") -> List[Dict[str, Any]]:
     """
     Processa todos os PDFs em um diretório
     
@@ -110,33 +250,84 @@ def process_directory(dir_path: str,
         reference_path: Caminho para a planilha de referência (opcional)
         output_dir: Diretório para os arquivos de saída (opcional)
         file_pattern: Padrão para filtrar arquivos
+        workers: Número de processos paralelos (1 processa no próprio processo)
+        return_data: Se False, retorna apenas um resumo por PDF (caminhos de
+                     saída e contadores) em vez de texto bruto e tabelas
+        show_progress: Exibe o contador de vazão no stderr
+        cache_dir: Diretório do cache de extrações (None desativa o cache)
+        table_engine: Motor de extração de tabelas ('pdfplumber', 'pymupdf' ou 'auto')
         
     Returns:
-        Lista de dicionários com os dados extraídos de cada PDF
+        Lista de dicionários com os dados extraídos de cada PDF (ou seus resumos),
+        na mesma ordem dos arquivos encontrados
     """
     # Validar caminhos
     if not os.path.isdir(dir_path):
         raise NotADirectoryError(f"Diretório não encontrado: {dir_path}")
     
-    # Listar arquivos PDF no diretório
-    pdf_files = list(Path(dir_path).glob(file_pattern))
+    # Listar arquivos PDF no diretório (ordenados para resultados determinísticos)
+    pdf_files = sorted(Path(dir_path).glob(file_pattern))
     
     if not pdf_files:
         logger.warning(f"Nenhum arquivo correspondente ao padrão '{file_pattern}' encontrado em: {dir_path}")
         return []
     
-    # Processar cada arquivo
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    if reference_path and not os.path.exists(reference_path):
+        logger.warning(f"Planilha de referência não encontrada: {reference_path}")
+        reference_path = None
+    
+    # Cada processo trabalhador enriquece e salva os seus próprios documentos
+    # com o processador de referências do processo (`get_reference_processor`),
+    # e devolve apenas o resumo quando `return_data` é False. A planilha é
+    # carregada aqui antes do pool: com fork, os trabalhadores herdam o
+    # processador já carregado; nos demais casos, abrem o snapshot compilado
+    if reference_path:
+        get_reference_processor(reference_path)
+    
+    counter = _ThroughputCounter(len(pdf_files), enabled=show_progress)
+    outcomes: List[Optional[Dict[str, Any]]] = [None] * len(pdf_files)
+    
+    def collect(i: int, outcome: Dict[str, Any]) -> None:
+        outcomes[i] = outcome
+        counter.update(outcome["pages"], error=outcome["error"] is not None)
+    
+    if workers <= 1:
+        # Processar cada arquivo no próprio processo
+        for i, pdf_file in enumerate(pdf_files):
+            collect(i, _process_pdf_worker(str(pdf_file), reference_path, output_dir, return_data,
+                                           cache_dir, table_engine))
+    else:
+        # Distribuir os arquivos entre os processos do pool
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_process_pdf_worker, str(pdf_file), reference_path, output_dir,
+                                return_data, cache_dir, table_engine): i
+                for i, pdf_file in enumerate(pdf_files)
+            }
+            for future in as_completed(futures):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    # Falha do próprio processo trabalhador (ex.: processo encerrado)
+                    outcome = {"data": None, "pages": 0, "cached": False, "error": str(e)}
+                collect(futures[future], outcome)
+    
+    counter.finish()
+    
+    if cache_dir:
+        hits = sum(1 for outcome in outcomes if outcome["cached"])
+        logger.info(f"Cache de extração: {hits} acertos, {len(outcomes) - hits} falhas")
+    
+    # Consolidar resultados na ordem dos arquivos
     results = []
-    for pdf_file in pdf_files:
-        try:
-            data = process_pdf_file(
-                str(pdf_file), 
-                reference_path=reference_path,
-                output_dir=output_dir
-            )
-            results.append(data)
-        except Exception as e:
-            logger.error(f"Erro ao processar arquivo {pdf_file}: {e}")
+    for pdf_file, outcome in zip(pdf_files, outcomes):
+        if outcome["error"] is not None:
+            logger.error(f"Erro ao processar arquivo {pdf_file}: {outcome['error']}")
+            continue
+        results.append(outcome["data"])
     
     return results
 
@@ -154,16 +345,25 @@ def main():
     parser.add_argument("--reference", type=str, help="Caminho para planilha de referência")
     parser.add_argument("--output", type=str, help="Diretório para arquivos de saída")
     parser.add_argument("--pattern", type=str, default="*.pdf", help="Padrão para filtrar arquivos (para --dir)")
+    parser.add_argument("--workers", type=int, default=1, help="Número de processos paralelos (para --dir)")
+    parser.add_argument("--cache-dir", type=str, default=EXTRACTION_CACHE_DIR, help="Diretório do cache de extrações")
+    parser.add_argument("--no-cache", action="store_true", help="Desativar o cache de extrações")
+    parser.add_argument("--table-engine", type=str, default="pdfplumber", choices=["pdfplumber", "pymupdf", "auto"],
+                        help="Motor de extração de tabelas")
     
     args = parser.parse_args()
     
+    cache_dir = None if args.no_cache else args.cache_dir
+    
     try:
         if args.pdf:
             # Processar um único PDF
             process_pdf_file(
                 args.pdf,
                 reference_path=args.reference,
-                output_dir=args.output
+                output_dir=args.output,
+                cache=ExtractionCache(cache_dir) if cache_dir else None,
+                table_engine=args.table_engine
             )
         else:
             # Processar diretório
@@ -171,7 +371,11 @@ def main():
                 args.dir,
                 reference_path=args.reference,
                 output_dir=args.output,
-                file_pattern=args.pattern
+                file_pattern=args.pattern,
+                workers=args.workers,
+                return_data=False,
+                cache_dir=cache_dir,
+                table_engine=args.table_engine
             )
     except Exception as e:
         logger.error(f"Erro durante o processamento: {e}")
@@ -0,0 +1,187 @@
+"""
+Índice de nomes de exames para busca aproximada
+Indexa nomes principais e alternativos por palavras e trigramas de
+caracteres, e ordena os candidatos por similaridade
+"""
+
+import re
+import logging
+import unicodedata
+import numpy as np
+from functools import lru_cache
+from typing import Dict, List, Iterable, Optional, Tuple
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_exam_name(name: str) -> str:
+    """
+    Normaliza um nome de exame para comparação
+
+    Minúsculas, sem acentos e com qualquer sequência de caracteres não
+    alfanuméricos reduzida a um espaço ("Glicose - Jejum" -> "glicose jejum").
+
+    Args:
+        name: Nome do exame
+
+    Returns:
+        Nome normalizado
+    """
+    decomposed = unicodedata.normalize("NFKD", name.lower())
+    without_accents = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", without_accents).strip()
+
+def _trigrams(normalized: str) -> set:
+    """Trigramas de cada palavra, com preenchimento nas bordas (como no pg_trgm)"""
+    grams = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class ExamNameIndex:
+    """
+    Índice invertido de nomes de exames
+
+    Cada nome é indexado uma vez pelos seus trigramas de caracteres e pelas
+    suas palavras, em listas de postagens (vetores NumPy). Uma consulta soma
+    as postagens dos seus trigramas e palavras com `bincount`, obtendo de
+    uma vez, para todos os nomes, a quantidade de trigramas e de palavras em
+    comum, e pontua por:
+
+    - similaridade de Dice entre os trigramas;
+    - sobreposição de Jaccard entre as palavras;
+    - bônus quando um nome contém o outro como sequência de palavras inteiras
+      ("glicose" em "glicose jejum").
+
+    Os resultados são memorizados em um LRU pela forma normalizada da consulta.
+    """
+
+    # Pesos da pontuação
+    TRIGRAM_WEIGHT = 0.6
+    TOKEN_WEIGHT = 0.4
+    CONTAINMENT_BONUS = 0.5
+
+    def __init__(self, names: Iterable[str], min_score: float = 0.5,
+                 cache_size: int = 4096, max_results: int = 10):
+        """
+        Constrói o índice
+
+        Args:
+            names: Nomes indexados (principais e alternativos), na ordem de
+                   preferência usada para desempates
+            min_score: Pontuação mínima para aceitar um candidato que não
+                       contém nem está contido na consulta
+            cache_size: Quantidade de consultas memorizadas
+            max_results: Quantidade máxima de candidatos guardados por consulta
+        """
+        self.min_score = min_score
+        self.max_results = max_results
+        self._names: List[str] = []
+        self._normalized: List[str] = []
+        self._exact: Dict[str, int] = {}
+        trigram_postings: Dict[str, List[int]] = {}
+        token_postings: Dict[str, List[int]] = {}
+        trigram_counts = []
+        token_counts = []
+
+        for name in names:
+            normalized = normalize_exam_name(name)
+            if not normalized or normalized in self._exact:
+                continue
+
+            name_id = len(self._names)
+            grams = _trigrams(normalized)
+            tokens = set(normalized.split())
+            self._names.append(name)
+            self._normalized.append(normalized)
+            self._exact[normalized] = name_id
+            trigram_counts.append(len(grams))
+            token_counts.append(len(tokens))
+            for gram in grams:
+                trigram_postings.setdefault(gram, []).append(name_id)
+            for token in tokens:
+                token_postings.setdefault(token, []).append(name_id)
+
+        self._trigram_postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in trigram_postings.items()}
+        self._token_postings = {token: np.asarray(ids, dtype=np.int32) for token, ids in token_postings.items()}
+        self._trigram_counts = np.asarray(trigram_counts, dtype=np.float64)
+        self._token_counts = np.asarray(token_counts, dtype=np.float64)
+
+        self._search_normalized = lru_cache(maxsize=cache_size)(self._rank)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """
+        Candidatos mais similares a uma consulta
+
+        Args:
+            query: Nome do exame procurado
+            limit: Quantidade máxima de candidatos (até `max_results`)
+
+        Returns:
+            Lista de tuplas (nome indexado, pontuação), da maior para a menor
+        """
+        normalized = normalize_exam_name(query)
+        if not normalized:
+            return []
+        return list(self._search_normalized(normalized)[:limit])
+
+    def best_match(self, query: str) -> Optional[str]:
+        """
+        Melhor candidato para uma consulta
+
+        Args:
+            query: Nome do exame procurado
+
+        Returns:
+            Nome indexado ou None se nenhum candidato for aceito
+        """
+        ranked = self.search(query, limit=1)
+        return ranked[0][0] if ranked else None
+
+    def cache_info(self):
+        """Estatísticas do LRU de consultas"""
+        return self._search_normalized.cache_info()
+
+    def _shared(self, postings: Dict[str, np.ndarray], keys: Iterable[str]) -> np.ndarray:
+        """Quantidade de chaves em comum com a consulta, para cada nome indexado"""
+        arrays = [postings[key] for key in keys if key in postings]
+        if not arrays:
+            return np.zeros(len(self._names), dtype=np.float64)
+        return np.bincount(np.concatenate(arrays), minlength=len(self._names)).astype(np.float64)
+
+    def _rank(self, normalized: str) -> Tuple[Tuple[str, float], ...]:
+        """Ordena os candidatos de uma consulta normalizada"""
+        name_id = self._exact.get(normalized)
+        if name_id is not None:
+            return ((self._names[name_id], 1.0 + self.CONTAINMENT_BONUS),)
+        if not self._names:
+            return ()
+
+        grams = _trigrams(normalized)
+        tokens = set(normalized.split())
+        shared_grams = self._shared(self._trigram_postings, grams)
+        shared_tokens = self._shared(self._token_postings, tokens)
+
+        dice = 2 * shared_grams / (len(grams) + self._trigram_counts)
+        jaccard = shared_tokens / (len(tokens) + self._token_counts - shared_tokens)
+        scores = self.TRIGRAM_WEIGHT * dice + self.TOKEN_WEIGHT * jaccard
+
+        # Contenção só é possível quando todas as palavras de um dos lados
+        # estão no outro; a ordem das palavras é conferida apenas nesses casos
+        padded_query = f" {normalized} "
+        possible = np.flatnonzero((shared_tokens == self._token_counts) | (shared_tokens == len(tokens)))
+        for candidate in possible[shared_tokens[possible] > 0]:
+            padded_candidate = f" {self._normalized[candidate]} "
+            if padded_candidate in padded_query or padded_query in padded_candidate:
+                scores[candidate] += self.CONTAINMENT_BONUS
+
+        accepted = np.flatnonzero(scores >= self.min_score)
+        order = accepted[np.lexsort((accepted, -scores[accepted]))][:self.max_results]
+        return tuple((self._names[candidate], float(scores[candidate])) for candidate in order)
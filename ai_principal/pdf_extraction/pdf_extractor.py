@@ -6,11 +6,12 @@ import os
 import re
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 from datetime import datetime
-import fitz  # PyMuPDF
-import pdfplumber
 from pathlib import Path
+from .document_session import PDFDocumentSession
+from .layout_rows import LayoutRowReconstructor
+from .section_index import SectionIndex, FieldPatternSet, SECTION_HEADERS
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -21,21 +22,84 @@ class PDFExtractor:
     Classe base para extração de dados de PDFs de exames médicos
     """
     
-    def __init__(self, pdf_path: str):
+    # Limiares da seleção de motor por página: páginas com pelo menos esta
+    # quantidade de linhas de grade em cada direção são tratadas como tabulares,
+    # e páginas com menos caracteres do que isto no PyMuPDF são reprocessadas
+    MIN_RULING_LINES = 2
+    MIN_PAGE_TEXT_CHARS = 20
+    
+    # Motores de extração de tabelas disponíveis
+    TABLE_ENGINES = ("pdfplumber", "pymupdf", "auto")
+    
+    # Padrões dos dados do paciente, por campo, em ordem de preferência.
+    # Cada padrão começa por uma das palavras-chave do campo, que são
+    # localizadas uma única vez pelo índice de seções
+    PATIENT_FIELDS = FieldPatternSet({
+        "name": (("Paciente", "Nome", "PACIENTE", "NOME"), [
+            r"(?:Paciente|Nome)[\s:]+([\w\s]+?)(?:\n|\r|,|Idade)",
+            r"(?:PACIENTE|NOME)[\s:]+([\w\s]+?)(?:\n|\r|,|IDADE)",
+        ]),
+        "age": (("Idade", "Age", "IDADE", "AGE"), [
+            r"(?:Idade|Age)[\s:]+(\d+)",
+            r"(?:IDADE|AGE)[\s:]+(\d+)",
+        ]),
+        "gender": (("Sexo", "Gênero", "SEXO", "GÊNERO"), [
+            r"(?:Sexo|Gênero)[\s:]+(M|F|Masculino|Feminino)",
+            r"(?:SEXO|GÊNERO)[\s:]+(M|F|MASCULINO|FEMININO)",
+        ]),
+        "exam_date": (("Data", "Date", "DATA", "DATE"), [
+            r"(?:Data|Date|Data da Coleta)[\s:]+(\d{2}/\d{2}/\d{4})",
+            r"(?:DATA|DATE|DATA DA COLETA)[\s:]+(\d{2}/\d{2}/\d{4})",
+            r"(?:Data|Date|Data da Coleta)[\s:]+(\d{2}-\d{2}-\d{4})",
+            r"(?:DATA|DATE|DATA DA COLETA)[\s:]+(\d{2}-\d{2}-\d{4})",
+        ]),
+    })
+    
+    # Cabeçalhos e rótulos indexados em cada documento
+    INDEX_KEYWORDS = SECTION_HEADERS + tuple(PATIENT_FIELDS.keywords)
+    
+    def __init__(self, pdf_path: str,
+                 session: Optional[PDFDocumentSession] = None,
+                 table_engine: str = "pdfplumber"):
         """
         Inicializa o extrator com o caminho para o PDF
         
         Args:
             pdf_path: Caminho para o arquivo PDF
+            session: Sessão de documento já aberta (opcional). Permite
+                     reaproveitar o texto e as tabelas já lidos pela fábrica
+            table_engine: Motor de tabelas: 'pdfplumber', 'pymupdf' ou 'auto'
+                          (PyMuPDF, recorrendo ao pdfplumber quando não encontra tabelas)
         """
+        if table_engine not in self.TABLE_ENGINES:
+            raise ValueError(f"Motor de tabelas inválido: {table_engine}")
+        
         self.pdf_path = pdf_path
+        self.table_engine = table_engine
         self.text = ""
+        self.tables: Optional[List[List[List[str]]]] = None
         self.extracted_data = {}
+        self._section_index: Optional[SectionIndex] = None
         
         # Validar existência do arquivo
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"Arquivo não encontrado: {pdf_path}")
+        
+        # Sessão única de leitura do PDF, compartilhada por todos os métodos
+        self.session = session or PDFDocumentSession(pdf_path)
     
+    @property
+    def section_index(self) -> SectionIndex:
+        """
+        Índice de cabeçalhos e rótulos do texto extraído
+
+        Construído em uma única passada na primeira consulta e reconstruído
+        apenas se o texto mudar
+        """
+        if self._section_index is None or self._section_index.text is not self.text:
+            self._section_index = SectionIndex(self.text, self.INDEX_KEYWORDS)
+        return self._section_index
+
     def extract_text_pymupdf(self) -> str:
         """
         Extrai texto do PDF usando PyMuPDF (mais rápido)
@@ -45,10 +109,7 @@ class PDFExtractor:
         """
         text = ""
         try:
-            doc = fitz.open(self.pdf_path)
-            for page in doc:
-                text += page.get_text()
-            doc.close()
+            text = self.session.get_text_pymupdf()
         except Exception as e:
             logger.error(f"Erro ao extrair texto com PyMuPDF: {e}")
         
@@ -63,9 +124,7 @@ class PDFExtractor:
         """
         text = ""
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                for page in pdf.pages:
-                    text += page.extract_text() or ""
+            text = self.session.get_text_pdfplumber()
         except Exception as e:
             logger.error(f"Erro ao extrair texto com pdfplumber: {e}")
         
@@ -80,16 +139,178 @@ class PDFExtractor:
         """
         tables = []
         try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_tables = page.extract_tables()
-                    if page_tables:
-                        tables.extend(page_tables)
+            tables = self.session.get_tables()
         except Exception as e:
             logger.error(f"Erro ao extrair tabelas com pdfplumber: {e}")
         
         return tables
     
+    def _select_page_engine(self, page_index: int, text_pymupdf: str) -> Optional[str]:
+        """
+        Decide se uma página precisa do pdfplumber
+        
+        Args:
+            page_index: Índice da página (base 0)
+            text_pymupdf: Texto da página extraído pelo PyMuPDF
+            
+        Returns:
+            Motivo para acionar o pdfplumber ('tabular' ou 'low_text'),
+            ou None se o PyMuPDF for suficiente
+        """
+        if len(text_pymupdf.strip()) < self.MIN_PAGE_TEXT_CHARS:
+            return "low_text"
+        
+        try:
+            horizontal, vertical = self.session.get_page_ruling_lines(page_index)
+        except Exception as e:
+            logger.error(f"Erro ao analisar desenhos da página {page_index + 1}: {e}")
+            return "tabular"
+        
+        if horizontal >= self.MIN_RULING_LINES and vertical >= self.MIN_RULING_LINES:
+            return "tabular"
+        
+        return None
+    
+    def iter_pages(self) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre o PDF página a página
+        
+        O texto de cada página é extraído primeiro com PyMuPDF. Tabelas só são
+        procuradas em páginas com linhas de grade, com o motor configurado em
+        `table_engine`. O pdfplumber (bem mais lento) só extrai texto quando o
+        PyMuPDF retorna pouco texto ou quando também é o motor de tabelas;
+        nesses casos fica o texto que parece mais completo. Depois que a página é
+        consumida, o texto, as tabelas e as linhas de grade da página saem dos
+        caches da sessão e os objetos de layout do pdfplumber são liberados,
+        então a memória não cresce com o número de páginas.
+        
+        Yields:
+            Dicionário com 'page_number' (base 1), 'text', 'tables', 'engine'
+            (motor que produziu o texto) e os deslocamentos 'start'/'end' do
+            texto da página no texto completo
+        """
+        offset = 0
+        for i in range(self.session.page_count):
+            text_pymupdf = ""
+            tables = []
+            
+            try:
+                text_pymupdf = self.session.get_page_text_pymupdf(i)
+            except Exception as e:
+                logger.error(f"Erro ao extrair texto com PyMuPDF (página {i + 1}): {e}")
+            
+            text = text_pymupdf
+            engine = "pymupdf"
+            reason = self._select_page_engine(i, text_pymupdf)
+            
+            if reason:
+                try:
+                    tables = self._extract_page_tables(i)
+                except Exception as e:
+                    logger.error(f"Erro ao extrair tabelas com {self.table_engine} (página {i + 1}): {e}")
+            
+            # Com tabelas via PyMuPDF, páginas tabulares não precisam do texto do pdfplumber
+            if reason == "low_text" or (reason == "tabular" and self.table_engine == "pdfplumber"):
+                text_pdfplumber = ""
+                try:
+                    text_pdfplumber = self.session.get_page_text_pdfplumber(i)
+                except Exception as e:
+                    logger.error(f"Erro ao extrair texto com pdfplumber (página {i + 1}): {e}")
+                
+                # Usar o texto que parece mais completo/preciso
+                if len(text_pdfplumber) > len(text_pymupdf):
+                    text = text_pdfplumber
+                    engine = "pdfplumber"
+            
+            try:
+                yield {
+                    "page_number": i + 1,
+                    "text": text,
+                    "tables": tables,
+                    "engine": engine,
+                    "start": offset,
+                    "end": offset + len(text)
+                }
+            finally:
+                try:
+                    self.session.release_page(i)
+                except Exception as e:
+                    # A página já foi entregue: uma falha ao liberar caches não
+                    # deve interromper as páginas seguintes
+                    logger.error(f"Erro ao liberar a página {i + 1} de {self.pdf_path}: {e}")
+            
+            offset += len(text)
+    
+    def extract_tables_pymupdf(self) -> List[List[List[str]]]:
+        """
+        Extrai tabelas do PDF usando o `find_tables` do PyMuPDF
+        
+        Returns:
+            Lista de tabelas, onde cada tabela é uma lista de linhas, e cada linha é uma lista de células
+        """
+        tables = []
+        try:
+            for i in range(self.session.page_count):
+                tables.extend(self.session.get_page_tables_pymupdf(i))
+        except Exception as e:
+            logger.error(f"Erro ao extrair tabelas com PyMuPDF: {e}")
+        
+        return tables
+    
+    def extract_tables(self) -> List[List[List[str]]]:
+        """
+        Extrai tabelas do PDF com o motor configurado em `table_engine`
+        
+        Returns:
+            Lista de tabelas, onde cada tabela é uma lista de linhas, e cada linha é uma lista de células
+        """
+        tables = []
+        try:
+            for i in range(self.session.page_count):
+                tables.extend(self._extract_page_tables(i))
+        except Exception as e:
+            logger.error(f"Erro ao extrair tabelas com {self.table_engine}: {e}")
+        
+        return tables
+    
+    def _extract_page_tables(self, page_index: int) -> List[List[List[str]]]:
+        """
+        Extrai as tabelas de uma página com o motor configurado
+        
+        Args:
+            page_index: Índice da página (base 0)
+            
+        Returns:
+            Lista de tabelas da página
+        """
+        if self.table_engine == "pdfplumber":
+            return self.session.get_page_tables(page_index)
+        
+        tables = self.session.get_page_tables_pymupdf(page_index)
+        if not tables and self.table_engine == "auto":
+            tables = self.session.get_page_tables(page_index)
+        return tables
+    
+    def extract_layout_exams(self) -> List[Dict[str, Any]]:
+        """
+        Extrai exames reconstruindo as linhas a partir das coordenadas das palavras
+        
+        Usado em laudos cujo texto sai empilhado (nome, valor, unidade e
+        referência em linhas separadas), sem depender da extração de tabelas.
+        
+        Returns:
+            Lista de dicionários com dados dos exames
+        """
+        reconstructor = LayoutRowReconstructor()
+        exams = []
+        try:
+            for i in range(self.session.page_count):
+                exams.extend(reconstructor.extract_exams(self.session.get_page_words(i)))
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir linhas do PDF: {e}")
+        
+        return exams
+    
     def extract_all(self) -> Dict[str, Any]:
         """
         Extrai todos os dados do PDF
@@ -97,21 +318,24 @@ class PDFExtractor:
         Returns:
             Dicionário com todos os dados extraídos
         """
-        # Extrair texto usando múltiplos métodos para maior precisão
-        text_pymupdf = self.extract_text_pymupdf()
-        text_pdfplumber = self.extract_text_pdfplumber()
-        
-        # Usar o texto que parece mais completo/preciso
-        if len(text_pdfplumber) > len(text_pymupdf):
-            self.text = text_pdfplumber
-        else:
-            self.text = text_pymupdf
+        # Percorrer as páginas uma única vez, acumulando texto e tabelas
+        page_texts = []
+        page_engines = []
+        tables = []
+        # Erros de extração de cada página já são registrados em iter_pages;
+        # qualquer outra falha interrompe a extração em vez de produzir um
+        # documento com páginas faltando
+        for page in self.iter_pages():
+            page_texts.append(page["text"])
+            page_engines.append(page["engine"])
+            tables.extend(page["tables"])
         
-        # Extrair tabelas
-        tables = self.extract_tables_pdfplumber()
+        self.text = "".join(page_texts)
+        self.tables = tables
         
         # Extrair metadados do PDF
         metadata = self.extract_pdf_metadata()
+        metadata["page_engines"] = page_engines
         
         # Extrair dados do paciente
         patient_data = self.extract_patient_data()
@@ -129,6 +353,9 @@ class PDFExtractor:
             "extraction_date": datetime.now().isoformat()
         }
         
+        # Liberar os handles do PDF (as páginas já saíram dos caches em iter_pages)
+        self.session.close()
+        
         return self.extracted_data
     
     def extract_pdf_metadata(self) -> Dict[str, Any]:
@@ -145,12 +372,13 @@ class PDFExtractor:
             "modified": None,
             "title": None,
             "author": None,
-            "producer": None
+            "producer": None,
+            "pages": None
         }
         
         try:
-            doc = fitz.open(self.pdf_path)
-            pdf_metadata = doc.metadata
+            metadata["pages"] = self.session.page_count
+            pdf_metadata = self.session.metadata
             if pdf_metadata:
                 metadata["title"] = pdf_metadata.get("title")
                 metadata["author"] = pdf_metadata.get("author")
@@ -171,8 +399,6 @@ class PDFExtractor:
                         metadata["modified"] = datetime.strptime(date_str[:14], "%Y%m%d%H%M%S").isoformat()
                     except:
                         pass
-            
-            doc.close()
         except Exception as e:
             logger.error(f"Erro ao extrair metadados do PDF: {e}")
         
@@ -195,62 +421,27 @@ class PDFExtractor:
             "exam_date": None
         }
         
-        # Tentar extrair nome do paciente com padrões comuns
-        name_patterns = [
-            r"(?:Paciente|Nome)[\s:]+([\w\s]+?)(?:\n|\r|,|Idade)",
-            r"(?:PACIENTE|NOME)[\s:]+([\w\s]+?)(?:\n|\r|,|IDADE)",
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, self.text)
-            if match:
-                patient_data["name"] = match.group(1).strip()
-                break
+        # Todos os campos em uma única consulta ao índice de seções
+        matches = self.PATIENT_FIELDS.search(self.section_index)
         
-        # Tentar extrair idade
-        age_patterns = [
-            r"(?:Idade|Age)[\s:]+(\d+)",
-            r"(?:IDADE|AGE)[\s:]+(\d+)",
-        ]
+        if matches["name"]:
+            patient_data["name"] = matches["name"].group(1).strip()
         
-        for pattern in age_patterns:
-            match = re.search(pattern, self.text)
-            if match:
-                try:
-                    patient_data["age"] = int(match.group(1))
-                except:
-                    pass
-                break
+        if matches["age"]:
+            try:
+                patient_data["age"] = int(matches["age"].group(1))
+            except:
+                pass
         
-        # Tentar extrair gênero
-        gender_patterns = [
-            r"(?:Sexo|Gênero)[\s:]+(M|F|Masculino|Feminino)",
-            r"(?:SEXO|GÊNERO)[\s:]+(M|F|MASCULINO|FEMININO)",
-        ]
-        
-        for pattern in gender_patterns:
-            match = re.search(pattern, self.text)
-            if match:
-                gender = match.group(1).upper()
-                if gender in ("M", "MASCULINO"):
-                    patient_data["gender"] = "M"
-                elif gender in ("F", "FEMININO"):
-                    patient_data["gender"] = "F"
-                break
-        
-        # Tentar extrair data do exame
-        date_patterns = [
-            r"(?:Data|Date|Data da Coleta)[\s:]+(\d{2}/\d{2}/\d{4})",
-            r"(?:DATA|DATE|DATA DA COLETA)[\s:]+(\d{2}/\d{2}/\d{4})",
-            r"(?:Data|Date|Data da Coleta)[\s:]+(\d{2}-\d{2}-\d{4})",
-            r"(?:DATA|DATE|DATA DA COLETA)[\s:]+(\d{2}-\d{2}-\d{4})",
-        ]
+        if matches["gender"]:
+            gender = matches["gender"].group(1).upper()
+            if gender in ("M", "MASCULINO"):
+                patient_data["gender"] = "M"
+            elif gender in ("F", "FEMININO"):
+                patient_data["gender"] = "F"
         
-        for pattern in date_patterns:
-            match = re.search(pattern, self.text)
-            if match:
-                patient_data["exam_date"] = match.group(1)
-                break
+        if matches["exam_date"]:
+            patient_data["exam_date"] = matches["exam_date"].group(1)
         
         return patient_data
     
@@ -0,0 +1,186 @@
+"""
+Snapshot binário compilado dos dados de referência
+Guarda a estrutura já processada da planilha de referência (nomes, unidades,
+referências, faixas etárias numéricas e códigos de sexo) em um arquivo
+versionado que é aberto com mmap, sem pandas nem openpyxl
+"""
+
+import os
+import json
+import mmap
+import struct
+import hashlib
+import logging
+import numpy as np
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+from .extraction_cache import EXTRACTION_CACHE_DIR
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Identificação e versão do formato do arquivo
+SNAPSHOT_MAGIC = b"BLREFSNP"
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_SUFFIX = ".blref"
+
+# Diretório padrão dos snapshots compilados
+REFERENCE_SNAPSHOT_DIR = os.path.join(EXTRACTION_CACHE_DIR, "reference")
+
+# Prefixo fixo: magic, versão do formato, tamanho do cabeçalho JSON
+_PREFIX = struct.Struct("<8sIQ")
+
+def default_snapshot_path(excel_path: str, snapshot_dir: str = REFERENCE_SNAPSHOT_DIR) -> str:
+    """
+    Caminho padrão do snapshot de uma planilha
+
+    Args:
+        excel_path: Caminho da planilha de referência
+        snapshot_dir: Diretório dos snapshots
+
+    Returns:
+        Caminho do arquivo de snapshot
+    """
+    real_path = os.path.realpath(excel_path)
+    path_hash = hashlib.sha256(real_path.encode("utf-8")).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(real_path))[0]
+    return os.path.join(snapshot_dir, f"{stem}-{path_hash}{SNAPSHOT_SUFFIX}")
+
+def write_snapshot(snapshot_path: str,
+                   entries: Sequence[Dict[str, Any]],
+                   names: Dict[str, int],
+                   ref_starts: Sequence[int],
+                   age_min: Sequence[float],
+                   age_max: Sequence[float],
+                   sex: Sequence[int],
+                   source_sha256: str,
+                   source: str = "") -> None:
+    """
+    Grava um snapshot de forma atômica
+
+    Layout: prefixo fixo, cabeçalho JSON, carga JSON (entradas dos exames e
+    índice de nomes) e, alinhados em 8 bytes, os vetores float64 com o início
+    e o fim das faixas etárias de todas as referências, seguidos do vetor
+    uint8 com o código de sexo de cada referência.
+
+    Args:
+        snapshot_path: Caminho do arquivo de saída
+        entries: Entradas distintas de exames (name, alternative_names, units, references)
+        names: Nome (principal ou alternativo) -> índice da entrada
+        ref_starts: Índice da primeira referência de cada entrada nos vetores de idade
+        age_min: Início (inclusivo) da faixa etária de cada referência
+        age_max: Fim (exclusivo) da faixa etária de cada referência
+        sex: Código de sexo (`Sex`) de cada referência
+        source_sha256: SHA-256 da planilha de origem
+        source: Caminho da planilha de origem (informativo)
+    """
+    payload = json.dumps(
+        {"entries": list(entries), "names": names, "ref_starts": list(ref_starts)},
+        ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+    # O cabeçalho precisa conhecer os deslocamentos, que dependem do seu próprio
+    # tamanho; o campo de deslocamento tem largura fixa para que isso convirja
+    header = {
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "source": source,
+        "source_sha256": source_sha256,
+        "exams": len(entries),
+        "names": len(names),
+        "references": len(age_min),
+        "payload_offset": "%016d" % 0,
+        "payload_length": len(payload),
+        "arrays_offset": "%016d" % 0
+    }
+    header_length = len(json.dumps(header).encode("utf-8"))
+    payload_offset = _PREFIX.size + header_length
+    arrays_offset = (payload_offset + len(payload) + 7) // 8 * 8
+    header["payload_offset"] = "%016d" % payload_offset
+    header["arrays_offset"] = "%016d" % arrays_offset
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(payload)
+        f.write(b"\0" * (arrays_offset - payload_offset - len(payload)))
+        np.asarray(age_min, dtype="<f8").tofile(f)
+        np.asarray(age_max, dtype="<f8").tofile(f)
+        np.asarray(sex, dtype=np.uint8).tofile(f)
+    os.replace(tmp_path, snapshot_path)
+
+class ReferenceSnapshot:
+    """
+    Snapshot de referências aberto com mmap
+
+    Os vetores de faixas etárias e de sexo são vistas NumPy diretamente
+    sobre o mapeamento, sem cópia; apenas a carga JSON (nomes e referências)
+    é decodificada.
+    """
+
+    def __init__(self, snapshot_path: str):
+        """
+        Abre e valida o snapshot
+
+        Args:
+            snapshot_path: Caminho do arquivo de snapshot
+
+        Raises:
+            ValueError: Se o arquivo não for um snapshot válido desta versão
+        """
+        self.snapshot_path = snapshot_path
+
+        with open(snapshot_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if len(self._mmap) < _PREFIX.size:
+                raise ValueError("arquivo truncado")
+            magic, version, header_length = _PREFIX.unpack_from(self._mmap, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("assinatura inválida")
+            if version != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"versão de formato {version} (esperada {SNAPSHOT_FORMAT_VERSION})")
+
+            self.header = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + header_length])
+            payload_offset = int(self.header["payload_offset"])
+            payload = json.loads(self._mmap[payload_offset:payload_offset + self.header["payload_length"]])
+
+            count = self.header["references"]
+            arrays_offset = int(self.header["arrays_offset"])
+            if len(self._mmap) < arrays_offset + 17 * count:
+                raise ValueError("arquivo truncado")
+            self.age_min = np.frombuffer(self._mmap, dtype="<f8", count=count, offset=arrays_offset)
+            self.age_max = np.frombuffer(self._mmap, dtype="<f8", count=count, offset=arrays_offset + 8 * count)
+            self.sex = np.frombuffer(self._mmap, dtype=np.uint8, count=count, offset=arrays_offset + 16 * count)
+        except Exception:
+            self.close()
+            raise
+
+        self.entries: List[Dict[str, Any]] = payload["entries"]
+        self.names: Dict[str, int] = payload["names"]
+        self.ref_starts: List[int] = payload["ref_starts"]
+
+    @property
+    def source_sha256(self) -> str:
+        """SHA-256 da planilha de origem"""
+        return self.header["source_sha256"]
+
+    def close(self) -> None:
+        """Libera o mapeamento do arquivo"""
+        self.age_min = self.age_max = self.sex = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Ainda há vistas em uso; o mapeamento é liberado pelo coletor
+                pass
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,192 @@
+"""
+Índice de seções e palavras-chave do texto de um laudo
+Localiza cabeçalhos (RESULTADOS, OBSERVAÇÕES, Paciente, ...) e rótulos de
+campos em uma única passada, para que os extratores não varram o texto
+inteiro a cada expressão regular
+"""
+
+import re
+import logging
+from bisect import bisect_left
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cabeçalhos de seção usados pelos extratores
+SECTION_HEADERS = ("RESULTADOS", "EXAMES REALIZADOS", "OBSERVAÇÕES", "Paciente")
+
+class SectionIndex:
+    """
+    Posições de cabeçalhos e palavras-chave em um texto
+
+    Todas as palavras-chave são compiladas em uma única alternância, então
+    uma única varredura encontra todas as posições onde alguma delas começa,
+    inclusive sobrepostas (ex.: "ID" dentro de "IDADE"). As posições ficam
+    ordenadas por palavra-chave.
+    """
+
+    def __init__(self, text: str, keywords: Sequence[str] = SECTION_HEADERS):
+        """
+        Constrói o índice
+
+        Args:
+            text: Texto do laudo
+            keywords: Cabeçalhos e rótulos a localizar (com distinção de
+                      maiúsculas/minúsculas)
+        """
+        self.text = text
+        self.keywords = tuple(dict.fromkeys(keywords))
+        self.offsets: Dict[str, List[int]] = {keyword: [] for keyword in self.keywords}
+
+        if not self.keywords:
+            return
+
+        # Alternativas da maior para a menor: em cada posição o grupo captura
+        # a palavra-chave mais longa, e as demais que começam ali são prefixos dela
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        prefixes = {
+            keyword: [other for other in self.keywords if keyword.startswith(other)]
+            for keyword in ordered
+        }
+        pattern = re.compile("|".join(re.escape(keyword) for keyword in ordered))
+
+        # Cada busca recomeça uma posição após o último início encontrado,
+        # para não perder palavras-chave que começam dentro de outra
+        match = pattern.search(text)
+        while match:
+            position = match.start()
+            for keyword in prefixes[match.group(0)]:
+                self.offsets[keyword].append(position)
+            match = pattern.search(text, position + 1)
+
+    def find(self, keyword: str, start: int = 0) -> Optional[int]:
+        """
+        Primeira ocorrência de uma palavra-chave a partir de `start`
+
+        Args:
+            keyword: Palavra-chave indexada
+            start: Posição mínima no texto
+
+        Returns:
+            Posição da ocorrência ou None
+        """
+        positions = self.offsets[keyword]
+        i = bisect_left(positions, start)
+        return positions[i] if i < len(positions) else None
+
+    def positions(self, keywords: Sequence[str]) -> List[int]:
+        """
+        Posições ordenadas (sem repetição) onde qualquer uma das palavras-chave começa
+
+        Args:
+            keywords: Palavras-chave indexadas
+
+        Returns:
+            Lista ordenada de posições
+        """
+        merged = set()
+        for keyword in keywords:
+            merged.update(self.offsets[keyword])
+        return sorted(merged)
+
+    def section(self, header: str, end_headers: Sequence[str] = ()) -> Optional[Tuple[int, int]]:
+        """
+        Intervalo do conteúdo de uma seção
+
+        Equivale a `re.search(header + r"(.*?)(?:FIM1|FIM2|$)", text, re.DOTALL)`:
+        o conteúdo começa logo após a primeira ocorrência do cabeçalho e
+        termina no primeiro cabeçalho final seguinte ou no fim do texto
+        (antes de uma quebra de linha final).
+
+        Args:
+            header: Cabeçalho que abre a seção
+            end_headers: Cabeçalhos que encerram a seção
+
+        Returns:
+            Tupla (início, fim) do conteúdo ou None se o cabeçalho não existir
+        """
+        header_start = self.find(header)
+        if header_start is None:
+            return None
+
+        start = header_start + len(header)
+        ends = [position for position in (self.find(end, start) for end in end_headers) if position is not None]
+        if ends:
+            return start, min(ends)
+
+        end = len(self.text)
+        if self.text.endswith("\n") and end - 1 >= start:
+            end -= 1
+        return start, end
+
+    def section_text(self, header: str, end_headers: Sequence[str] = ()) -> Optional[str]:
+        """
+        Conteúdo de uma seção (ver `section`)
+
+        Returns:
+            Texto da seção ou None se o cabeçalho não existir
+        """
+        bounds = self.section(header, end_headers)
+        if bounds is None:
+            return None
+        return self.text[bounds[0]:bounds[1]]
+
+class FieldPatternSet:
+    """
+    Conjunto de expressões regulares pré-compiladas por campo
+
+    Cada campo declara as palavras-chave com que os seus padrões começam e
+    os padrões em ordem de preferência. A busca não varre o texto: cada
+    padrão é aplicado ancorado (`match`) apenas nas posições das suas
+    palavras-chave, obtidas do `SectionIndex`. O resultado é o mesmo de
+    `re.search` com cada padrão em ordem, desde que todo casamento do padrão
+    comece por uma das palavras-chave declaradas.
+    """
+
+    def __init__(self, fields: Dict[str, Tuple[Sequence[str], Sequence[str]]], flags: int = 0):
+        """
+        Compila os padrões
+
+        Args:
+            fields: Campo -> (palavras-chave, padrões em ordem de preferência)
+            flags: Flags de compilação de todos os padrões
+        """
+        self.fields = {
+            field: (tuple(keywords), [re.compile(pattern, flags) for pattern in patterns])
+            for field, (keywords, patterns) in fields.items()
+        }
+
+    @property
+    def keywords(self) -> List[str]:
+        """Todas as palavras-chave usadas pelos campos"""
+        return list(dict.fromkeys(keyword for keywords, _ in self.fields.values() for keyword in keywords))
+
+    def search(self, index: SectionIndex,
+               start: int = 0, end: Optional[int] = None) -> Dict[str, Optional["re.Match"]]:
+        """
+        Localiza todos os campos no texto indexado
+
+        Args:
+            index: Índice do texto, construído com as palavras-chave deste conjunto
+            start: Início do trecho considerado
+            end: Fim do trecho considerado (padrão: fim do texto)
+
+        Returns:
+            Campo -> primeiro casamento do padrão de maior preferência, ou None
+        """
+        text = index.text
+        end = len(text) if end is None else end
+
+        results: Dict[str, Optional["re.Match"]] = {}
+        for field, (keywords, patterns) in self.fields.items():
+            positions = [p for p in index.positions(keywords) if start <= p < end]
+            results[field] = None
+            for pattern in patterns:
+                match = next((m for m in (pattern.match(text, p, end) for p in positions) if m), None)
+                if match:
+                    results[field] = match
+                    break
+
+        return results
@@ -6,6 +6,10 @@ import re
 import logging
 from typing import Dict, List, Any, Optional, Tuple
 from .pdf_extractor import PDFExtractor
+from .document_session import PDFDocumentSession
+from .text_parsers import parse_generic_exams, parse_ramos_exams
+from .lab_registry import LabSignature, lab_registry
+from .section_index import FieldPatternSet
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -27,7 +31,8 @@ class GenericLabExtractor(PDFExtractor):
         exams = []
         
         # Extrair tabelas primeiro (mais confiável para estrutura)
-        tables = self.extract_tables_pdfplumber()
+        # Reaproveitar as tabelas já coletadas por extract_all via iter_pages
+        tables = self.tables if self.tables is not None else self.extract_tables()
         
         # Processar tabelas que parecem conter resultados de exames
         for table in tables:
@@ -85,36 +90,45 @@ class GenericLabExtractor(PDFExtractor):
                     
                     exams.append(exam_entry)
         
-        # Se não conseguimos extrair das tabelas, tentar extrair do texto
+        # Se não conseguimos extrair das tabelas, reconstruir as linhas pela
+        # posição das palavras e completar com os exames escritos no texto
+        # Formato "NOME DO EXAME: RESULTADO (UNIDADE) Valor de Referência: REF"
         if not exams:
-            # Padrão para capturar exames no formato "NOME DO EXAME: RESULTADO (UNIDADE) Valor de Referência: REF"
-            exam_pattern = r"([\w\s-]+?):\s+([\d.,]+)\s*([a-zA-Z%/]+)?\s*(?:Valor\s+de\s+Referência|Referência):\s+([\w\s.,<>-]+)"
+            layout_exams = self.extract_layout_exams()
+            text_exams = parse_generic_exams(self.text)
             
-            matches = re.finditer(exam_pattern, self.text, re.IGNORECASE)
-            for match in matches:
-                exam_name = match.group(1).strip()
-                result_value = match.group(2).strip()
-                unit = match.group(3).strip() if match.group(3) else ""
-                reference = match.group(4).strip()
-                
-                exam_entry = {
-                    "name": exam_name,
-                    "result": result_value,
-                    "unit": unit,
-                    "reference": reference,
-                    "source": "text"
-                }
-                
-                exams.append(exam_entry)
+            seen = {self._exam_key(exam["name"]) for exam in layout_exams}
+            exams = layout_exams + [exam for exam in text_exams if self._exam_key(exam["name"]) not in seen]
         
         return exams
+    
+    @staticmethod
+    def _exam_key(name: str) -> str:
+        """Chave de comparação de nomes entre a reconstrução por layout e o texto (última linha, sem caixa)"""
+        lines = (name or "").strip().splitlines()
+        return lines[-1].strip().casefold() if lines else ""
 
 
+@lab_registry.register
 class RamosMedicinaExtractor(PDFExtractor):
     """
     Extrator especializado para o formato Ramos Medicina
     """
     
+    # Assinatura usada pela ExtractorFactory para reconhecer os laudos
+    SIGNATURE = LabSignature(
+        name="Ramos Medicina",
+        text_markers=["Ramos Medicina"],
+        metadata_markers={"author": ["Ramos Medicina"], "producer": ["Ramos Medicina"]}
+    )
+    
+    # Padrões específicos de Ramos Medicina, aplicados pelo índice de seções
+    RAMOS_FIELDS = FieldPatternSet({
+        "name": (("Paciente",), [r"Paciente:\s+([\w\s]+)"]),
+        "document": (("CPF", "RG", "ID"), [r"(CPF|RG|ID):\s+([\w\s./-]+)"]),
+    })
+    INDEX_KEYWORDS = PDFExtractor.INDEX_KEYWORDS + tuple(RAMOS_FIELDS.keywords)
+    
     def extract_patient_data(self) -> Dict[str, Any]:
         """
         Extrai dados do paciente específicos para Ramos Medicina
@@ -126,15 +140,14 @@ class RamosMedicinaExtractor(PDFExtractor):
         patient_data = super().extract_patient_data()
         
         # Padrões específicos para Ramos Medicina
-        if not patient_data["name"]:
-            name_match = re.search(r"Paciente:\s+([\w\s]+)", self.text)
-            if name_match:
-                patient_data["name"] = name_match.group(1).strip()
+        matches = self.RAMOS_FIELDS.search(self.section_index)
+        
+        if not patient_data["name"] and matches["name"]:
+            patient_data["name"] = matches["name"].group(1).strip()
         
         # Tenta extrair documento/ID
-        doc_match = re.search(r"(CPF|RG|ID):\s+([\w\s./-]+)", self.text)
-        if doc_match:
-            patient_data["document"] = doc_match.group(2).strip()
+        if matches["document"]:
+            patient_data["document"] = matches["document"].group(2).strip()
         
         return patient_data
     
@@ -147,35 +160,16 @@ class RamosMedicinaExtractor(PDFExtractor):
         """
         exams = []
         
-        # Tentar localizar a seção de resultados no texto
-        results_section_match = re.search(r"RESULTADOS(.*?)(?:OBSERVAÇÕES|$)", self.text, re.DOTALL)
-        if not results_section_match:
-            # Tentar padrão alternativo
-            results_section_match = re.search(r"EXAMES REALIZADOS(.*?)(?:OBSERVAÇÕES|$)", self.text, re.DOTALL)
+        # Localizar a seção de resultados pelo índice de seções
+        results_text = self.section_index.section_text("RESULTADOS", ("OBSERVAÇÕES",))
+        if results_text is None:
+            # Tentar cabeçalho alternativo
+            results_text = self.section_index.section_text("EXAMES REALIZADOS", ("OBSERVAÇÕES",))
         
-        if results_section_match:
-            results_text = results_section_match.group(1)
-            
-            # Padrão para extrair linhas de exames no formato Ramos Medicina
+        if results_text is not None:
+            # Extrair linhas de exames no formato Ramos Medicina
             # Exemplo: "Hemoglobina: 15.2 g/dL Referência: 13.5 - 17.5"
-            exam_pattern = r"([\w\s]+):\s+([\d.,]+)\s+([a-zA-Z%/]+)(?:\s+Referência:\s+([\d.,\s-]+))?"
-            
-            matches = re.finditer(exam_pattern, results_text)
-            for match in matches:
-                exam_name = match.group(1).strip()
-                result_value = match.group(2).strip()
-                unit = match.group(3).strip() if match.group(3) else ""
-                reference = match.group(4).strip() if match.group(4) else ""
-                
-                exam_entry = {
-                    "name": exam_name,
-                    "result": result_value,
-                    "unit": unit,
-                    "reference": reference,
-                    "source": "text_pattern"
-                }
-                
-                exams.append(exam_entry)
+            exams = parse_ramos_exams(results_text)
         
         # Se não conseguiu extrair com o padrão específico, tenta o método genérico
         if not exams:
@@ -190,29 +184,37 @@ class ExtractorFactory:
     """
     
     @staticmethod
-    def create_extractor(pdf_path: str) -> PDFExtractor:
+    def create_extractor(pdf_path: str, table_engine: str = "pdfplumber") -> PDFExtractor:
         """
         Cria o extrator mais apropriado para o PDF fornecido
         
         Args:
             pdf_path: Caminho para o arquivo PDF
+            table_engine: Motor de extração de tabelas ('pdfplumber', 'pymupdf' ou 'auto')
             
         Returns:
             Instância do extrator apropriado
         """
-        # Instanciar um extrator genérico para extrair texto
-        generic = PDFExtractor(pdf_path)
-        text = generic.extract_text_pymupdf()
-        
-        # Verificar padrões para identificar o formato do laboratório
-        if "Ramos Medicina" in text:
-            logger.info(f"Identificado formato Ramos Medicina para {pdf_path}")
-            return RamosMedicinaExtractor(pdf_path)
-        
-        # Adicionar mais condições para outros laboratórios
-        # elif "Outro Laboratório" in text:
-        #     return OutroLaboratorioExtractor(pdf_path)
+        # Abrir uma única sessão de leitura, compartilhada com o extrator escolhido
+        session = PDFDocumentSession(pdf_path)
+        
+        # A detecção lê apenas os metadados e a primeira página; ambos ficam
+        # no cache da sessão e não são lidos de novo pelo extrator
+        try:
+            metadata = session.metadata
+            first_page_text = session.get_page_text_pymupdf(0) if session.page_count else ""
+        except Exception as e:
+            logger.error(f"Erro ao ler a primeira página com PyMuPDF: {e}")
+            metadata, first_page_text = {}, ""
+        
+        # Verificar as assinaturas de todos os laboratórios registrados
+        # Novos laboratórios entram com @lab_registry.register e um atributo SIGNATURE
+        detected = lab_registry.detect(metadata, first_page_text)
+        if detected:
+            extractor_cls, signature, score = detected
+            logger.info(f"Identificado formato {signature.name} para {pdf_path}")
+            return extractor_cls(pdf_path, session=session, table_engine=table_engine)
         
         # Se não conseguir identificar formato específico, usa o genérico
         logger.info(f"Usando extrator genérico para {pdf_path}")
-        return GenericLabExtractor(pdf_path)
\ No newline at end of file
+        return GenericLabExtractor(pdf_path, session=session, table_engine=table_engine)
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Testes da liberação dos caches por página da sessão de documento
+"""
+
+import fitz  # PyMuPDF
+from .pdf_extractor import PDFExtractor
+
+def _build_pdf(path, pages=6):
+    """PDF com páginas de texto, páginas tabulares (grade desenhada) e páginas quase vazias"""
+    document = fitz.open()
+    for i in range(pages):
+        page = document.new_page()
+        if i % 3 == 2:
+            page.insert_text((72, 72), "p")
+            continue
+        page.insert_text((72, 72), f"Paciente: Teste {i}\nGlicose: {90 + i} mg/dL Referência: 70 a 99")
+        if i % 3 == 1:
+            for y in (100, 120, 140):
+                page.draw_line((72, y), (400, y))
+            for x in (72, 236, 400):
+                page.draw_line((x, 100), (x, 140))
+            page.insert_text((80, 115), "Exame")
+            page.insert_text((244, 115), "Resultado")
+            page.insert_text((80, 135), "Glicose")
+            page.insert_text((244, 135), "95")
+    document.save(str(path))
+    document.close()
+
+def _cache_sizes(session):
+    return {
+        name: len(getattr(session, name))
+        for name in ("_text_pymupdf", "_text_pdfplumber", "_tables", "_tables_pymupdf", "_ruling_lines")
+    }
+
+def test_iter_pages_releases_page_caches(tmp_path):
+    """Depois de uma passada completa de iter_pages, nenhuma página fica em cache"""
+    pdf_path = tmp_path / "laudo.pdf"
+    _build_pdf(pdf_path)
+
+    for engine in PDFExtractor.TABLE_ENGINES:
+        extractor = PDFExtractor(str(pdf_path), table_engine=engine)
+        engines = set()
+        for page in extractor.iter_pages():
+            engines.add(page["engine"])
+            # Somente a página corrente pode estar em cache durante o streaming
+            assert all(size <= 1 for size in _cache_sizes(extractor.session).values())
+
+        assert all(size == 0 for size in _cache_sizes(extractor.session).values()), engine
+        extractor.session.close()
+
+def test_released_page_is_extracted_again(tmp_path):
+    """Uma página liberada continua acessível, extraída de novo sob demanda"""
+    pdf_path = tmp_path / "laudo.pdf"
+    _build_pdf(pdf_path, pages=2)
+
+    extractor = PDFExtractor(str(pdf_path))
+    texts = [page["text"] for page in extractor.iter_pages()]
+
+    assert extractor.session.get_page_text_pymupdf(0) == texts[0]
+    extractor.session.close()
+
+def test_extract_all_keeps_every_page(tmp_path):
+    """extract_all devolve o texto e o motor de todas as páginas"""
+    pdf_path = tmp_path / "laudo.pdf"
+    _build_pdf(pdf_path, pages=5)
+
+    data = PDFExtractor(str(pdf_path)).extract_all()
+
+    assert data["metadata"]["pages"] == 5
+    assert len(data["metadata"]["page_engines"]) == 5
+    assert all(f"Teste {i}" in data["raw_text"] for i in (0, 1, 3, 4))
+
+def test_release_failure_does_not_drop_pages(tmp_path, monkeypatch):
+    """Uma falha ao liberar uma página é registrada e as seguintes continuam"""
+    pdf_path = tmp_path / "laudo.pdf"
+    _build_pdf(pdf_path, pages=4)
+
+    extractor = PDFExtractor(str(pdf_path))
+    def failing_release(page_index):
+        raise AttributeError("release indisponível")
+    monkeypatch.setattr(extractor.session, "release_page", failing_release)
+
+    assert [page["page_number"] for page in extractor.iter_pages()] == [1, 2, 3, 4]
+    extractor.session.close()
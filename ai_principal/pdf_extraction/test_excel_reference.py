@@ -0,0 +1,48 @@
+"""
+Testes do enriquecimento de exames com a planilha de referência
+"""
+
+import pandas as pd
+from .excel_reference import ExcelReferenceProcessor
+
+def _processor(tmp_path):
+    """Processador sobre uma planilha com referências por sexo e idade"""
+    sheet = tmp_path / "referencias.xlsx"
+    pd.DataFrame([
+        ["Hemoglobina", "hb", "g/dL", "13,5 a 17,5", "M", "18-120"],
+        ["Hemoglobina", "hb", "g/dL", "12,0 a 15,5", "F", "18-120"],
+        ["Hemoglobina", "hb", "g/dL", "11,0 a 14,5", "", "<18"],
+        ["Glicose", "glicemia, glicose jejum", "mg/dL", "70 a 99", "", ">0"],
+        ["Creatinina", "", "mg/dL", "0,7 a 1,3", "M", ">17"],
+        ["Creatinina", "", "mg/dL", "0,5 a 1,1", "F", ">17"],
+    ], columns=["Exame", "Nome Alternativo", "Unidade", "Referencia", "Sexo", "Idade"]).to_excel(sheet, index=False)
+    processor = ExcelReferenceProcessor(str(sheet), snapshot_path=str(tmp_path / "referencias.blref"))
+    processor.load_reference_data()
+    return processor
+
+def test_enrich_exams_matches_single_lookup(tmp_path):
+    """A consulta em lote anexa as mesmas referências da consulta exame a exame"""
+    processor = _processor(tmp_path)
+    names = ["Hemoglobina", "HB", "Glicemia", "creatinina", "Glicose Jejum", "Hemoglobina", "Ferritina"]
+
+    for sex, age in [("M", 40), ("F", 30), (None, 10), ("F", None), (None, None)]:
+        exams = [{"name": name} for name in names] + [{"name": ""}]
+        enriched = processor.enrich_exams(exams, sex, age)
+
+        expected = [processor.get_reference_for_exam(name, sex, age) for name in names]
+        assert enriched == sum(1 for ref in expected if "error" not in ref)
+        for exam, ref in zip(exams, expected):
+            if "error" in ref:
+                assert "reference_data" not in exam
+            else:
+                assert exam["reference_data"] == ref
+        assert "reference_data" not in exams[-1]
+
+def test_enrich_exams_filters_by_profile(tmp_path):
+    """Sexo e idade do paciente selecionam as referências anexadas"""
+    processor = _processor(tmp_path)
+    exams = [{"name": "Hemoglobina"}, {"name": "Creatinina"}]
+    processor.enrich_exams(exams, "F", 30)
+
+    assert [ref["value"] for ref in exams[0]["reference_data"]["references"]] == ["12,0 a 15,5"]
+    assert [ref["value"] for ref in exams[1]["reference_data"]["references"]] == ["0,5 a 1,1"]
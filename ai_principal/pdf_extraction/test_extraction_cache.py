@@ -0,0 +1,81 @@
+"""
+Testes do cache persistente de extrações
+"""
+
+import sqlite3
+import fitz  # PyMuPDF
+import pytest
+from . import main, __version__
+from .extraction_cache import ExtractionCache, EXTRACTION_SCHEMA_VERSION
+
+def _build_pdf(path):
+    """PDF de uma página com resultados no formato de texto"""
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_text((72, 72), "Paciente: Maria da Silva")
+    page.insert_text((72, 100), "Glicose: 95 mg/dL Referência: 70 a 99 mg/dL")
+    document.save(str(path))
+    document.close()
+    return str(path)
+
+def test_cache_hit_does_not_open_pdf(tmp_path, monkeypatch):
+    """Em caso de acerto, o payload vem do cache sem criar o extrator"""
+    pdf_path = _build_pdf(tmp_path / "laudo.pdf")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+    first = main.process_pdf_file(pdf_path, output_dir=str(tmp_path / "out"), cache=cache)
+    assert cache.stats()["misses"] == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("o PDF não deveria ser aberto")
+    monkeypatch.setattr(main.ExtractorFactory, "create_extractor", fail)
+
+    second = main.process_pdf_file(pdf_path, output_dir=str(tmp_path / "out"), cache=cache)
+    assert second == first
+    assert cache.stats()["hits"] == 1
+
+    # Outro motor de tabelas é outra entrada
+    with pytest.raises(AssertionError):
+        main.process_pdf_file(pdf_path, output_dir=str(tmp_path / "out"), cache=cache, table_engine="pymupdf")
+    cache.close()
+
+def test_schema_version_invalidates_entries(tmp_path):
+    """Incrementar EXTRACTION_SCHEMA_VERSION invalida as entradas gravadas com a versão anterior"""
+    cache_dir = str(tmp_path / "cache")
+    cache = ExtractionCache(cache_dir)
+    cache.put("abc", "GenericLabExtractor", {"exams": []})
+    assert cache.get("abc") == ("GenericLabExtractor", {"exams": []})
+    cache.close()
+
+    bumped = ExtractionCache(cache_dir, version=f"{__version__}+{int(EXTRACTION_SCHEMA_VERSION) + 1}")
+    assert bumped.get("abc") is None
+    bumped.put("abc", "GenericLabExtractor", {"exams": [{"name": "Glicose"}]})
+    assert bumped.get("abc") == ("GenericLabExtractor", {"exams": [{"name": "Glicose"}]})
+    bumped.close()
+
+def test_extractor_is_not_part_of_the_key(tmp_path):
+    """Uma nova extração do mesmo PDF substitui a anterior, mesmo com outro extrator"""
+    cache = ExtractionCache(str(tmp_path))
+    cache.put("abc", "GenericLabExtractor", {"exams": []})
+    cache.put("abc", "RamosMedicinaExtractor", {"exams": [{"name": "Glicose"}]})
+
+    assert cache.get("abc") == ("RamosMedicinaExtractor", {"exams": [{"name": "Glicose"}]})
+    count = sqlite3.connect(cache.db_path).execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+    assert count == 1
+    cache.close()
+
+def test_old_schema_is_recreated(tmp_path):
+    """Bancos com a classe do extrator na chave primária são recriados"""
+    conn = sqlite3.connect(str(tmp_path / "extraction_cache.sqlite"))
+    conn.execute(
+        "CREATE TABLE extractions (sha256 TEXT NOT NULL, extractor TEXT NOT NULL, version TEXT NOT NULL, "
+        "payload BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL, "
+        "PRIMARY KEY (sha256, extractor, version))"
+    )
+    conn.commit()
+    conn.close()
+
+    cache = ExtractionCache(str(tmp_path))
+    cache.put("abc", "GenericLabExtractor", {"exams": []})
+    cache.put("abc", "RamosMedicinaExtractor", {"exams": []})
+    assert cache.get("abc")[0] == "RamosMedicinaExtractor"
+    cache.close()
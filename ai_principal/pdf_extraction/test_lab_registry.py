@@ -0,0 +1,78 @@
+"""
+Testes da detecção de laboratórios e do autômato de Aho–Corasick
+"""
+
+import random
+import fitz  # PyMuPDF
+from .aho_corasick import AhoCorasick
+from .lab_registry import LabRegistry, LabSignature
+from .specialized_extractors import ExtractorFactory, GenericLabExtractor, RamosMedicinaExtractor
+
+def _build_pdf(path, pages, author=""):
+    """PDF com o texto de cada página e, opcionalmente, o autor nos metadados"""
+    document = fitz.open()
+    for text in pages:
+        document.new_page().insert_text((72, 72), text)
+    if author:
+        document.set_metadata({"author": author})
+    document.save(str(path))
+    document.close()
+    return str(path)
+
+def _naive_matches(patterns, text):
+    """Todas as ocorrências (inclusive sobrepostas) por busca de substring termo a termo"""
+    matches = set()
+    for pattern_id, pattern in enumerate(patterns):
+        start = text.find(pattern)
+        while pattern and start != -1:
+            matches.add((start + len(pattern), pattern_id))
+            start = text.find(pattern, start + 1)
+    return matches
+
+def test_aho_corasick_matches_naive_scan():
+    """O autômato encontra as mesmas ocorrências da busca ingênua, inclusive termos sobrepostos e repetidos"""
+    rng = random.Random(7)
+    for _ in range(200):
+        patterns = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))]
+        text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 60)))
+        assert set(AhoCorasick(patterns).iter_matches(text)) == _naive_matches(patterns, text)
+
+def test_aho_corasick_accented_terms():
+    """Termos com acentos e espaços, como os marcadores de laboratórios"""
+    patterns = ["ramos medicina", "medicina", "análises clínicas", ""]
+    text = "laboratório ramos medicina - análises clínicas"
+    assert set(AhoCorasick(patterns).iter_matches(text)) == _naive_matches(patterns, text)
+
+def test_registry_scores_and_priority():
+    """Termos, expressões e metadados somam pontos; empates ficam com a prioridade"""
+    class LabA:
+        SIGNATURE = LabSignature("Lab A", text_markers=["Lab A"], first_page_patterns=[r"Protocolo A-\d+"])
+
+    class LabB:
+        SIGNATURE = LabSignature("Lab B", text_markers=["Lab B"], metadata_markers={"producer": ["LabSoft"]},
+                                 priority=1)
+
+    registry = LabRegistry()
+    registry.register(LabA)
+    registry.register(LabB)
+
+    assert registry.detect({}, "Laudo do LAB A\nProtocolo A-123")[:2] == (LabA, LabA.SIGNATURE)
+    assert registry.detect({}, "Laudo do LAB A\nProtocolo A-123")[2] == 2
+    assert registry.detect({"producer": "LabSoft 2.0"}, "Sem marcadores")[0] is LabB
+    assert registry.detect({"producer": "LabSoft"}, "Lab A")[0] is LabB
+    assert registry.detect({}, "Outro laboratório") is None
+
+def test_factory_reads_only_first_page_and_metadata(tmp_path):
+    """A fábrica decide pela primeira página e pelos metadados, sem ler as demais páginas"""
+    first_page = _build_pdf(tmp_path / "ramos.pdf", ["Ramos Medicina\nPaciente: Maria", "Resultados"])
+    extractor = ExtractorFactory.create_extractor(first_page)
+    assert type(extractor) is RamosMedicinaExtractor
+    assert set(extractor.session._text_pymupdf) == {0}
+
+    later_page = _build_pdf(tmp_path / "outro.pdf", ["Laboratório X\nPaciente: Maria", "Ramos Medicina"])
+    extractor = ExtractorFactory.create_extractor(later_page)
+    assert type(extractor) is GenericLabExtractor
+    assert set(extractor.session._text_pymupdf) == {0}
+
+    metadata_only = _build_pdf(tmp_path / "metadados.pdf", ["Paciente: Maria"], author="Ramos Medicina")
+    assert type(ExtractorFactory.create_extractor(metadata_only)) is RamosMedicinaExtractor
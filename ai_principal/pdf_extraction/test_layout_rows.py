@@ -0,0 +1,72 @@
+"""
+Testes da reconstrução de linhas de resultados pela posição das palavras
+"""
+
+import fitz  # PyMuPDF
+from .layout_rows import LayoutRowReconstructor
+from .specialized_extractors import GenericLabExtractor
+
+def _words(rows):
+    """Palavras posicionadas a partir de linhas de células ((x, texto), ...)"""
+    words = []
+    for line, cells in enumerate(rows):
+        y = 100 + 16 * line
+        for x, text in cells:
+            for k, word in enumerate(text.split()):
+                words.append((x, y, x + 6 * len(word), y + 10, word, 0, line, k))
+                x += 6 * len(word) + 3
+    return words
+
+def test_patient_header_rows_are_not_exams():
+    """Rótulos do paciente e linhas sem colunas de resultado são descartados"""
+    words = _words([
+        [(72, "Paciente:"), (220, "Maria da Silva")],
+        [(72, "Idade:"), (220, "45 anos")],
+        [(72, "Data da Coleta:"), (220, "10/03/2024")],
+        [(72, "Protocolo"), (220, "123456")]
+    ])
+    assert LayoutRowReconstructor().extract_exams(words) == []
+
+def test_results_table_rows_are_exams():
+    """Linhas abaixo de um cabeçalho de tabela, ou com unidade e referência, são aceitas"""
+    reconstructor = LayoutRowReconstructor()
+
+    with_header = reconstructor.extract_exams(_words([
+        [(72, "Exame"), (220, "Resultado"), (320, "Referência")],
+        [(72, "Hemoglobina"), (220, "13,5"), (320, "12,0 a 15,8")],
+        [(72, "Leucócitos"), (220, "5.900")]
+    ]))
+    assert [(e["name"], e["result"]) for e in with_header] == [("Hemoglobina", "13,5"), ("Leucócitos", "5.900")]
+
+    without_header = reconstructor.extract_exams(_words([
+        [(72, "Idade:"), (220, "45 anos")],
+        [(72, "Glicose"), (220, "95"), (280, "mg/dL"), (360, "70 a 99")]
+    ]))
+    assert [(e["name"], e["unit"], e["reference"]) for e in without_header] == [("Glicose", "mg/dL", "70 a 99")]
+
+def test_patient_header_above_text_results(tmp_path):
+    """Com o cabeçalho do paciente em colunas, os resultados escritos no texto ainda são extraídos"""
+    pdf_path = tmp_path / "laudo.pdf"
+    document = fitz.open()
+    page = document.new_page()
+    y = 72
+    for label, value in [("Paciente:", "Maria da Silva"), ("Idade:", "45 anos"),
+                         ("Sexo:", "Feminino"), ("Data da Coleta:", "10/03/2024")]:
+        page.insert_text((72, y), label)
+        page.insert_text((220, y), value)
+        y += 16
+    y += 20
+    for line in ["Glicose: 95 mg/dL Referência: 70 a 99 mg/dL",
+                 "Creatinina: 0,9 mg/dL Referência: 0,5 a 1,1 mg/dL"]:
+        page.insert_text((72, y), line)
+        y += 16
+    document.save(str(pdf_path))
+    document.close()
+
+    data = GenericLabExtractor(str(pdf_path)).extract_all()
+    exams = {GenericLabExtractor._exam_key(exam["name"]): exam for exam in data["exams"]}
+
+    assert set(exams) == {"glicose", "creatinina"}
+    assert exams["glicose"]["result"] == "95"
+    assert exams["creatinina"]["result"] == "0,9"
+    assert data["patient"]["age"] == 45
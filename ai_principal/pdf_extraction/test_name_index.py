@@ -0,0 +1,77 @@
+"""
+Testes do índice de nomes de exames
+"""
+
+from .name_index import ExamNameIndex, normalize_exam_name
+
+# Nomes da planilha de referência (principais e alternativos, já em minúsculas)
+REFERENCE_NAMES = {
+    "glicose": {"alternative_names": ["glicemia"]},
+    "glicemia": {"alternative_names": []},
+    "glicose jejum": {"alternative_names": []},
+    "hemoglobina": {"alternative_names": ["hb"]},
+    "hb": {"alternative_names": []},
+    "hemoglobina glicada": {"alternative_names": ["hba1c"]},
+    "hba1c": {"alternative_names": []},
+    "ácido úrico": {"alternative_names": []},
+    "creatinina": {"alternative_names": []},
+    "aspartato aminotransferase": {"alternative_names": ["tgo"]},
+    "tgo": {"alternative_names": []},
+    "colesterol total": {"alternative_names": []},
+}
+
+def _old_lookup(exam_name):
+    """Busca anterior: primeiro nome que contém ou está contido na consulta, na ordem da planilha"""
+    exam_name_clean = exam_name.strip().lower()
+    if exam_name_clean in REFERENCE_NAMES:
+        return exam_name_clean
+    for ref_name, info in REFERENCE_NAMES.items():
+        if exam_name_clean in ref_name or ref_name in exam_name_clean:
+            return ref_name
+    for ref_name, info in REFERENCE_NAMES.items():
+        if any(exam_name_clean in alt or alt in exam_name_clean for alt in info["alternative_names"]):
+            return ref_name
+    return None
+
+def test_same_result_as_old_lookup_for_plain_names():
+    """Nomes exatos e nomes que contêm um único nome da planilha continuam resolvidos como antes"""
+    index = ExamNameIndex(REFERENCE_NAMES)
+    for query in ["Glicose", "HEMOGLOBINA", "Creatinina sérica", "TGO", "Colesterol Total", "Glicemia"]:
+        assert index.best_match(query) == _old_lookup(query), query
+
+def test_accented_and_abbreviated_names():
+    """Acentos, pontuação e abreviações resolvem para o nome mais específico"""
+    index = ExamNameIndex(REFERENCE_NAMES)
+    cases = {
+        "Acido Urico": "ácido úrico",
+        "ÁCIDO ÚRICO": "ácido úrico",
+        "GLICOSE - JEJUM": "glicose jejum",
+        "Hemoglobina Glicada (HbA1c)": "hemoglobina glicada",
+        "Hb": "hb",
+        "TGO (AST)": "tgo",
+    }
+    for query, expected in cases.items():
+        assert index.best_match(query) == expected, query
+
+    # A busca anterior errava ou não encontrava esses nomes
+    assert _old_lookup("Acido Urico") is None
+    assert _old_lookup("GLICOSE - JEJUM") == "glicose"
+    assert _old_lookup("Hemoglobina Glicada (HbA1c)") == "hemoglobina"
+
+def test_ranking_and_rejection():
+    """Candidatos ordenados por pontuação; nomes sem semelhança são rejeitados"""
+    index = ExamNameIndex(REFERENCE_NAMES)
+    ranked = [name for name, _ in index.search("Glicose jejum 8h", limit=3)]
+    assert ranked[0] == "glicose jejum"
+    assert "glicose" in ranked
+
+    assert index.best_match("Potássio") is None
+    assert index.search("  --  ") == []
+
+def test_queries_are_memoized():
+    """Consultas com a mesma forma normalizada usam o LRU"""
+    index = ExamNameIndex(REFERENCE_NAMES)
+    index.best_match("Ácido Úrico")
+    index.best_match("acido urico")
+    assert normalize_exam_name("Ácido Úrico") == "acido urico"
+    assert index.cache_info().hits == 1
@@ -0,0 +1,46 @@
+"""
+Testes do processamento de diretórios em paralelo
+"""
+
+import fitz  # PyMuPDF
+from .main import process_directory
+
+def _build_pdfs(directory, count=5):
+    """PDFs de uma página com resultados distintos, e um arquivo corrompido no meio"""
+    directory.mkdir()
+    for i in range(count):
+        document = fitz.open()
+        page = document.new_page()
+        page.insert_text((72, 72), f"Paciente: Paciente {i}")
+        page.insert_text((72, 100), f"Glicose: {90 + i} mg/dL Referência: 70 a 99 mg/dL")
+        document.save(str(directory / f"laudo_{i}.pdf"))
+        document.close()
+    (directory / "laudo_2b.pdf").write_bytes(b"%PDF-1.4\nconteudo corrompido")
+    return directory
+
+def test_parallel_matches_sequential(tmp_path):
+    """Com vários processos, os resultados e a ordem são os do modo sequencial"""
+    pdf_dir = str(_build_pdfs(tmp_path / "pdfs"))
+
+    sequential = process_directory(pdf_dir, output_dir=str(tmp_path / "seq"), workers=1, show_progress=False)
+    parallel = process_directory(pdf_dir, output_dir=str(tmp_path / "par"), workers=2, show_progress=False)
+
+    # A data da extração é a única diferença esperada entre as execuções
+    for data in sequential + parallel:
+        data.pop("extraction_date")
+    assert parallel == sequential
+    assert [data["exams"][0]["result"] for data in parallel] == ["90", "91", "92", "93", "94"]
+
+def test_failing_pdf_only_skips_itself(tmp_path):
+    """Um PDF corrompido fica de fora sem afetar os demais, também no resumo"""
+    pdf_dir = str(_build_pdfs(tmp_path / "pdfs"))
+    output_dir = tmp_path / "out"
+
+    summaries = process_directory(pdf_dir, output_dir=str(output_dir), workers=2,
+                                  return_data=False, show_progress=False)
+
+    assert [summary["pdf_path"].rsplit("/", 1)[-1] for summary in summaries] == [
+        "laudo_0.pdf", "laudo_1.pdf", "laudo_2.pdf", "laudo_3.pdf", "laudo_4.pdf"
+    ]
+    assert all(summary["exams"] == 1 and summary["pages"] == 1 for summary in summaries)
+    assert not (output_dir / "laudo_2b_extracted.json").exists()
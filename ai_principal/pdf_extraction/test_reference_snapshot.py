@@ -0,0 +1,93 @@
+"""
+Testes do snapshot compilado da planilha de referência
+"""
+
+import os
+import sys
+import subprocess
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from .excel_reference import ExcelReferenceProcessor
+from .reference_snapshot import ReferenceSnapshot
+
+ROWS = [
+    ["Hemoglobina", "hb", "g/dL", "13,5 a 17,5", "M", "18-120"],
+    ["Hemoglobina", "hb", "g/dL", "12,0 a 15,5", "F", "18-120"],
+    ["Hemoglobina", "hb", "g/dL", "11,0 a 14,5", "", "<18"],
+    ["Glicose", "glicemia", "mg/dL", "70 a 99", "", "Adulto"],
+    ["Creatinina", "", "mg/dL", "0,7 a 1,3", "M", ">17"],
+]
+
+def _write_sheet(path, rows):
+    pd.DataFrame(rows, columns=["Exame", "Nome Alternativo", "Unidade", "Referencia", "Sexo", "Idade"]).to_excel(
+        path, index=False)
+    return str(path)
+
+def _no_sheet(*args, **kwargs):
+    raise AssertionError("a planilha não deveria ser lida")
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    """Os dados abertos do snapshot são os mesmos construídos a partir da planilha"""
+    sheet = _write_sheet(tmp_path / "referencias.xlsx", ROWS)
+    snapshot_path = str(tmp_path / "referencias.blref")
+
+    from_sheet = ExcelReferenceProcessor(sheet, snapshot_path=snapshot_path)
+    from_sheet.load_reference_data()
+    assert os.path.exists(snapshot_path)
+
+    monkeypatch.setattr(ExcelReferenceProcessor, "_read_sheet", _no_sheet)
+    from_snapshot = ExcelReferenceProcessor(sheet, snapshot_path=snapshot_path)
+    from_snapshot.load_reference_data()
+
+    assert from_snapshot.reference_data == from_sheet.reference_data
+    assert from_snapshot._ref_starts == from_sheet._ref_starts
+    np.testing.assert_array_equal(from_snapshot._age_min, from_sheet._age_min)
+    np.testing.assert_array_equal(from_snapshot._age_max, from_sheet._age_max)
+    np.testing.assert_array_equal(from_snapshot._sex, from_sheet._sex)
+
+    names = ["Hemoglobina", "HB", "Glicemia", "Creatinina", "Ferritina"]
+    for sex, age in [("M", 40), ("F", 30), (None, 10), (None, None)]:
+        assert (from_snapshot.get_references_for_exams(names, sex, age)
+                == from_sheet.get_references_for_exams(names, sex, age))
+
+    # O snapshot também pode ser aberto diretamente, sem a planilha
+    snapshot_only = ExcelReferenceProcessor(snapshot_path)
+    assert snapshot_only.load_reference_data() == from_sheet.reference_data
+
+def test_changed_sheet_rebuilds_snapshot(tmp_path):
+    """Com a planilha alterada, o snapshot antigo não é usado e é recompilado"""
+    sheet_path = tmp_path / "referencias.xlsx"
+    snapshot_path = str(tmp_path / "referencias.blref")
+    _write_sheet(sheet_path, ROWS)
+    ExcelReferenceProcessor(str(sheet_path), snapshot_path=snapshot_path).load_reference_data()
+    with ReferenceSnapshot(snapshot_path) as snapshot:
+        old_hash = snapshot.source_sha256
+
+    _write_sheet(sheet_path, ROWS + [["Ferritina", "", "ng/mL", "30 a 400", "", "Adulto"]])
+    processor = ExcelReferenceProcessor(str(sheet_path), snapshot_path=snapshot_path)
+    processor.load_reference_data()
+
+    assert "ferritina" in processor.reference_data
+    with ReferenceSnapshot(snapshot_path) as snapshot:
+        assert snapshot.source_sha256 != old_hash
+        assert "ferritina" in snapshot.names
+
+def test_cli_reference_compile(tmp_path):
+    """`biolab-cli reference compile` grava o snapshot no caminho pedido"""
+    pytest.importorskip("supabase")
+    root = Path(__file__).resolve().parents[2]
+    sheet = _write_sheet(tmp_path / "referencias.xlsx", ROWS)
+    output = tmp_path / "compilado.blref"
+
+    completed = subprocess.run(
+        [sys.executable, str(root / "biolab-cli.py"), "reference", "compile", sheet, "--output", str(output)],
+        cwd=str(root), capture_output=True, text=True, timeout=300
+    )
+
+    expected = ExcelReferenceProcessor(sheet, use_snapshot=False).load_reference_data()
+    assert completed.returncode == 0, completed.stderr
+    assert f"Snapshot gravado em: {output}" in completed.stdout
+    assert f"Exames indexados: {len(expected)}" in completed.stdout
+    assert ExcelReferenceProcessor(str(output)).load_reference_data() == expected
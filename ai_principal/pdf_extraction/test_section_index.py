@@ -0,0 +1,58 @@
+"""
+Testes do índice de seções e do conjunto de padrões por campo
+"""
+
+import re
+import random
+from .section_index import SectionIndex
+from .pdf_extractor import PDFExtractor
+from .specialized_extractors import RamosMedicinaExtractor
+
+TEXTS = [
+    "Laboratório X\nPaciente: Maria da Silva\nIdade: 45 anos\nSexo: Feminino\nData da Coleta: 10/03/2024\n",
+    "PACIENTE: JOAO SOUZA, IDADE: 60\nSEXO: M\nDATA: 01-02-2023\nRESULTADOS\nGlicose: 95\n",
+    "Nome: Ana\nIdade 7\nGênero: F\nDate: 05/05/2020\nCPF: 123.456.789-00\nRG: 12 345\n",
+    "Ramos Medicina\nPaciente: Carlos Lima\nID: AB 12/3\nIDADE: 33\nRESULTADOS\nHemoglobina: 15,2\nOBSERVAÇÕES\n",
+    "Sem campos reconhecidos\nDataset: nada\nIdadex\n",
+    "",
+]
+
+def _random_texts(count=100):
+    """Textos com rótulos dos campos em posições e combinações aleatórias"""
+    rng = random.Random(11)
+    pieces = ["Paciente: Maria", "PACIENTE JOSE", "Nome:", "Idade: 45", "IDADE 3", "Sexo: M", "SEXO: FEMININO",
+              "Data: 10/03/2024", "DATA DA COLETA 01-02-2023", "CPF: 1.2-3", "ID: X", "Idade", ",", "\n", " "]
+    return ["".join(rng.choice(pieces) + rng.choice(["\n", " ", ", "]) for _ in range(rng.randint(0, 12)))
+            for _ in range(count)]
+
+def _same_match(a, b):
+    if a is None or b is None:
+        return a is b
+    return a.span() == b.span() and a.groups() == b.groups()
+
+def test_field_patterns_match_re_search():
+    """Cada campo tem o mesmo casamento de `re.search` com os padrões em ordem de preferência"""
+    for field_set in (PDFExtractor.PATIENT_FIELDS, RamosMedicinaExtractor.RAMOS_FIELDS):
+        for text in TEXTS + _random_texts():
+            index = SectionIndex(text, field_set.keywords)
+            matches = field_set.search(index)
+            for field, (_, patterns) in field_set.fields.items():
+                expected = next((m for m in (p.search(text) for p in patterns) if m), None)
+                assert _same_match(matches[field], expected), (field, text)
+
+def test_overlapping_keywords():
+    """Palavras-chave que começam dentro de outra são indexadas ("ID" em "IDADE")"""
+    index = SectionIndex("IDADE: 33\nID: 7\n", ("ID", "IDADE"))
+    assert index.offsets["ID"] == [0, 10]
+    assert index.offsets["IDADE"] == [0]
+    assert index.find("ID", 1) == 10
+    assert index.find("IDADE", 1) is None
+
+def test_section_text_matches_regex():
+    """O conteúdo das seções é o mesmo da busca por expressão regular"""
+    ends = ("OBSERVAÇÕES",)
+    for text in TEXTS + ["RESULTADOS\nA\nOBSERVAÇÕES\nB\nRESULTADOS\nC", "x RESULTADOS", "RESULTADOS\n"]:
+        index = SectionIndex(text)
+        for header in ("RESULTADOS", "EXAMES REALIZADOS"):
+            expected = re.search(header + r"(.*?)(?:OBSERVAÇÕES|$)", text, re.DOTALL)
+            assert index.section_text(header, ends) == (expected.group(1) if expected else None), text
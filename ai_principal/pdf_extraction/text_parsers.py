@@ -0,0 +1,190 @@
+"""
+Parsers de exames em texto livre com custo linear no tamanho do texto
+Substituem os padrões `re.finditer` com quantificadores preguiçosos sobre
+classes que atravessam quebras de linha, que retrocedem em textos longos
+"""
+
+import re
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Segmentos ancorados usados pelo parser genérico. Cada um casa uma única
+# classe de caracteres (ou um literal) sem ambiguidade, então nenhum deles
+# retrocede; o varrimento avança sempre para a frente no texto.
+_GENERIC_NAME_RUN = re.compile(r"[\w\s-]+", re.IGNORECASE)
+_GENERIC_VALUE = re.compile(r":\s+([\d.,]+)\s*", re.IGNORECASE)
+_GENERIC_UNIT = re.compile(r"[a-zA-Z%/]+", re.IGNORECASE)
+_GENERIC_KEYWORD = re.compile(r"(?:Valor\s+de\s+Referência|Referência):", re.IGNORECASE)
+_GENERIC_REFERENCE_RUN = re.compile(r"[\w\s.,<>-]*", re.IGNORECASE)
+
+# Segmentos do formato Ramos Medicina
+_RAMOS_NAME_RUN = re.compile(r"[\w\s]+")
+_RAMOS_VALUE_UNIT = re.compile(r":\s+([\d.,]+)\s+([a-zA-Z%/]+)")
+_RAMOS_KEYWORD = re.compile(r"\s+Referência:")
+_RAMOS_REFERENCE_RUN = re.compile(r"[\d.,\s-]*")
+
+_WHITESPACE = re.compile(r"\s*")
+
+def _match_reference(text: str, pos: int, run_pattern: "re.Pattern") -> Optional[Tuple[str, int]]:
+    """
+    Casa `\\s+(classe)+` a partir de `pos`, onde a classe inclui espaços
+
+    Reproduz o comportamento dos padrões originais: os espaços iniciais vão
+    para o separador, exceto um quando a classe não teria nenhum caractere.
+
+    Returns:
+        Tupla (referência, fim do casamento) ou None
+    """
+    ws_end = _WHITESPACE.match(text, pos).end()
+    spaces = ws_end - pos
+    if spaces == 0:
+        return None
+
+    end = run_pattern.match(text, ws_end).end()
+    if end > ws_end:
+        return text[ws_end:end], end
+
+    # Nenhum caractere além dos espaços: o separador devolve um espaço
+    if spaces >= 2:
+        return text[ws_end - 1:ws_end], ws_end
+    return None
+
+def _match_generic_tail(text: str, colon: int) -> Optional[Tuple[Dict[str, Any], int]]:
+    """
+    Casa o trecho após o nome do exame no formato genérico
+
+    Formato: ": RESULTADO [UNIDADE] (Valor de Referência|Referência): REF"
+
+    Returns:
+        Tupla (campos do exame, fim do casamento) ou None
+    """
+    value = _GENERIC_VALUE.match(text, colon)
+    if not value:
+        return None
+
+    pos = value.end()
+    unit = None
+    keyword = None
+
+    # A unidade é o maior prefixo da sequência de letras que ainda deixa a
+    # palavra-chave de referência logo em seguida (como no retrocesso do regex)
+    unit_run = _GENERIC_UNIT.match(text, pos)
+    if unit_run:
+        for cut in range(unit_run.end(), pos, -1):
+            after = _WHITESPACE.match(text, cut).end()
+            keyword = _GENERIC_KEYWORD.match(text, after)
+            if keyword:
+                unit = text[pos:cut]
+                break
+
+    if keyword is None:
+        keyword = _GENERIC_KEYWORD.match(text, pos)
+        if keyword is None:
+            return None
+
+    reference = _match_reference(text, keyword.end(), _GENERIC_REFERENCE_RUN)
+    if reference is None:
+        return None
+
+    fields = {
+        "result": value.group(1),
+        "unit": unit,
+        "reference": reference[0]
+    }
+    return fields, reference[1]
+
+def parse_generic_exams(text: str) -> List[Dict[str, Any]]:
+    """
+    Extrai exames no formato "NOME: RESULTADO UNIDADE Referência: REF"
+
+    Produz os mesmos exames que o padrão
+    `([\\w\\s-]+?):\\s+([\\d.,]+)\\s*([a-zA-Z%/]+)?\\s*(?:Valor\\s+de\\s+Referência|Referência):\\s+([\\w\\s.,<>-]+)`
+    com `re.IGNORECASE`, mas em uma única passada: cada sequência de
+    caracteres de nome é examinada uma vez, a partir do ':' que a encerra.
+
+    Args:
+        text: Texto do laudo
+
+    Returns:
+        Lista de dicionários com dados dos exames
+    """
+    exams = []
+    pos = 0
+    length = len(text)
+
+    while pos < length:
+        name_run = _GENERIC_NAME_RUN.search(text, pos)
+        if not name_run:
+            break
+
+        start, colon = name_run.start(), name_run.end()
+        if colon < length and text[colon] == ":":
+            tail = _match_generic_tail(text, colon)
+            if tail:
+                fields, end = tail
+                exams.append({
+                    "name": text[start:colon].strip(),
+                    "result": fields["result"].strip(),
+                    "unit": fields["unit"].strip() if fields["unit"] else "",
+                    "reference": fields["reference"].strip(),
+                    "source": "text"
+                })
+                pos = end
+                continue
+
+        pos = colon + 1
+
+    return exams
+
+def parse_ramos_exams(text: str) -> List[Dict[str, Any]]:
+    """
+    Extrai exames no formato Ramos Medicina "Nome: 15.2 g/dL Referência: 13.5 - 17.5"
+
+    Produz os mesmos exames que o padrão
+    `([\\w\\s]+):\\s+([\\d.,]+)\\s+([a-zA-Z%/]+)(?:\\s+Referência:\\s+([\\d.,\\s-]+))?`
+    em uma única passada sobre o texto.
+
+    Args:
+        text: Texto da seção de resultados
+
+    Returns:
+        Lista de dicionários com dados dos exames
+    """
+    exams = []
+    pos = 0
+    length = len(text)
+
+    while pos < length:
+        name_run = _RAMOS_NAME_RUN.search(text, pos)
+        if not name_run:
+            break
+
+        start, colon = name_run.start(), name_run.end()
+        value_unit = _RAMOS_VALUE_UNIT.match(text, colon) if colon < length else None
+        if value_unit:
+            end = value_unit.end()
+            reference = ""
+
+            keyword = _RAMOS_KEYWORD.match(text, end)
+            if keyword:
+                matched = _match_reference(text, keyword.end(), _RAMOS_REFERENCE_RUN)
+                if matched:
+                    reference, end = matched
+
+            exams.append({
+                "name": text[start:colon].strip(),
+                "result": value_unit.group(1).strip(),
+                "unit": value_unit.group(2).strip(),
+                "reference": reference.strip(),
+                "source": "text_pattern"
+            })
+            pos = end
+            continue
+
+        pos = colon + 1
+
+    return exams
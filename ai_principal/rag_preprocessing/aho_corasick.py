@@ -0,0 +1,82 @@
+"""
+Autômato de Aho–Corasick para busca simultânea de vários termos
+Encontra todas as ocorrências de um conjunto de termos em uma única passada
+(mesma implementação de pdf_extraction/aho_corasick.py: os dois pacotes usam
+apenas importações relativas e não importam um do outro)
+"""
+
+from collections import deque
+from typing import Dict, List, Iterable, Iterator, Tuple
+
+class AhoCorasick:
+    """
+    Autômato de busca multi-padrão
+
+    Os termos são compilados uma vez em uma trie com ligações de falha; a
+    busca percorre o texto uma única vez, em tempo linear no tamanho do
+    texto mais o número de ocorrências, independente da quantidade de termos.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Compila o autômato
+
+        Args:
+            patterns: Termos a buscar; o identificador de cada termo é a sua
+                      posição na sequência
+        """
+        self.patterns: List[str] = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            if pattern:
+                self._add(pattern, pattern_id)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, pattern_id: int) -> None:
+        """Insere um termo na trie"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _build_failure_links(self) -> None:
+        """Calcula as ligações de falha em largura, herdando as saídas"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """
+        Percorre o texto emitindo as ocorrências dos termos
+
+        Args:
+            text: Texto a ser varrido
+
+        Yields:
+            Tuplas (posição final exclusiva, identificador do termo)
+        """
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_id in self._output[state]:
+                yield index + 1, pattern_id
@@ -0,0 +1,275 @@
+"""
+Normalização em lote, em colunas
+Carrega vários documentos extraídos (`_extracted.json`) em colunas (nomes,
+resultados, unidades, referências e datas), normaliza cada coluna sobre os
+seus valores distintos, com cache entre lotes, e devolve os documentos
+normalizados
+"""
+
+import json
+import math
+import logging
+import numpy as np
+from typing import Dict, List, Any, Callable, Hashable, Optional, Sequence, Tuple
+from .normalizer import ExamNormalizer
+from .reference_ranges import evaluate_reference_ranges, exam_reference_text, apply_flags
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Valores em cache por coluna mantidos entre lotes; acima disso o cache da coluna é esvaziado
+BATCH_CACHE_MAX_ENTRIES = 100_000
+
+def _factorize(values: Sequence[Hashable]) -> Tuple[List[Hashable], np.ndarray]:
+    """
+    Códigos dos valores distintos de uma coluna
+
+    Args:
+        values: Coluna de valores
+
+    Returns:
+        Tupla (valores distintos na ordem de aparição, código de cada linha)
+    """
+    positions: Dict[Hashable, int] = {}
+    codes = np.array([positions.setdefault(value, len(positions)) for value in values], dtype=np.int64)
+    return list(positions), codes
+
+class ExamColumns:
+    """
+    Exames de vários documentos em colunas
+
+    Cada linha é um exame; `document` guarda o índice do documento de origem.
+    Os dados do paciente ficam em colunas por documento.
+    """
+
+    EXAM_FIELDS = ('name', 'result', 'unit')
+    PATIENT_FIELDS = ('name', 'gender', 'exam_date', 'date_of_birth')
+
+    def __init__(self, documents: Sequence[Dict[str, Any]]):
+        """
+        Monta as colunas
+
+        Args:
+            documents: Dados extraídos de cada documento
+        """
+        self.documents = list(documents)
+        self.patients: List[Optional[Dict[str, Any]]] = [
+            document.get('patient') if 'patient' in document else None for document in self.documents
+        ]
+        self.exams: List[Dict[str, Any]] = []
+        document_ids: List[int] = []
+
+        for i, document in enumerate(self.documents):
+            exams = document.get('exams') if 'exams' in document else None
+            if exams:
+                self.exams.extend(exams)
+                document_ids.extend([i] * len(exams))
+
+        self.document = np.asarray(document_ids, dtype=np.int64)
+        self.exam_columns = {field: [exam.get(field) for exam in self.exams] for field in self.EXAM_FIELDS}
+        self.patient_columns = {
+            field: [(patient or {}).get(field) for patient in self.patients] for field in self.PATIENT_FIELDS
+        }
+
+    @classmethod
+    def from_files(cls, paths: Sequence[str]) -> "ExamColumns":
+        """
+        Carrega as colunas a partir de arquivos `_extracted.json`
+
+        Args:
+            paths: Caminhos dos arquivos
+
+        Returns:
+            Colunas dos documentos, na ordem dos arquivos
+        """
+        documents = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                documents.append(json.load(f))
+        return cls(documents)
+
+    def __len__(self) -> int:
+        return len(self.exams)
+
+class BatchNormalizer:
+    """
+    Normalizador em colunas
+
+    Aplica as mesmas regras do `ExamNormalizer` (o resultado é idêntico ao de
+    `normalize_exam_data` documento a documento), mas cada função de
+    normalização roda uma única vez por valor distinto de cada coluna; os
+    valores já normalizados ficam em cache entre lotes, até
+    `max_cache_entries` por coluna. A sinalização das faixas de referência é
+    calculada de uma vez para todos os exames do lote.
+    """
+
+    def __init__(self, normalizer: Optional[ExamNormalizer] = None,
+                 max_cache_entries: int = BATCH_CACHE_MAX_ENTRIES):
+        """
+        Inicializa o normalizador em lote
+
+        Args:
+            normalizer: Normalizador com as regras a aplicar (padrão: regras padrão)
+            max_cache_entries: Valores em cache mantidos por coluna entre lotes
+        """
+        self.normalizer = normalizer or ExamNormalizer()
+        self.max_cache_entries = max_cache_entries
+        self._caches: Dict[str, Dict[Hashable, Any]] = {}
+
+    def _map_column(self, column: str, values: Sequence[Any], func: Callable[[Any], Any]) -> List[Any]:
+        """
+        Normaliza uma coluna pelos seus valores distintos
+
+        Valores vazios (falsos) são mantidos, como em `ExamNormalizer`.
+
+        Args:
+            column: Nome da coluna (identifica o cache)
+            values: Valores da coluna
+            func: Função de normalização de um valor
+
+        Returns:
+            Coluna normalizada
+        """
+        cache = self._caches.setdefault(column, {})
+        uniques, codes = _factorize(values)
+
+        mapped = np.empty(len(uniques), dtype=object)
+        for i, value in enumerate(uniques):
+            if not value:
+                mapped[i] = value
+                continue
+            if value not in cache:
+                cache[value] = func(value)
+            mapped[i] = cache[value]
+
+        # Colunas de alta cardinalidade (nomes de pacientes, resultados) não
+        # devem crescer sem limite entre lotes
+        if len(cache) > self.max_cache_entries:
+            cache.clear()
+
+        return mapped[codes].tolist()
+
+    def normalize_columns(self, columns: ExamColumns) -> Dict[str, Any]:
+        """
+        Normaliza as colunas de um lote
+
+        Args:
+            columns: Colunas dos documentos
+
+        Returns:
+            Dicionário com as colunas normalizadas: 'exam' (nome, resultado,
+            unidade e as colunas de `evaluate_reference_ranges`) e 'patient'
+        """
+        normalizer = self.normalizer
+        exam = {
+            'name': self._map_column('exam_name', columns.exam_columns['name'], normalizer._normalize_exam_name),
+            'result': self._map_column('result', columns.exam_columns['result'], normalizer._normalize_result_value),
+            'unit': self._map_column('unit', columns.exam_columns['unit'], normalizer._normalize_unit)
+        }
+        patient = {
+            'name': self._map_column('patient_name', columns.patient_columns['name'], normalizer._normalize_name),
+            'gender': self._map_column('gender', columns.patient_columns['gender'], normalizer._normalize_gender),
+            'exam_date': self._map_column('date', columns.patient_columns['exam_date'], normalizer._normalize_date),
+            'date_of_birth': self._map_column('date', columns.patient_columns['date_of_birth'],
+                                              normalizer._normalize_date)
+        }
+
+        # Sexo e idade de cada exame, pelo documento de origem. Os resultados
+        # são avaliados a partir do texto extraído, com ponto de milhar
+        # ("5.900" é 5900, não o 5.9 de `_normalize_result_value`)
+        ages = [(p or {}).get('age') for p in columns.patients]
+        sexes = [
+            patient['gender'][i] if columns.patients[i] is not None else None
+            for i in range(len(columns.patients))
+        ]
+        exam['flags'] = evaluate_reference_ranges(
+            [exam_reference_text(e) for e in columns.exams],
+            columns.exam_columns['result'],
+            [sexes[i] for i in columns.document.tolist()],
+            [ages[i] for i in columns.document.tolist()],
+            normalizer.unit_converter.reference_factors(exam['name'], exam['unit'], columns.exams)
+        )
+
+        exam['result_canonical'], exam['unit_canonical'] = normalizer.unit_converter.convert(
+            exam['name'], exam['flags']['value'], exam['unit']
+        )
+
+        return {'exam': exam, 'patient': patient}
+
+    def normalize_documents(self, documents: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Normaliza um lote de documentos
+
+        Args:
+            documents: Dados extraídos de cada documento (não são modificados)
+
+        Returns:
+            Documentos normalizados, na mesma ordem
+        """
+        columns = ExamColumns(documents)
+        normalized = self.normalize_columns(columns)
+        return self._write_back(columns, normalized)
+
+    def normalize_files(self, paths: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Normaliza um lote de arquivos `_extracted.json`
+
+        Args:
+            paths: Caminhos dos arquivos
+
+        Returns:
+            Documentos normalizados, na ordem dos arquivos
+        """
+        columns = ExamColumns.from_files(paths)
+        return self._write_back(columns, self.normalize_columns(columns))
+
+    def _write_back(self, columns: ExamColumns, normalized: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Monta os documentos normalizados a partir das colunas"""
+        exam_columns = normalized['exam']
+        patient_columns = normalized['patient']
+
+        # Exames: cópia de cada dicionário com os campos presentes substituídos
+        exams = []
+        for i, exam in enumerate(columns.exams):
+            copy = exam.copy()
+            for field in ExamColumns.EXAM_FIELDS:
+                if field in copy:
+                    copy[field] = exam_columns[field][i]
+            copy['normalized'] = True
+            exams.append(copy)
+        apply_flags(exams, exam_columns['flags'])
+        canonical = zip(exam_columns['result_canonical'].tolist(), exam_columns['unit_canonical'])
+        for exam, (value, unit) in zip(exams, canonical):
+            exam['result_canonical'] = None if math.isnan(value) else round(value, 4)
+            exam['unit_canonical'] = unit
+
+        results = []
+        position = 0
+        for i, document in enumerate(columns.documents):
+            output = document.copy()
+
+            patient = columns.patients[i]
+            if patient is not None:
+                patient = patient.copy()
+                for field in ExamColumns.PATIENT_FIELDS:
+                    if field in patient:
+                        patient[field] = patient_columns[field][i]
+                output['patient'] = patient
+
+            if 'exams' in output:
+                count = len(output['exams'] or [])
+                output['exams'] = exams[position:position + count]
+                position += count
+
+            results.append(output)
+
+        return results
+
+    def cache_info(self) -> Dict[str, int]:
+        """Quantidade de valores em cache por coluna"""
+        return {column: len(cache) for column, cache in self._caches.items()}
+
+    def clear_cache(self) -> None:
+        """Esvazia o cache de todas as colunas"""
+        self._caches.clear()
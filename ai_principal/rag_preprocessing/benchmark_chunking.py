@@ -0,0 +1,259 @@
+"""
+Benchmark do chunking com documentos sintéticos
+Compara o total de tokens enviados para embedding por documento no chunking
+por caracteres e no chunking com orçamento de tokens, e mede a vazão do
+chunking em laudos grandes contra a implementação anterior
+"""
+
+import gc
+import time
+import argparse
+import logging
+from typing import Dict, List, Any, Tuple
+from .normalizer import ExamNormalizer
+from .chunking import ExamChunker
+from .tokens import TokenCounter
+from .benchmark_normalizer import build_documents
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Configurações comparadas: (unidade, chunk_size, chunk_overlap)
+DEFAULT_CONFIGS = [("chars", 1000, 200), ("tokens", 256, 32), ("tokens", 512, 64)]
+
+def legacy_chunk_exam_data(chunker: ExamChunker, exam_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Implementação anterior do chunking por caracteres, mantida como referência
+
+    O texto do chunk cresce com `+=`, os exames da sobreposição são
+    formatados de novo a cada chunk fechado e o resumo percorre os exames
+    outra vez. A regra de sobreposição é a de `pack_ranges` (os últimos
+    exames que cabem em `chunk_overlap` caracteres), para que a saída seja
+    comparável com a atual.
+
+    Args:
+        chunker: Chunker com as configurações (apenas o modo 'chars')
+        exam_data: Dados normalizados de um documento
+
+    Returns:
+        Lista de chunks com metadados
+    """
+    def range_metadata(exams):
+        out_of_range_exams = [e.get('name', 'Unknown Exam') for e in exams if e.get('out_of_range')]
+        return {
+            'out_of_range': bool(out_of_range_exams),
+            'out_of_range_exams': out_of_range_exams,
+            'deviations': [e.get('deviation') for e in exams]
+        }
+
+    def results_chunk(text, exams):
+        return {
+            'chunk_type': 'exam_results',
+            'text': text,
+            'metadata': {
+                **common_metadata,
+                'section': 'exam_results',
+                'exams': [e.get('name', 'Unknown Exam') for e in exams],
+                **range_metadata(exams)
+            }
+        }
+
+    patient_data = exam_data.get('patient', {})
+    common_metadata = {
+        'source': exam_data.get('metadata', {}).get('filename', 'unknown_file'),
+        'patient_name': patient_data.get('name', 'Desconhecido'),
+        'exam_date': patient_data.get('exam_date'),
+        'document_type': 'medical_exam'
+    }
+    if patient_data.get('age'):
+        common_metadata['patient_age'] = patient_data.get('age')
+    if patient_data.get('gender'):
+        common_metadata['patient_gender'] = patient_data.get('gender')
+
+    chunks = [{
+        'chunk_type': 'patient_info',
+        'text': chunker._format_patient_info(patient_data),
+        'metadata': {**common_metadata, 'section': 'patient_info'}
+    }]
+
+    exams = exam_data.get('exams', [])
+    if exams:
+        current_chunk_text = ""
+        current_chunk_exams = []
+        for exam in exams:
+            exam_text = chunker._format_exam_info(exam)
+            if current_chunk_exams and len(current_chunk_text) + 2 + len(exam_text) > chunker.chunk_size:
+                chunks.append(results_chunk(current_chunk_text, current_chunk_exams))
+                overlap_text = ""
+                overlap_exams = []
+                for e in reversed(current_chunk_exams[1:]):
+                    candidate = chunker._format_exam_info(e) + ("\n\n" + overlap_text if overlap_exams else "")
+                    if (len(candidate) > chunker.chunk_overlap
+                            or len(candidate) + 2 + len(exam_text) > chunker.chunk_size):
+                        break
+                    overlap_text = candidate
+                    overlap_exams.insert(0, e)
+                current_chunk_text = overlap_text
+                current_chunk_exams = overlap_exams
+            current_chunk_text += ("\n\n" if current_chunk_exams else "") + exam_text
+            current_chunk_exams.append(exam)
+        if current_chunk_text:
+            chunks.append(results_chunk(current_chunk_text, current_chunk_exams))
+
+        lines = [f"Resumo de Exames - {patient_data.get('name', 'Paciente')}"]
+        if patient_data.get('exam_date'):
+            lines.append(f"Data: {patient_data['exam_date']}")
+        lines += ["", f"Total de exames: {len(exams)}", "", "Exames realizados:"]
+        for i, exam in enumerate(exams, 1):
+            result_str = f"{exam.get('result', 'Não informado')} {exam.get('unit', '')}".strip()
+            lines.append(f"{i}. {exam.get('name', 'Exame sem nome')}: {result_str}")
+        chunks.append({
+            'chunk_type': 'exam_summary',
+            'text': "\n".join(lines),
+            'metadata': {**common_metadata, 'section': 'exam_summary', **range_metadata(exams)}
+        })
+
+    return chunks
+
+def run_benchmark(configs: List[Tuple[str, int, int]], documents: int = 200,
+                  exams_per_document: int = 40, model: str = "text-embedding-3-small") -> List[Dict[str, Any]]:
+    """
+    Mede chunks e tokens de embedding por documento para cada configuração
+
+    Args:
+        configs: Lista de (unidade, chunk_size, chunk_overlap)
+        documents: Quantidade de documentos sintéticos
+        exams_per_document: Quantidade de exames por documento
+        model: Modelo de embedding cujo tokenizador conta os tokens
+
+    Returns:
+        Lista de resultados por configuração
+    """
+    normalizer = ExamNormalizer()
+    normalized = [
+        normalizer.normalize_exam_data(doc)
+        for doc in build_documents(documents * exams_per_document, exams_per_document)
+    ]
+    counter = TokenCounter(model)
+
+    results = []
+    for unit, chunk_size, chunk_overlap in configs:
+        chunker = ExamChunker(chunk_size, chunk_overlap, length_unit=unit, encoding_model=model)
+
+        start = time.perf_counter()
+        chunks = [chunk for doc in normalized for chunk in chunker.chunk_exam_data(doc)]
+        seconds = time.perf_counter() - start
+
+        tokens = counter.count_batch([chunk['text'] for chunk in chunks])
+        exam_chunks = [t for chunk, t in zip(chunks, tokens) if chunk['chunk_type'] == 'exam_results']
+        results.append({
+            "unit": unit,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "chunks_per_document": len(chunks) / len(normalized),
+            "tokens_per_document": sum(tokens) / len(normalized),
+            "max_exam_chunk_tokens": max(exam_chunks, default=0),
+            "seconds": seconds
+        })
+
+    if not counter.exact:
+        logger.warning("Contagem de tokens aproximada: a codificação do tiktoken não pôde ser carregada")
+    return results
+
+def _best_time(func, docs: List[Dict[str, Any]], repeat: int) -> Tuple[float, List[Any]]:
+    """Menor tempo de `repeat` execuções de `func` sobre os documentos, sem coleta de lixo"""
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = [func(doc) for doc in docs]
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, result
+
+def run_throughput(exams_per_document: List[int], documents: int = 20,
+                   check: bool = True, repeat: int = 5) -> List[Dict[str, Any]]:
+    """
+    Mede a vazão do chunking por caracteres antes e depois da formatação única
+
+    Args:
+        exams_per_document: Tamanhos de laudo (quantidade de exames)
+        documents: Quantidade de documentos por tamanho
+        check: Verificar se os chunks das duas versões são idênticos
+        repeat: Execuções por versão (vale a mais rápida)
+
+    Returns:
+        Lista de resultados por tamanho de laudo
+    """
+    normalizer = ExamNormalizer()
+    chunker = ExamChunker()
+
+    results = []
+    for size in exams_per_document:
+        normalized = [normalizer.normalize_exam_data(doc) for doc in build_documents(documents * size, size)]
+
+        legacy_seconds, legacy = _best_time(lambda doc: legacy_chunk_exam_data(chunker, doc), normalized, repeat)
+        current_seconds, current = _best_time(chunker.chunk_exam_data, normalized, repeat)
+
+        if check and legacy != current:
+            raise AssertionError("Chunks divergentes entre a implementação anterior e a atual")
+
+        results.append({
+            "exams_per_document": size,
+            "documents": documents,
+            "legacy_docs_per_second": documents / legacy_seconds,
+            "current_docs_per_second": documents / current_seconds
+        })
+    return results
+
+def print_throughput(results: List[Dict[str, Any]]) -> None:
+    """Imprime a vazão do chunking em formato de tabela"""
+    print(f"{'Exames/doc':>11} {'Documentos':>11} {'Anterior (doc/s)':>17} {'Atual (doc/s)':>14} {'Ganho':>7}")
+    for r in results:
+        speedup = r["current_docs_per_second"] / r["legacy_docs_per_second"]
+        print(f"{r['exams_per_document']:>11} {r['documents']:>11} {r['legacy_docs_per_second']:>17.1f} "
+              f"{r['current_docs_per_second']:>14.1f} {speedup:>6.1f}x")
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """Imprime o resultado do benchmark em formato de tabela"""
+    print(f"{'Unidade':>8} {'Tamanho':>8} {'Sobrep.':>8} {'Chunks/doc':>11} "
+          f"{'Tokens/doc':>11} {'Maior chunk':>12} {'Tempo (s)':>10}")
+    for r in results:
+        print(f"{r['unit']:>8} {r['chunk_size']:>8} {r['chunk_overlap']:>8} {r['chunks_per_document']:>11.1f} "
+              f"{r['tokens_per_document']:>11.0f} {r['max_exam_chunk_tokens']:>12} {r['seconds']:>10.3f}")
+
+def _parse_config(value: str) -> Tuple[str, int, int]:
+    """Interpreta uma configuração no formato unidade:tamanho:sobreposição"""
+    unit, size, overlap = value.split(":")
+    return unit, int(size), int(overlap)
+
+def main():
+    """Função principal para execução via linha de comando"""
+    parser = argparse.ArgumentParser(description="Benchmark de tokens de embedding por modo de chunking")
+    parser.add_argument("--configs", type=_parse_config, nargs="+", default=DEFAULT_CONFIGS,
+                        help="Configurações no formato unidade:tamanho:sobreposição (ex.: tokens:512:64)")
+    parser.add_argument("--documents", type=int, default=200, help="Quantidade de documentos")
+    parser.add_argument("--exams-per-document", type=int, default=40, help="Quantidade de exames por documento")
+    parser.add_argument("--model", type=str, default="text-embedding-3-small", help="Modelo de embedding")
+    parser.add_argument("--throughput", type=int, nargs="+", metavar="EXAMES",
+                        help="Medir a vazão do chunking para laudos com essas quantidades de exames (ex.: 500 1000)")
+    parser.add_argument("--no-check", action="store_true", help="Não comparar os chunks das duas versões")
+
+    args = parser.parse_args()
+
+    try:
+        if args.throughput:
+            print_throughput(run_throughput(args.throughput, check=not args.no_check))
+        else:
+            print_report(run_benchmark(args.configs, args.documents, args.exams_per_document, args.model))
+    except Exception as e:
+        logger.error(f"Erro durante o benchmark: {e}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark da normalização com documentos sintéticos
+Compara a normalização documento a documento (`ExamNormalizer.normalize_exam_data`)
+com a normalização em colunas (`BatchNormalizer`)
+"""
+
+import time
+import random
+import argparse
+import logging
+from typing import Dict, List, Any
+from .normalizer import ExamNormalizer
+from .batch_normalizer import BatchNormalizer
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Exames sintéticos: (nome como extraído, unidade, referência, faixa de resultados)
+_EXAMS = [
+    ("HEMOGLOBINA", "g/dl", "Homens 13,0 a 16,5 Mulheres 12,0 a 15,8", (10.0, 18.0)),
+    ("Glicose - jejum", "mg/dl", "70 a 99 mg/dL", (60.0, 180.0)),
+    ("Colesterol Total", "mg/dL", "< 190 mg/dL", (120.0, 280.0)),
+    ("HDL Colesterol", "mg/dl", "> 40 mg/dL", (25.0, 90.0)),
+    ("Creatinina", "mg/dl", "0,54 - 1,24", (0.4, 2.0)),
+    ("TGP/ALT", "u/l", "Até 41 U/L", (10.0, 90.0)),
+    ("Fosfatase alcalina", "U/L", "40 a 129 U/L", (30.0, 200.0)),
+    ("Ferritina", "ng/ml", "30 a 400 ng/mL", (10.0, 600.0)),
+    ("TSH", "uiu/ml", "0,27 a 4,20", (0.1, 8.0)),
+    ("Plaquetas", "/mm3", "150.000 a 450.000", (90000.0, 500000.0)),
+    ("Proteína C Reativa", "mg/dl", "Inferior a 0,5", (0.1, 3.0)),
+    ("VDRL", "", "Não reagente", None)
+]
+
+def build_documents(exams: int, exams_per_document: int = 20, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Gera documentos extraídos sintéticos
+
+    Args:
+        exams: Quantidade total de exames
+        exams_per_document: Quantidade de exames por documento
+        seed: Semente do gerador aleatório
+
+    Returns:
+        Lista de documentos no formato de `extract_all`
+    """
+    rng = random.Random(seed)
+    documents = []
+    remaining = exams
+
+    while remaining > 0:
+        count = min(exams_per_document, remaining)
+        remaining -= count
+        document = {
+            "metadata": {"filename": f"laudo_{len(documents)}.pdf", "pages": 2},
+            "patient": {
+                "name": f"  paciente   {len(documents)} da silva ",
+                "age": rng.randint(1, 90),
+                "gender": rng.choice(["M", "F", "Masculino", "FEMININO", None]),
+                "date_of_birth": None,
+                "document": None,
+                "exam_date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024"
+            },
+            "exams": []
+        }
+        for _ in range(count):
+            name, unit, reference, span = rng.choice(_EXAMS)
+            if span is None:
+                result = "Não reagente"
+            elif span[0] >= 1000:
+                # Contagens com ponto de milhar, como nos laudos ("250.000")
+                result = f"{round(rng.uniform(*span)):,}".replace(",", ".")
+            else:
+                result = f"{rng.uniform(*span):.1f}".replace(".", ",")
+            document["exams"].append({"name": name, "result": result, "unit": unit, "reference": reference})
+        documents.append(document)
+
+    return documents
+
+def _time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def run_benchmark(sizes: List[int], check: bool = True) -> List[Dict[str, Any]]:
+    """
+    Mede a normalização documento a documento e em colunas
+
+    Args:
+        sizes: Quantidades de exames
+        check: Verificar se os dois resultados são idênticos
+
+    Returns:
+        Lista de resultados por tamanho
+    """
+    results = []
+    for size in sizes:
+        documents = build_documents(size)
+
+        normalizer = ExamNormalizer()
+        legacy_seconds, legacy = _time_call(
+            lambda docs: [normalizer.normalize_exam_data(doc) for doc in docs], documents
+        )
+        batch_seconds, batch = _time_call(BatchNormalizer(ExamNormalizer()).normalize_documents, documents)
+
+        if check and legacy != batch:
+            raise AssertionError("Resultados divergentes entre a normalização por documento e em colunas")
+
+        results.append({
+            "exams": size,
+            "documents": len(documents),
+            "legacy_seconds": legacy_seconds,
+            "batch_seconds": batch_seconds
+        })
+    return results
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """Imprime o resultado do benchmark em formato de tabela"""
+    print(f"{'Exames':>8} {'Documentos':>11} {'Por documento (s)':>18} {'Em colunas (s)':>15} {'Ganho':>7}")
+    for r in results:
+        speedup = r["legacy_seconds"] / r["batch_seconds"] if r["batch_seconds"] else float("inf")
+        print(f"{r['exams']:>8} {r['documents']:>11} {r['legacy_seconds']:>18.3f} "
+              f"{r['batch_seconds']:>15.3f} {speedup:>6.1f}x")
+
+def main():
+    """Função principal para execução via linha de comando"""
+    parser = argparse.ArgumentParser(description="Benchmark da normalização em lote")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Quantidades de exames")
+    parser.add_argument("--no-check", action="store_true", help="Não comparar os resultados das duas versões")
+
+    args = parser.parse_args()
+
+    try:
+        print_report(run_benchmark(args.sizes, check=not args.no_check))
+    except Exception as e:
+        logger.error(f"Erro durante o benchmark: {e}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Benchmark offline das estratégias de chunking
+Para cada estratégia do `ExamChunker`, mede o tamanho do índice (vetores e
+bytes), os tokens enviados para embedding e o recall@k de um conjunto de
+perguntas sintéticas sobre os resultados e as referências dos exames.
+
+Para rodar sem acesso à API, os embeddings são substituídos por vetores
+TF-IDF de palavras com hashing: a comparação entre estratégias mede se o
+fato procurado está em um chunk que a busca encontra, não a qualidade do
+modelo de embedding.
+"""
+
+import re
+import zlib
+import argparse
+import logging
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Any, Sequence, Tuple
+from .normalizer import ExamNormalizer
+from .chunking import ExamChunker
+from .tokens import TokenCounter
+from .benchmark_normalizer import build_documents
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Dimensão dos embeddings do modelo (text-embedding-ada-002/3-small), para o tamanho do índice
+EMBEDDING_DIMENSIONS = 1536
+
+# Dimensão dos vetores TF-IDF usados no lugar dos embeddings
+HASH_DIMENSIONS = 2048
+
+_WORD = re.compile(r"\w+")
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.casefold())
+
+class HashingEmbedder:
+    """
+    Vetores TF-IDF de palavras com hashing, normalizados
+
+    O IDF é calculado sobre os chunks do índice.
+    """
+
+    def __init__(self, corpus: Sequence[str], dimensions: int = HASH_DIMENSIONS):
+        """
+        Calcula o IDF das palavras do corpus
+
+        Args:
+            corpus: Textos indexados
+            dimensions: Dimensão dos vetores
+        """
+        self.dimensions = dimensions
+        frequency = Counter(word for text in corpus for word in set(_words(text)))
+        self.idf = {word: np.log((1 + len(corpus)) / (1 + count)) + 1 for word, count in frequency.items()}
+        self._default_idf = np.log(1 + len(corpus)) + 1
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Vetores de um lote de textos
+
+        Args:
+            texts: Textos
+
+        Returns:
+            Matriz (textos × dimensões) com linhas de norma 1
+        """
+        vectors = np.zeros((len(texts), self.dimensions))
+        for row, text in enumerate(texts):
+            for word, count in Counter(_words(text)).items():
+                column = zlib.crc32(word.encode()) % self.dimensions
+                vectors[row, column] += count * self.idf.get(word, self._default_idf)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+def build_queries(chunker: ExamChunker, document: Dict[str, Any]) -> List[Tuple[str, List[str]]]:
+    """
+    Perguntas sintéticas de um documento
+
+    Para cada exame: o resultado (respondido pelo texto do exame ou pela
+    linha do resumo) e, se houver, o valor de referência (respondido apenas
+    pelo texto completo do exame).
+
+    Args:
+        chunker: Chunker cuja formatação define os trechos esperados
+        document: Documento normalizado, com nomes de exames distintos
+
+    Returns:
+        Lista de (pergunta, trechos que a respondem)
+    """
+    queries = []
+    for exam in document.get('exams', []):
+        name = exam.get('name')
+        result_str = f"{exam.get('result', 'Não informado')} {exam.get('unit', '')}".strip()
+        queries.append((
+            f"Qual o resultado de {name}?",
+            [f"Exame: {name}\nResultado: {result_str}", f"{name}: {result_str}"]
+        ))
+        if exam.get('reference'):
+            queries.append((f"Qual o valor de referência de {name}?", [chunker._format_exam_info(exam)]))
+    return queries
+
+def _unique_exams(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Documento apenas com a primeira ocorrência de cada exame, para perguntas sem ambiguidade"""
+    seen = set()
+    exams = []
+    for exam in document.get('exams', []):
+        if exam.get('name') not in seen:
+            seen.add(exam.get('name'))
+            exams.append(exam)
+    return {**document, 'exams': exams}
+
+def run_benchmark(strategies: Sequence[str], ks: Sequence[int] = (1, 3, 5), documents: int = 200,
+                  exams_per_document: int = 20, chunk_size: int = 1000, chunk_overlap: int = 200,
+                  chunk_unit: str = "chars", model: str = "text-embedding-3-small") -> List[Dict[str, Any]]:
+    """
+    Mede índice, tokens e recall@k de cada estratégia
+
+    A busca de cada pergunta é feita entre os chunks do documento do
+    paciente, como nas consultas filtradas por `patient_name`.
+
+    Args:
+        strategies: Estratégias do ExamChunker
+        ks: Valores de k do recall
+        documents: Quantidade de documentos sintéticos
+        exams_per_document: Quantidade de exames por documento (antes de remover repetidos)
+        chunk_size: Tamanho máximo de cada chunk
+        chunk_overlap: Sobreposição entre chunks
+        chunk_unit: Unidade dos tamanhos ('chars' ou 'tokens')
+        model: Modelo de embedding cujo tokenizador conta os tokens
+
+    Returns:
+        Lista de resultados por estratégia
+    """
+    normalizer = ExamNormalizer()
+    normalized = [
+        _unique_exams(normalizer.normalize_exam_data(doc))
+        for doc in build_documents(documents * exams_per_document, exams_per_document)
+    ]
+    counter = TokenCounter(model)
+
+    results = []
+    for strategy in strategies:
+        chunker = ExamChunker(chunk_size, chunk_overlap, length_unit=chunk_unit,
+                              encoding_model=model, strategy=strategy)
+        index = [chunker.chunk_exam_data(doc) for doc in normalized]
+        texts = [chunk['text'] for chunks in index for chunk in chunks]
+        embedder = HashingEmbedder(texts)
+
+        hits = np.zeros(len(ks))
+        total = 0
+        for doc, chunks in zip(normalized, index):
+            queries = build_queries(chunker, doc)
+            if not queries:
+                continue
+            chunk_texts = [chunk['text'] for chunk in chunks]
+            scores = embedder.embed([q for q, _ in queries]) @ embedder.embed(chunk_texts).T
+            ranking = np.argsort(-scores, axis=1, kind="stable")
+
+            for (_, answers), ranked in zip(queries, ranking):
+                # Posição do primeiro chunk que contém a resposta (None se nenhum contém)
+                first = next((rank for rank, i in enumerate(ranked)
+                              if any(answer in chunk_texts[i] for answer in answers)), None)
+                hits += [first is not None and first < k for k in ks]
+            total += len(queries)
+
+        vectors = len(texts)
+        results.append({
+            "strategy": strategy,
+            "vectors": vectors,
+            "index_mb": vectors * EMBEDDING_DIMENSIONS * 4 / 1e6,
+            "tokens": sum(counter.count_batch(texts)),
+            "queries": total,
+            "recall": dict(zip(ks, (hits / max(total, 1)).tolist()))
+        })
+
+    if not counter.exact:
+        logger.warning("Contagem de tokens aproximada: a codificação do tiktoken não pôde ser carregada")
+    return results
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """Imprime o resultado do benchmark em formato de tabela"""
+    ks = list(results[0]["recall"]) if results else []
+    recall_header = " ".join(f"{f'R@{k}':>6}" for k in ks)
+    print(f"{'Estratégia':>13} {'Vetores':>8} {'Índice (MB)':>12} {'Tokens':>9} {'Perguntas':>10} {recall_header}")
+    for r in results:
+        recall = " ".join(f"{r['recall'][k]:>6.3f}" for k in ks)
+        print(f"{r['strategy']:>13} {r['vectors']:>8} {r['index_mb']:>12.1f} {r['tokens']:>9} "
+              f"{r['queries']:>10} {recall}")
+
+def main():
+    """Função principal para execução via linha de comando"""
+    parser = argparse.ArgumentParser(description="Benchmark offline das estratégias de chunking")
+    parser.add_argument("--strategies", type=str, nargs="+", default=list(ExamChunker.STRATEGIES),
+                        choices=list(ExamChunker.STRATEGIES), help="Estratégias comparadas")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5], help="Valores de k do recall@k")
+    parser.add_argument("--documents", type=int, default=200, help="Quantidade de documentos")
+    parser.add_argument("--exams-per-document", type=int, default=20, help="Quantidade de exames por documento")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Tamanho máximo de cada chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Sobreposição entre chunks")
+    parser.add_argument("--chunk-unit", type=str, default="chars", choices=["chars", "tokens"],
+                        help="Unidade de --chunk-size e --chunk-overlap")
+
+    args = parser.parse_args()
+
+    try:
+        print_report(run_benchmark(args.strategies, args.k, args.documents, args.exams_per_document,
+                                   args.chunk_size, args.chunk_overlap, args.chunk_unit))
+    except Exception as e:
+        logger.error(f"Erro durante o benchmark: {e}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -5,28 +5,102 @@ Responsável por dividir os documentos em chunks para processamento
 
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from itertools import compress
+from typing import Dict, List, Any, NamedTuple, Optional, Sequence, Tuple
+from .tokens import TokenCounter
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Painel de cada exame (nome canônico do ExamNormalizer) na estratégia 'per_panel'
+DEFAULT_EXAM_PANELS: Dict[str, str] = {
+    "Hemograma": "Hemograma",
+    "Hemoglobina": "Hemograma",
+    "Hematócrito": "Hemograma",
+    "Hemácias": "Hemograma",
+    "Leucócitos": "Hemograma",
+    "Plaquetas": "Hemograma",
+    "VHS": "Inflamação",
+    "Proteína C Reativa": "Inflamação",
+    "Glicose": "Glicemia",
+    "Hemoglobina Glicada": "Glicemia",
+    "Insulina": "Glicemia",
+    "Colesterol Total": "Perfil Lipídico",
+    "HDL-Colesterol": "Perfil Lipídico",
+    "LDL-Colesterol": "Perfil Lipídico",
+    "Triglicerídeos": "Perfil Lipídico",
+    "Creatinina": "Função Renal",
+    "Ureia": "Função Renal",
+    "Ácido Úrico": "Função Renal",
+    "TGO (AST)": "Função Hepática",
+    "TGP (ALT)": "Função Hepática",
+    "Gama-GT": "Função Hepática",
+    "Fosfatase Alcalina": "Função Hepática",
+    "Bilirrubina Total": "Função Hepática",
+    "TSH": "Tireoide",
+    "T4 Livre": "Tireoide",
+    "Sódio": "Eletrólitos",
+    "Potássio": "Eletrólitos",
+    "Cálcio": "Eletrólitos",
+    "Magnésio": "Eletrólitos",
+    "Ferritina": "Perfil de Ferro",
+    "Ferro Sérico": "Perfil de Ferro",
+    "Transferrina": "Perfil de Ferro",
+    "Vitamina B12": "Vitaminas",
+    "Vitamina D": "Vitaminas",
+    "VDRL": "Sorologia"
+}
+
+# Painel dos exames sem painel conhecido
+OTHER_PANEL = "Outros"
+
 class ExamChunker:
     """
     Classe para chunking de dados de exames médicos
     Divide os dados em chunks significativos para RAG
     """
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    # Unidades de medida de chunk_size e chunk_overlap
+    LENGTH_UNITS = ("chars", "tokens")
+    
+    # Estratégias de chunking dos resultados:
+    # - grouped: exames consecutivos agrupados até chunk_size, mais o resumo
+    # - per_exam: um chunk por exame, sem resumo
+    # - per_panel: um chunk por painel (dividido se passar de chunk_size), sem resumo
+    # - summary_only: apenas o resumo
+    STRATEGIES = ("grouped", "per_exam", "per_panel", "summary_only")
+    
+    # Separador entre exames dentro de um chunk
+    EXAM_SEPARATOR = "\n\n"
+    
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 length_unit: str = "chars", encoding_model: Optional[str] = None,
+                 strategy: str = "grouped", panels: Optional[Dict[str, str]] = None):
         """
         Inicializa o chunker com configurações específicas
         
         Args:
-            chunk_size: Tamanho máximo de cada chunk em caracteres
-            chunk_overlap: Sobreposição entre chunks em caracteres
+            chunk_size: Tamanho máximo de cada chunk (em caracteres ou tokens)
+            chunk_overlap: Sobreposição entre chunks (em caracteres ou tokens)
+            length_unit: Unidade de medida dos tamanhos ('chars' ou 'tokens')
+            encoding_model: Modelo de embedding cujo tokenizador é usado no modo 'tokens'
+            strategy: Estratégia de chunking dos resultados (ver STRATEGIES)
+            panels: Nome canônico do exame -> painel (padrão: DEFAULT_EXAM_PANELS)
         """
+        if length_unit not in self.LENGTH_UNITS:
+            raise ValueError(f"Unidade de tamanho inválida: {length_unit} (use {', '.join(self.LENGTH_UNITS)})")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Estratégia de chunking inválida: {strategy} (use {', '.join(self.STRATEGIES)})")
+        
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.length_unit = length_unit
+        self.strategy = strategy
+        self.token_counter = TokenCounter(encoding_model) if length_unit == "tokens" else None
+        
+        panels = panels if panels is not None else DEFAULT_EXAM_PANELS
+        self._panels = {name.casefold(): panel for name, panel in panels.items()}
     
     def chunk_exam_data(self, exam_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -69,63 +143,179 @@ class ExamChunker:
         }
         chunks.append(patient_chunk)
         
-        # 2. Chunks para exames individuais
+        # 2. Chunks de resultados: cada exame é formatado uma única vez e os
+        # chunks são montados por intervalos da lista formatada
         exams = exam_data.get('exams', [])
+        formatted = self._format_exams(exams or [])
         
-        # Agrupar exames em chunks significativos
-        if exams:
-            # Criar chunks de exames relacionados
-            current_chunk_text = ""
-            current_chunk_exams = []
-            
-            for exam in exams:
-                # Formatar exame como texto
-                exam_text = self._format_exam_info(exam)
-                
-                # Se adicionar este exame exceder o tamanho, criar um novo chunk
-                if len(current_chunk_text) + len(exam_text) > self.chunk_size and current_chunk_text:
-                    chunks.append({
-                        'chunk_type': 'exam_results',
-                        'text': current_chunk_text,
-                        'metadata': {
-                            **common_metadata,
-                            'section': 'exam_results',
-                            'exams': [e.get('name', 'Unknown Exam') for e in current_chunk_exams]
-                        }
-                    })
-                    
-                    # Iniciar novo chunk com sobreposição
-                    overlap_exams = current_chunk_exams[-2:] if len(current_chunk_exams) >= 2 else current_chunk_exams
-                    current_chunk_text = "\n\n".join(self._format_exam_info(e) for e in overlap_exams)
-                    current_chunk_exams = overlap_exams.copy()
-                
-                # Adicionar exame ao chunk atual
-                current_chunk_text += "\n\n" + exam_text
-                current_chunk_exams.append(exam)
-            
-            # Adicionar último chunk se houver dados
-            if current_chunk_text:
+        if exams and self.strategy != "summary_only":
+            chunks.extend(self._result_chunks(formatted, {**common_metadata, 'section': 'exam_results'}))
+        
+        # 3. Chunk com resumo completo (para consultas gerais)
+        if self.strategy in ("grouped", "summary_only"):
+            summary_text = self._create_exam_summary(patient_data, formatted)
+            if summary_text:
                 chunks.append({
-                    'chunk_type': 'exam_results',
-                    'text': current_chunk_text,
+                    'chunk_type': 'exam_summary',
+                    'text': summary_text,
                     'metadata': {
                         **common_metadata,
-                        'section': 'exam_results',
-                        'exams': [e.get('name', 'Unknown Exam') for e in current_chunk_exams]
+                        'section': 'exam_summary',
+                        **self._range_metadata(formatted, 0, len(exams))
                     }
                 })
         
-        # 3. Chunk com resumo completo (para consultas gerais)
-        summary_text = self._create_exam_summary(exam_data)
-        if summary_text:
-            chunks.append({
-                'chunk_type': 'exam_summary',
-                'text': summary_text,
-                'metadata': {**common_metadata, 'section': 'exam_summary'}
-            })
+        return chunks
+    
+    def _result_chunks(self, formatted: "FormattedExams", results_metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Chunks de resultados conforme a estratégia
+        
+        Args:
+            formatted: Exames formatados do documento
+            results_metadata: Metadados comuns aos chunks de resultados
+            
+        Returns:
+            Lista de chunks de resultados
+        """
+        if self.strategy == "per_panel":
+            formatted, segments = self._panel_segments(formatted)
+        else:
+            segments = [(None, 0, len(formatted.texts))]
+        
+        chunks = []
+        for panel, segment_start, segment_end in segments:
+            header = f"Painel: {panel}\n" if panel is not None else ""
+            texts = formatted.texts[segment_start:segment_end]
+            
+            for start, end, tokens in self._pack(texts, header):
+                start += segment_start
+                end += segment_start
+                text = header + self.EXAM_SEPARATOR.join(formatted.texts[start:end])
+                metadata = {
+                    **results_metadata,
+                    'exams': formatted.names[start:end],
+                    **self._range_metadata(formatted, start, end)
+                }
+                
+                if panel is not None:
+                    metadata['panel'] = panel
+                if tokens is not None:
+                    metadata['tokens'] = tokens
+                
+                chunks.append({'chunk_type': 'exam_results', 'text': text, 'metadata': metadata})
         
         return chunks
     
+    def _pack(self, texts: List[str], header: str = "") -> List[Tuple[int, int, Optional[int]]]:
+        """
+        Intervalos de exames de cada chunk de resultados
+        
+        Args:
+            texts: Texto de cada exame
+            header: Cabeçalho do chunk, descontado do tamanho máximo
+            
+        Returns:
+            Lista de (início, fim exclusivo, tokens do chunk); os tokens só
+            são contados no modo 'tokens'
+        """
+        if self.length_unit == "tokens":
+            lengths = self.token_counter.count_batch(texts)
+            separator = self.token_counter.count(self.EXAM_SEPARATOR)
+            header_tokens = self.token_counter.count(header) if header else 0
+            
+            if self.strategy == "per_exam":
+                ranges = [(i, i + 1) for i in range(len(texts))]
+            else:
+                ranges = pack_ranges(lengths, self.chunk_size - header_tokens, self.chunk_overlap, separator)
+            
+            return [
+                (start, end, header_tokens + sum(lengths[start:end]) + separator * (end - start - 1))
+                for start, end in ranges
+            ]
+        
+        if self.strategy == "per_exam":
+            return [(i, i + 1, None) for i in range(len(texts))]
+        ranges = pack_ranges([len(text) for text in texts], self.chunk_size - len(header), self.chunk_overlap,
+                             len(self.EXAM_SEPARATOR))
+        return [(start, end, None) for start, end in ranges]
+    
+    def _panel_segments(self, formatted: "FormattedExams") -> Tuple["FormattedExams", List[Tuple[str, int, int]]]:
+        """
+        Agrupa os exames por painel
+        
+        Os painéis ficam na ordem da primeira aparição e os exames de cada
+        painel mantêm a ordem do laudo.
+        
+        Args:
+            formatted: Exames formatados do documento
+            
+        Returns:
+            Tupla (exames reordenados por painel, lista de (painel, início, fim exclusivo))
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, name in enumerate(formatted.names):
+            panel = self._panels.get(str(name).casefold(), OTHER_PANEL)
+            groups.setdefault(panel, []).append(i)
+        
+        order = [i for indices in groups.values() for i in indices]
+        reordered = FormattedExams(*[[column[i] for i in order] for column in formatted])
+        
+        segments = []
+        start = 0
+        for panel, indices in groups.items():
+            segments.append((panel, start, start + len(indices)))
+            start += len(indices)
+        
+        return reordered, segments
+    
+    def _format_exams(self, exams: List[Dict[str, Any]]) -> "FormattedExams":
+        """
+        Formata todos os exames de um documento uma única vez
+        
+        Args:
+            exams: Exames do documento
+            
+        Returns:
+            Colunas com o texto, a linha de resumo, o nome nos metadados, a
+            sinalização e o desvio de cada exame
+        """
+        names = [exam.get('name', 'Exame sem nome') for exam in exams]
+        results = [f"{exam.get('result', 'Não informado')} {exam.get('unit', '')}".strip() for exam in exams]
+        
+        return FormattedExams(
+            texts=[self._format_exam_lines(*row) for row in zip(exams, names, results)],
+            summary_lines=[f"{name}: {result_str}" for name, result_str in zip(names, results)],
+            names=[exam.get('name', 'Unknown Exam') for exam in exams],
+            out_of_range=[bool(exam.get('out_of_range')) for exam in exams],
+            deviations=[exam.get('deviation') for exam in exams]
+        )
+    
+    def _range_metadata(self, formatted: "FormattedExams", start: int, end: int) -> Dict[str, Any]:
+        """
+        Metadados de resultados alterados dos exames de um intervalo
+        
+        Usa as anotações feitas pelo normalizador ('out_of_range' e
+        'deviation'), de modo que a busca por exames alterados seja um
+        simples filtro de metadados.
+        
+        Args:
+            formatted: Exames formatados do documento
+            start: Índice do primeiro exame
+            end: Índice final (exclusivo)
+            
+        Returns:
+            Dicionário com 'out_of_range', 'out_of_range_exams' e 'deviations'
+            (desvio de cada exame, na ordem dos exames; None se não avaliado)
+        """
+        out_of_range_exams = list(compress(formatted.names[start:end], formatted.out_of_range[start:end]))
+        
+        return {
+            'out_of_range': bool(out_of_range_exams),
+            'out_of_range_exams': out_of_range_exams,
+            'deviations': formatted.deviations[start:end]
+        }
+    
     def _format_patient_info(self, patient_data: Dict[str, Any]) -> str:
         """
         Formata as informações do paciente como texto
@@ -168,15 +358,26 @@ class ExamChunker:
         Returns:
             Texto formatado com informações do exame
         """
-        lines = []
-        
         name = exam.get('name', 'Exame sem nome')
-        result = exam.get('result', 'Não informado')
-        unit = exam.get('unit', '')
+        result_str = f"{exam.get('result', 'Não informado')} {exam.get('unit', '')}".strip()
+        return self._format_exam_lines(exam, name, result_str)
+    
+    def _format_exam_lines(self, exam: Dict[str, Any], name: Any, result_str: str) -> str:
+        """
+        Texto de um exame a partir do nome e do resultado já formatados
+        
+        Args:
+            exam: Dicionário com dados do exame
+            name: Nome do exame
+            result_str: Resultado com unidade
+            
+        Returns:
+            Texto formatado com informações do exame
+        """
+        lines = []
         reference = exam.get('reference', '')
         
         # Linha principal com nome e resultado
-        result_str = f"{result} {unit}".strip()
         lines.append(f"Exame: {name}\nResultado: {result_str}")
         
         # Adicionar valor de referência se disponível
@@ -211,20 +412,18 @@ class ExamChunker:
         
         return "\n".join(lines)
     
-    def _create_exam_summary(self, exam_data: Dict[str, Any]) -> str:
+    def _create_exam_summary(self, patient_data: Dict[str, Any], formatted: "FormattedExams") -> str:
         """
         Cria um resumo geral dos exames
         
         Args:
-            exam_data: Dicionário com todos os dados do exame
+            patient_data: Dicionário com dados do paciente
+            formatted: Exames formatados do documento
             
         Returns:
             Texto com resumo dos exames
         """
-        patient_data = exam_data.get('patient', {})
-        exams = exam_data.get('exams', [])
-        
-        if not exams:
+        if not formatted.summary_lines:
             return ""
         
         lines = []
@@ -236,16 +435,65 @@ class ExamChunker:
         lines.append("")
         
         # Lista de exames
-        lines.append(f"Total de exames: {len(exams)}")
+        lines.append(f"Total de exames: {len(formatted.summary_lines)}")
         lines.append("")
         lines.append("Exames realizados:")
+        lines.extend(f"{i}. {line}" for i, line in enumerate(formatted.summary_lines, 1))
         
-        for i, exam in enumerate(exams, 1):
-            name = exam.get('name', 'Exame sem nome')
-            result = exam.get('result', 'Não informado')
-            unit = exam.get('unit', '')
-            
-            result_str = f"{result} {unit}".strip()
-            lines.append(f"{i}. {name}: {result_str}")
+        return "\n".join(lines)
+
+class FormattedExams(NamedTuple):
+    """Exames de um documento formatados uma única vez, em colunas"""
+    texts: List[str]
+    summary_lines: List[str]
+    names: List[Any]
+    out_of_range: List[bool]
+    deviations: List[Optional[float]]
+
+def pack_ranges(lengths: Sequence[int], chunk_size: int, chunk_overlap: int,
+                separator: int = 0) -> List[Tuple[int, int]]:
+    """
+    Agrupa itens consecutivos em intervalos que respeitam um tamanho máximo
+    
+    Os itens nunca são divididos: um item maior que `chunk_size` forma um
+    intervalo sozinho. Cada intervalo seguinte começa pelos últimos itens do
+    anterior cujo tamanho somado (com separadores) não passa de
+    `chunk_overlap`, sempre avançando pelo menos um item.
+    
+    Args:
+        lengths: Tamanho de cada item
+        chunk_size: Tamanho máximo de um intervalo
+        chunk_overlap: Tamanho máximo da sobreposição entre intervalos
+        separator: Tamanho do separador entre itens
         
-        return "\n".join(lines)
\ No newline at end of file
+    Returns:
+        Lista de intervalos (início, fim exclusivo)
+    """
+    ranges = []
+    count = len(lengths)
+    start = 0
+    
+    while start < count:
+        end = start + 1
+        size = lengths[start]
+        while end < count and size + separator + lengths[end] <= chunk_size:
+            size += separator + lengths[end]
+            end += 1
+        ranges.append((start, end))
+        
+        if end >= count:
+            break
+        
+        # Sobreposição: recuar enquanto os itens finais couberem em chunk_overlap
+        # e ainda houver espaço para o próximo item
+        next_start = end
+        overlap = 0
+        while next_start - 1 > start:
+            added = lengths[next_start - 1] + (separator if overlap else 0)
+            if overlap + added > chunk_overlap or overlap + added + separator + lengths[end] > chunk_size:
+                break
+            overlap += added
+            next_start -= 1
+        start = next_start
+    
+    return ranges
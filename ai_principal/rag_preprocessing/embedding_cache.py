@@ -0,0 +1,201 @@
+"""
+Cache persistente de embeddings, endereçado pelo modelo e pelo texto
+Evita pedir novamente à API os embeddings de chunks que não mudaram entre
+execuções (blocos de paciente, laudos reprocessados)
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Diretório padrão do cache, limite de tamanho (em MB) e idade máxima sem acesso (em dias)
+EMBEDDING_CACHE_DIR = os.path.expanduser(os.getenv("BIOLAB_CACHE_DIR", os.path.join("~", ".cache", "biolab")))
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("BIOLAB_EMBEDDING_CACHE_MAX_MB", "1024"))
+EMBEDDING_CACHE_MAX_AGE_DAYS = float(os.getenv("BIOLAB_EMBEDDING_CACHE_MAX_AGE_DAYS", "90"))
+
+# Quantidade de chaves por consulta (abaixo do limite de parâmetros do SQLite)
+_LOOKUP_BATCH = 500
+
+def text_sha256(text: str) -> str:
+    """
+    Calcula o SHA-256 de um texto (UTF-8)
+
+    Args:
+        text: Texto do chunk
+
+    Returns:
+        Hash hexadecimal do texto
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class EmbeddingCache:
+    """
+    Cache em SQLite de embeddings
+
+    As entradas são identificadas por (modelo, SHA-256 do texto) e os vetores
+    ficam em BLOBs float32. Entradas sem acesso há mais de `max_age_days`
+    expiram; além disso, a remoção é LRU pelo tamanho total dos vetores.
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_bytes: Optional[int] = None,
+                 max_age_days: Optional[float] = None):
+        """
+        Inicializa o cache, criando o banco se necessário
+
+        Args:
+            cache_dir: Diretório do banco SQLite
+            max_bytes: Tamanho máximo total dos vetores em bytes
+            max_age_days: Dias sem acesso após os quais uma entrada expira
+        """
+        self.cache_dir = cache_dir or EMBEDDING_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else EMBEDDING_CACHE_MAX_MB * 1024 * 1024
+        self.max_age_days = max_age_days if max_age_days is not None else EMBEDDING_CACHE_MAX_AGE_DAYS
+        self.db_path = os.path.join(self.cache_dir, "embedding_cache.sqlite")
+
+        # Contadores da execução atual
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, sha256)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Busca os embeddings de um lote de textos
+
+        Args:
+            model: Nome do modelo de embedding
+            texts: Textos dos chunks
+
+        Returns:
+            Embedding de cada texto, na mesma ordem (None se não estiver no cache)
+        """
+        hashes = [text_sha256(text) for text in texts]
+        distinct = list(dict.fromkeys(hashes))
+        found: Dict[str, bytes] = {}
+
+        for start in range(0, len(distinct), _LOOKUP_BATCH):
+            batch = distinct[start:start + _LOOKUP_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT sha256, vector FROM embeddings WHERE model = ? AND sha256 IN ({placeholders})",
+                (model, *batch)
+            ).fetchall()
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE model = ? AND sha256 = ?",
+                [(now, model, digest) for digest in found]
+            )
+            self._conn.commit()
+
+        vectors = {digest: np.frombuffer(blob, dtype=np.float32).tolist() for digest, blob in found.items()}
+        results = [vectors.get(digest) for digest in hashes]
+        hits = sum(1 for vector in results if vector is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]) -> None:
+        """
+        Armazena os embeddings de um lote de textos
+
+        Embeddings vazios (falhas de geração) não são armazenados.
+
+        Args:
+            model: Nome do modelo de embedding
+            texts: Textos dos chunks
+            embeddings: Embedding de cada texto
+        """
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            if len(embedding) == 0:
+                continue
+            blob = np.asarray(embedding, dtype=np.float32).tobytes()
+            rows.append((model, text_sha256(text), blob, len(blob), now))
+
+        if not rows:
+            return
+
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, sha256, vector, size, last_access) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        self._conn.commit()
+        self.stored += len(rows)
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove as entradas expiradas e, em seguida, as acessadas há mais
+        tempo até respeitar o limite de tamanho
+
+        Returns:
+            Número de entradas removidas
+        """
+        removed = self._conn.execute(
+            "DELETE FROM embeddings WHERE last_access < ?",
+            (time.time() - self.max_age_days * 86400,)
+        ).rowcount
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT model, sha256, size FROM embeddings ORDER BY last_access ASC"
+            ).fetchall()
+            for model, sha256, size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM embeddings WHERE model = ? AND sha256 = ?", (model, sha256))
+                total -= size
+                removed += 1
+
+        self._conn.commit()
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Retorna os contadores da execução atual
+
+        Returns:
+            Dicionário com acertos, falhas, entradas armazenadas e remoções
+        """
+        return {"hits": self.hits, "misses": self.misses, "stored": self.stored, "evictions": self.evictions}
+
+    def close(self) -> None:
+        """Fecha a conexão com o banco"""
+        self._conn.close()
@@ -4,12 +4,18 @@ Responsável por converter dados de exames em vetores para busca semântica
 """
 
 import os
+import time
+import random
 import logging
 import json
+import threading
 import numpy as np
-from typing import Dict, List, Any, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Union
 from dotenv import load_dotenv
 import openai
+from .embedding_cache import EmbeddingCache
+from .tokens import TokenCounter
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -18,73 +24,252 @@ load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
 
+# Limites de cada requisição de embeddings (itens e tokens somados dos itens)
+MAX_BATCH_ITEMS = 2048
+MAX_BATCH_TOKENS = 250_000
+
+# Erros de um lote recusado (requisição inválida ou resposta incompatível com
+# o lote, ex.: quantidade errada de embeddings): não adianta repetir o mesmo
+# lote, mas as suas metades podem ser aceitas
+_INVALID_BATCH_ERRORS = tuple(
+    error for error in (getattr(openai, "BadRequestError", None),) if isinstance(error, type)
+) + (ValueError,)
+
+# Erros da API que não adianta repetir (lote inválido, credenciais)
+_NON_RETRYABLE_ERRORS = _INVALID_BATCH_ERRORS + tuple(
+    error for error in (getattr(openai, name, None) for name in (
+        "AuthenticationError", "PermissionDeniedError", "NotFoundError"
+    )) if isinstance(error, type)
+)
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def batch_ranges(lengths: Sequence[int], max_tokens: int, max_items: int) -> List[Tuple[int, int]]:
+    """
+    Divide itens consecutivos em lotes que respeitam os limites de uma requisição
+
+    Um item maior que `max_tokens` forma um lote sozinho.
+
+    Args:
+        lengths: Tokens de cada item
+        max_tokens: Tokens máximos de um lote
+        max_items: Itens máximos de um lote
+
+    Returns:
+        Lista de intervalos (início, fim exclusivo)
+    """
+    ranges = []
+    start = 0
+    tokens = 0
+
+    for i, length in enumerate(lengths):
+        if i > start and (tokens + length > max_tokens or i - start >= max_items):
+            ranges.append((start, i))
+            start = i
+            tokens = 0
+        tokens += length
+
+    if start < len(lengths):
+        ranges.append((start, len(lengths)))
+    return ranges
+
 class EmbeddingGenerator:
     """
     Classe para geração de embeddings para dados de exames
+    
+    Os textos são enviados em lotes limitados por quantidade de itens e de
+    tokens, com até `max_concurrency` requisições simultâneas. Cada lote é
+    repetido com espera exponencial e jitter em caso de erro transitório; se
+    ainda assim falhar, apenas os chunks desse lote ficam sem embedding. Um
+    lote recusado como inválido é dividido ao meio até isolar os textos
+    responsáveis, que são os únicos a ficar sem embedding.
     """
     
-    def __init__(self, model: Optional[str] = None):
+    def __init__(self, model: Optional[str] = None, cache: Optional[EmbeddingCache] = None,
+                 client: Optional[Any] = None,
+                 max_batch_items: int = MAX_BATCH_ITEMS,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS,
+                 max_concurrency: int = 4,
+                 max_retries: int = 5,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 30.0):
         """
         Inicializa o gerador de embeddings
         
         Args:
             model: Nome do modelo de embedding a ser usado
+            cache: Cache persistente de embeddings (opcional), consultado antes da API
+            client: Cliente com `embeddings.create(input=..., model=...)` (padrão:
+                    módulo openai; ex.: FakeEmbeddingClient para testes offline)
+            max_batch_items: Itens máximos por requisição
+            max_batch_tokens: Tokens máximos por requisição
+            max_concurrency: Requisições simultâneas
+            max_retries: Novas tentativas de um lote após um erro transitório
+            backoff_base: Espera máxima antes da primeira nova tentativa (segundos)
+            backoff_max: Limite da espera entre tentativas (segundos)
         """
         self.model = model or EMBEDDING_MODEL
+        self.cache = cache
+        self.client = client
+        self.max_batch_items = max_batch_items
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.token_counter = TokenCounter(self.model)
+        
+        # Requisições feitas à API nesta execução (inclui novas tentativas)
+        self.requests = 0
+        self._lock = threading.Lock()
         
         # Validar API key
-        if not openai.api_key:
+        if client is None and not openai.api_key:
             logger.warning("API key da OpenAI não encontrada. Configure a variável OPENAI_API_KEY no .env")
     
     def generate_embeddings(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Gera embeddings para uma lista de chunks de texto
         
+        Os embeddings em cache são reaproveitados; apenas os textos distintos
+        que faltam são enviados à API. Chunks de um lote que falhou recebem
+        embedding vazio e o erro em 'embedding_error'.
+        
         Args:
             chunks: Lista de chunks com texto e metadados
             
         Returns:
-            Lista de chunks com embeddings adicionados
+            Lista de chunks com embeddings adicionados, na mesma ordem
         """
-        # Verificar se temos API key
-        if not openai.api_key:
+        # Extrair textos e consultar o cache
+        texts = [chunk.get('text', '') for chunk in chunks]
+        cached = self.cache.get_many(self.model, texts) if self.cache else [None] * len(texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, cached) if embedding is None))
+        
+        generated: Dict[str, List[float]] = {}
+        errors: Dict[str, str] = {}
+        if missing and self.client is None and not openai.api_key:
             logger.error("API key da OpenAI não configurada. Embeddings não serão gerados.")
-            # Adicionar campo vazio para manter estrutura
-            for chunk in chunks:
-                chunk['embedding'] = []
-            return chunks
+            errors = dict.fromkeys(missing, "API key da OpenAI não configurada")
+        elif missing:
+            generated, errors = self._embed_texts(missing)
         
-        try:
-            # Extrair textos para gerar embeddings
-            texts = [chunk.get('text', '') for chunk in chunks]
-            
-            # Gerar embeddings em lote
-            response = openai.embeddings.create(
-                input=texts,
-                model=self.model
-            )
-            
-            # Extrair embeddings da resposta
-            embeddings = [item.embedding for item in response.data]
+        # Adicionar embeddings aos chunks (campo vazio quando não gerado, para manter a estrutura)
+        for chunk, text, embedding in zip(chunks, texts, cached):
+            chunk['embedding'] = embedding if embedding is not None else generated.get(text, [])
+            if text in errors:
+                chunk['embedding_error'] = errors[text]
+        
+        reused = len(texts) - sum(1 for embedding in cached if embedding is None)
+        logger.info(f"Embeddings com o modelo {self.model}: {reused} do cache, {len(generated)} gerados, "
+                    f"{len(errors)} com erro")
+        
+        return chunks
+    
+    def _embed_texts(self, texts: List[str]) -> Tuple[Dict[str, List[float]], Dict[str, str]]:
+        """
+        Gera os embeddings de textos distintos em lotes concorrentes
+        
+        Os embeddings de cada lote concluído são gravados no cache.
+        
+        Args:
+            texts: Textos distintos sem embedding
             
-            # Adicionar embeddings aos chunks
-            for i, embedding in enumerate(embeddings):
-                chunks[i]['embedding'] = embedding
+        Returns:
+            Tupla (texto -> embedding, texto -> mensagem de erro dos lotes que falharam)
+        """
+        lengths = self.token_counter.count_batch(texts)
+        batches = [texts[start:end] for start, end in
+                   batch_ranges(lengths, self.max_batch_tokens, self.max_batch_items)]
+        
+        generated: Dict[str, List[float]] = {}
+        errors: Dict[str, str] = {}
+        
+        def collect(outcomes: List[Tuple[List[str], Optional[List[List[float]]], Optional[Exception]]]):
+            for batch, embeddings, error in outcomes:
+                if error is not None:
+                    logger.error(f"Erro ao gerar embeddings de um lote de {len(batch)} textos: {error}")
+                    errors.update(dict.fromkeys(batch, str(error)))
+                    continue
+                generated.update(zip(batch, embeddings))
+                if self.cache:
+                    self.cache.put_many(self.model, batch, embeddings)
+        
+        if len(batches) == 1 or self.max_concurrency == 1:
+            for batch in batches:
+                collect(self._embed_splitting(batch))
+            return generated, errors
+        
+        # O cache (SQLite) só é usado nesta thread, à medida que os lotes terminam
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            futures = [executor.submit(self._embed_splitting, batch) for batch in batches]
+            for future in as_completed(futures):
+                collect(future.result())
+        
+        return generated, errors
+    
+    def _embed_splitting(self, texts: List[str]) -> List[Tuple[List[str], Optional[List[List[float]]], Optional[Exception]]]:
+        """
+        Gera os embeddings de um lote, dividindo ao meio os lotes recusados
+        
+        Um lote recusado como inválido (`_INVALID_BATCH_ERRORS`) é dividido
+        em duas metades, enviadas de novo, até que o erro fique restrito aos
+        textos que o causam. Outros erros (transitórios esgotados, credenciais)
+        valem para o lote inteiro.
+        
+        Args:
+            texts: Textos do lote
             
-            logger.info(f"Gerados {len(embeddings)} embeddings usando o modelo {self.model}")
+        Returns:
+            Lista de (textos, embeddings ou None, erro ou None) de cada parte do lote
+        """
+        try:
+            return [(texts, self._embed_batch(texts), None)]
+        except _INVALID_BATCH_ERRORS as e:
+            if len(texts) == 1:
+                return [(texts, None, e)]
+            middle = len(texts) // 2
+            logger.warning(f"Lote de {len(texts)} textos recusado ({e}); dividindo ao meio")
+            return self._embed_splitting(texts[:middle]) + self._embed_splitting(texts[middle:])
+        except Exception as e:
+            return [(texts, None, e)]
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Gera os embeddings de um lote, com novas tentativas em erros transitórios
+        
+        A espera antes da tentativa n é sorteada entre 0 e
+        min(backoff_max, backoff_base × 2^n) (jitter completo).
+        
+        Args:
+            texts: Textos do lote
             
-            return chunks
+        Returns:
+            Embedding de cada texto, na ordem do lote
+        """
+        create = (self.client or openai).embeddings.create
         
-        except Exception as e:
-            logger.error(f"Erro ao gerar embeddings: {e}")
-            # Em caso de erro, adicionar campo vazio para manter estrutura
-            for chunk in chunks:
-                chunk['embedding'] = []
-            return chunks
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._lock:
+                    self.requests += 1
+                response = create(input=texts, model=self.model)
+                
+                # Extrair embeddings da resposta, na ordem dos textos enviados
+                data = sorted(response.data, key=lambda item: getattr(item, 'index', 0))
+                if len(data) != len(texts):
+                    raise ValueError(f"Resposta com {len(data)} embeddings para {len(texts)} textos")
+                return [item.embedding for item in data]
+            
+            except Exception as e:
+                if attempt == self.max_retries or isinstance(e, _NON_RETRYABLE_ERRORS):
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                logger.warning(f"Erro ao gerar embeddings ({e}); nova tentativa em {delay:.1f}s "
+                               f"({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
     
     def generate_embedding_single(self, text: str) -> List[float]:
         """
@@ -96,19 +281,21 @@ class EmbeddingGenerator:
         Returns:
             Lista de valores do embedding
         """
+        if self.cache:
+            cached = self.cache.get_many(self.model, [text])[0]
+            if cached is not None:
+                return cached
+        
         # Verificar se temos API key
-        if not openai.api_key:
+        if self.client is None and not openai.api_key:
             logger.error("API key da OpenAI não configurada. Embedding não será gerado.")
             return []
         
         try:
-            response = openai.embeddings.create(
-                input=[text],
-                model=self.model
-            )
+            embedding = self._embed_batch([text])[0]
             
-            # Extrair embedding da resposta
-            embedding = response.data[0].embedding
+            if self.cache:
+                self.cache.put_many(self.model, [text], [embedding])
             
             return embedding
         
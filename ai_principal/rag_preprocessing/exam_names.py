@@ -0,0 +1,124 @@
+"""
+Canonicalização de nomes de exames
+Compila a tabela de sinônimos (`exam_names` das regras de normalização) em
+um autômato de Aho–Corasick, para que cada nome seja resolvido em uma única
+passada, independente da quantidade de sinônimos
+"""
+
+import re
+import logging
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from .aho_corasick import AhoCorasick
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_exam_name(name: str) -> str:
+    """
+    Normaliza um nome de exame para comparação
+
+    Minúsculas, sem acentos e com qualquer sequência de caracteres não
+    alfanuméricos reduzida a um espaço ("Glicose - Jejum" -> "glicose jejum"),
+    a mesma forma usada pelo índice de nomes da extração
+    (`pdf_extraction.name_index.normalize_exam_name`).
+
+    Args:
+        name: Nome do exame
+
+    Returns:
+        Nome normalizado
+    """
+    decomposed = unicodedata.normalize("NFKD", name.lower())
+    without_accents = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", without_accents).strip()
+
+class ExamNameCanonicalizer:
+    """
+    Resolve nomes de exames para o nome canônico da tabela de sinônimos
+
+    Sinônimos e nomes são comparados na forma normalizada (minúsculas, sem
+    acentos nem pontuação) e apenas em palavras inteiras, então "alt" não
+    casa dentro de "cobalto". Regras de escolha, nesta ordem:
+
+    1. Sinônimos contidos no nome: vence o mais longo (o mais específico,
+       ex.: "fosfatase alcalina" e não "alt"); empates ficam com a ocorrência
+       mais à esquerda e, depois, com a ordem da tabela.
+    2. Nome contido em um sinônimo ("colesterol" em "colesterol total"):
+       vence o sinônimo mais curto; empates ficam com a ordem da tabela.
+
+    Os resultados são memorizados por nome bruto.
+    """
+
+    def __init__(self, exam_names: Dict[str, str], cache_size: int = 8192):
+        """
+        Compila a tabela de sinônimos
+
+        Args:
+            exam_names: Sinônimo -> nome canônico
+            cache_size: Quantidade de nomes memorizados
+        """
+        self._canonical: List[str] = []
+        self._lengths: List[int] = []
+        keys: List[str] = []
+        seen = set()
+
+        for synonym, canonical in exam_names.items():
+            key = normalize_exam_name(synonym)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            keys.append(key)
+            self._canonical.append(canonical)
+            self._lengths.append(len(key))
+
+        # Sinônimos delimitados por espaços, para casar apenas palavras inteiras
+        self._automaton = AhoCorasick(f" {key} " for key in keys)
+
+        # Toda sequência contígua de palavras de um sinônimo aponta para o
+        # sinônimo mais curto (e, no empate, o primeiro) que a contém
+        self._partial: Dict[str, int] = {}
+        for rule_id in sorted(range(len(keys)), key=lambda i: (self._lengths[i], i)):
+            words = keys[rule_id].split()
+            for start in range(len(words)):
+                for end in range(start + 1, len(words) + 1):
+                    self._partial.setdefault(" ".join(words[start:end]), rule_id)
+
+        self.canonicalize = lru_cache(maxsize=cache_size)(self._canonicalize)
+
+    def __len__(self) -> int:
+        return len(self._canonical)
+
+    def _canonicalize(self, exam_name: str) -> Optional[str]:
+        """
+        Nome canônico de um exame
+
+        Args:
+            exam_name: Nome do exame como extraído
+
+        Returns:
+            Nome canônico ou None se nenhum sinônimo corresponder
+        """
+        normalized = normalize_exam_name(exam_name)
+        if not normalized:
+            return None
+
+        best: Optional[Tuple[int, int, int]] = None
+        for end, rule_id in self._automaton.iter_matches(f" {normalized} "):
+            length = self._lengths[rule_id]
+            candidate = (-length, end - length, rule_id)
+            if best is None or candidate < best:
+                best = candidate
+        if best is not None:
+            return self._canonical[best[2]]
+
+        rule_id = self._partial.get(normalized)
+        return self._canonical[rule_id] if rule_id is not None else None
+
+    def cache_info(self):
+        """Estatísticas do LRU de nomes"""
+        return self.canonicalize.cache_info()
@@ -0,0 +1,181 @@
+"""
+Cliente de embeddings falso para execução offline
+Imita `openai.embeddings.create` com vetores determinísticos por texto e
+permite simular latência, erros transitórios, lotes inválidos e respostas
+fora de ordem, para exercitar o `EmbeddingGenerator` sem acesso à API
+"""
+
+import time
+import hashlib
+import argparse
+import logging
+import threading
+import numpy as np
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional, Sequence
+from .embeddings import EmbeddingGenerator
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class FakeTransientError(Exception):
+    """Erro transitório simulado (equivalente a limite de taxa ou erro 5xx)"""
+
+class FakeInvalidBatchError(ValueError):
+    """Lote recusado simulado (equivalente ao erro 400), que não é repetido"""
+
+class FakeEmbeddingClient:
+    """
+    Cliente compatível com `client.embeddings.create(input=..., model=...)`
+
+    O embedding de um texto é um vetor unitário gerado a partir do SHA-256
+    do texto, então é o mesmo em todas as chamadas.
+    """
+
+    def __init__(self,
+                 dimensions: int = 1536,
+                 latency: float = 0.0,
+                 transient_failures: int = 0,
+                 fail_texts: Sequence[str] = (),
+                 max_items: Optional[int] = None,
+                 shuffle: bool = False):
+        """
+        Configura o comportamento simulado
+
+        Args:
+            dimensions: Dimensão dos vetores
+            latency: Duração de cada requisição (segundos)
+            transient_failures: Quantidade de requisições iniciais que falham
+                                com FakeTransientError
+            fail_texts: Trechos que fazem o lote que os contém ser recusado
+                        com FakeInvalidBatchError
+            max_items: Itens máximos aceitos por requisição (None: sem limite)
+            shuffle: Devolver os itens da resposta em ordem inversa (com `index`)
+        """
+        self.dimensions = dimensions
+        self.latency = latency
+        self.transient_failures = transient_failures
+        self.fail_texts = tuple(fail_texts)
+        self.max_items = max_items
+        self.shuffle = shuffle
+
+        # Estatísticas das chamadas recebidas
+        self.calls: List[int] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> "FakeEmbeddingClient":
+        """Mesmo formato do cliente da OpenAI (`client.embeddings.create`)"""
+        return self
+
+    def embed(self, text: str) -> List[float]:
+        """
+        Embedding determinístico de um texto
+
+        Args:
+            text: Texto
+
+        Returns:
+            Vetor unitário
+        """
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def create(self, input: List[str], model: str) -> Any:
+        """
+        Simula uma requisição de embeddings
+
+        Args:
+            input: Textos do lote
+            model: Nome do modelo (ignorado)
+
+        Returns:
+            Objeto com `data`, uma lista de itens com `index` e `embedding`
+        """
+        with self._lock:
+            self.calls.append(len(input))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            transient = len(self.calls) <= self.transient_failures
+
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if transient:
+                raise FakeTransientError("Limite de taxa simulado")
+            if self.max_items is not None and len(input) > self.max_items:
+                raise FakeInvalidBatchError(f"Lote com {len(input)} itens excede o limite de {self.max_items}")
+            if any(marker in text for text in input for marker in self.fail_texts):
+                raise FakeInvalidBatchError("Lote inválido simulado")
+
+            data = [SimpleNamespace(index=i, embedding=self.embed(text)) for i, text in enumerate(input)]
+            if self.shuffle:
+                data.reverse()
+            return SimpleNamespace(data=data)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+def run_check(chunks: int = 1000, batch_items: int = 64, concurrency: int = 4) -> Dict[str, Any]:
+    """
+    Executa o EmbeddingGenerator contra o cliente falso
+
+    Simula dois erros transitórios, um texto que faz o seu lote ser
+    recusado e respostas fora de ordem, e verifica a ordem dos embeddings
+    dos demais chunks (apenas o texto recusado fica sem embedding).
+
+    Args:
+        chunks: Quantidade de chunks sintéticos
+        batch_items: Itens máximos por requisição
+        concurrency: Requisições simultâneas
+
+    Returns:
+        Dicionário com requisições (incluindo novas tentativas), concorrência
+        máxima, chunks sem embedding e se a ordem foi preservada
+    """
+    client = FakeEmbeddingClient(dimensions=8, latency=0.01, transient_failures=2,
+                                 fail_texts=("#falha",), max_items=batch_items, shuffle=True)
+    generator = EmbeddingGenerator("text-embedding-3-small", client=client, max_batch_items=batch_items,
+                                   max_concurrency=concurrency, max_retries=3, backoff_base=0.01)
+
+    texts = [f"Exame: Sintético {i}\nResultado: {i % 97} mg/dL" for i in range(chunks)]
+    texts[chunks // 2] += " #falha"
+    result = generator.generate_embeddings([{'text': text} for text in texts])
+
+    failed = [i for i, chunk in enumerate(result) if not chunk['embedding']]
+    in_order = all(
+        chunk['embedding'] == client.embed(text)
+        for chunk, text in zip(result, texts) if chunk['embedding']
+    )
+    return {
+        "requests": generator.requests,
+        "max_active": client.max_active,
+        "failed_chunks": len(failed),
+        "in_order": in_order
+    }
+
+def main():
+    """Função principal para execução via linha de comando"""
+    parser = argparse.ArgumentParser(description="Verificação offline do EmbeddingGenerator com um cliente falso")
+    parser.add_argument("--chunks", type=int, default=1000, help="Quantidade de chunks sintéticos")
+    parser.add_argument("--batch-items", type=int, default=64, help="Itens máximos por requisição")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requisições simultâneas")
+
+    args = parser.parse_args()
+
+    try:
+        stats = run_check(args.chunks, args.batch_items, args.concurrency)
+        for key, value in stats.items():
+            print(f"{key}: {value}")
+    except Exception as e:
+        logger.error(f"Erro durante a verificação: {e}")
+        return 1
+
+    return 0
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from typing import Dict, List, Any, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 from .processor import RAGProcessor
+from .embedding_cache import EMBEDDING_CACHE_DIR
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -21,15 +22,21 @@ logger = logging.getLogger(__name__)
 def process_json_file(json_path: str, 
                      output_dir: Optional[str] = None,
                      chunk_size: int = 1000,
-                     chunk_overlap: int = 200) -> List[Dict[str, Any]]:
+                     chunk_overlap: int = 200,
+                     chunk_unit: str = "chars",
+                     chunk_strategy: str = "grouped",
+                     embedding_cache_dir: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Processa um arquivo JSON com dados extraídos de exame
     
     Args:
         json_path: Caminho para o arquivo JSON
         output_dir: Diretório para os arquivos de saída (opcional)
-        chunk_size: Tamanho máximo de cada chunk em caracteres
-        chunk_overlap: Sobreposição entre chunks em caracteres
+        chunk_size: Tamanho máximo de cada chunk (em caracteres ou tokens)
+        chunk_overlap: Sobreposição entre chunks (em caracteres ou tokens)
+        chunk_unit: Unidade de chunk_size e chunk_overlap ('chars' ou 'tokens')
+        chunk_strategy: Estratégia de chunking ('grouped', 'per_exam', 'per_panel' ou 'summary_only')
+        embedding_cache_dir: Diretório do cache de embeddings (None desativa o cache)
         
     Returns:
         Lista de chunks prontos para indexação
@@ -39,7 +46,8 @@ def process_json_file(json_path: str,
         raise FileNotFoundError(f"Arquivo JSON não encontrado: {json_path}")
     
     # Criar processador RAG
-    processor = RAGProcessor(chunk_size, chunk_overlap)
+    processor = RAGProcessor(chunk_size, chunk_overlap, chunk_unit=chunk_unit, chunk_strategy=chunk_strategy,
+                             embedding_cache_dir=embedding_cache_dir)
     
     # Processar arquivo
     chunks = processor.process_exam_file(json_path)
@@ -61,7 +69,11 @@ def process_directory(dir_path: str,
                      output_dir: Optional[str] = None,
                      file_pattern: str = "*_extracted.json",
                      chunk_size: int = 1000,
-                     chunk_overlap: int = 200) -> List[List[Dict[str, Any]]]:
+                     chunk_overlap: int = 200,
+                     batch_size: int = 500,
+                     chunk_unit: str = "chars",
+                     chunk_strategy: str = "grouped",
+                     embedding_cache_dir: Optional[str] = None) -> List[List[Dict[str, Any]]]:
     """
     Processa todos os arquivos JSON em um diretório
     
@@ -69,8 +81,12 @@ def process_directory(dir_path: str,
         dir_path: Caminho para o diretório
         output_dir: Diretório para os arquivos de saída (opcional)
         file_pattern: Padrão para filtrar arquivos
-        chunk_size: Tamanho máximo de cada chunk em caracteres
-        chunk_overlap: Sobreposição entre chunks em caracteres
+        chunk_size: Tamanho máximo de cada chunk (em caracteres ou tokens)
+        chunk_overlap: Sobreposição entre chunks (em caracteres ou tokens)
+        batch_size: Quantidade de arquivos normalizados de uma vez
+        chunk_unit: Unidade de chunk_size e chunk_overlap ('chars' ou 'tokens')
+        chunk_strategy: Estratégia de chunking ('grouped', 'per_exam', 'per_panel' ou 'summary_only')
+        embedding_cache_dir: Diretório do cache de embeddings (None desativa o cache)
         
     Returns:
         Lista de listas de chunks prontos para indexação
@@ -80,10 +96,11 @@ def process_directory(dir_path: str,
         raise NotADirectoryError(f"Diretório não encontrado: {dir_path}")
     
     # Criar processador RAG
-    processor = RAGProcessor(chunk_size, chunk_overlap)
+    processor = RAGProcessor(chunk_size, chunk_overlap, chunk_unit=chunk_unit, chunk_strategy=chunk_strategy,
+                             embedding_cache_dir=embedding_cache_dir)
     
     # Processar diretório
-    return processor.process_directory(dir_path, file_pattern)
+    return processor.process_directory(dir_path, file_pattern, batch_size=batch_size)
 
 def main():
     """Função principal para execução via linha de comando"""
@@ -98,11 +115,22 @@ def main():
     # Argumentos opcionais
     parser.add_argument("--output", type=str, help="Diretório para arquivos de saída")
     parser.add_argument("--pattern", type=str, default="*_extracted.json", help="Padrão para filtrar arquivos (para --dir)")
-    parser.add_argument("--chunk-size", type=int, default=1000, help="Tamanho máximo de cada chunk em caracteres")
-    parser.add_argument("--chunk-overlap", type=int, default=200, help="Sobreposição entre chunks em caracteres")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Tamanho máximo de cada chunk (em --chunk-unit)")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Sobreposição entre chunks: últimos exames do chunk anterior repetidos até esse tamanho (em --chunk-unit)")
+    parser.add_argument("--chunk-unit", type=str, default="chars", choices=["chars", "tokens"],
+                        help="Unidade de --chunk-size e --chunk-overlap")
+    parser.add_argument("--chunk-strategy", type=str, default="grouped",
+                        choices=["grouped", "per_exam", "per_panel", "summary_only"],
+                        help="Estratégia de chunking dos resultados")
+    parser.add_argument("--embedding-cache-dir", type=str, default=EMBEDDING_CACHE_DIR,
+                        help="Diretório do cache de embeddings")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="Desativar o cache de embeddings")
+    parser.add_argument("--batch-size", type=int, default=500, help="Arquivos normalizados por lote (para --dir)")
     
     args = parser.parse_args()
     
+    embedding_cache_dir = None if args.no_embedding_cache else args.embedding_cache_dir
+    
     try:
         if args.json:
             # Processar um único JSON
@@ -110,7 +138,10 @@ def main():
                 args.json,
                 output_dir=args.output,
                 chunk_size=args.chunk_size,
-                chunk_overlap=args.chunk_overlap
+                chunk_overlap=args.chunk_overlap,
+                chunk_unit=args.chunk_unit,
+                chunk_strategy=args.chunk_strategy,
+                embedding_cache_dir=embedding_cache_dir
             )
         else:
             # Processar diretório
@@ -119,7 +150,11 @@ def main():
                 output_dir=args.output,
                 file_pattern=args.pattern,
                 chunk_size=args.chunk_size,
-                chunk_overlap=args.chunk_overlap
+                chunk_overlap=args.chunk_overlap,
+                batch_size=args.batch_size,
+                chunk_unit=args.chunk_unit,
+                chunk_strategy=args.chunk_strategy,
+                embedding_cache_dir=embedding_cache_dir
             )
     except Exception as e:
         logger.error(f"Erro durante o processamento: {e}")
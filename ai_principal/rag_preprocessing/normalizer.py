@@ -7,6 +7,9 @@ import re
 import json
 import logging
 from typing import Dict, List, Any, Optional, Tuple, Union
+from .reference_ranges import annotate_exams, parse_results
+from .exam_names import ExamNameCanonicalizer
+from .unit_conversion import UnitConverter, unit_key
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -27,6 +30,17 @@ class ExamNormalizer:
         """
         # Carregar regras de normalização padrão ou usar as fornecidas
         self.rules = normalization_rules or self._get_default_rules()
+        
+        # Tabela de sinônimos compilada uma única vez em um autômato
+        self.exam_name_canonicalizer = ExamNameCanonicalizer(self.rules['exam_names'])
+        
+        # Grafias de unidades indexadas pela chave case-folded (a primeira regra prevalece)
+        self._unit_lookup: Dict[str, str] = {}
+        for pattern, normalized in self.rules['units'].items():
+            self._unit_lookup.setdefault(unit_key(pattern), normalized)
+        
+        # Conversão para a unidade canônica de cada analito
+        self.unit_converter = UnitConverter(self.rules.get('unit_conversions'))
     
     def normalize_exam_data(self, exam_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -51,6 +65,24 @@ class ExamNormalizer:
             for exam in normalized_data['exams']:
                 normalized_exams.append(self._normalize_exam(exam))
             normalized_data['exams'] = normalized_exams
+            
+            # Limites numéricos das referências e sinalização de resultados
+            # alterados, calculados uma vez na ingestão para todo o laudo.
+            # Os resultados são lidos do texto original, com ponto de milhar
+            # ("5.900" é 5900, não o 5.9 de `_normalize_result_value`)
+            raw_results = [exam.get('result') for exam in exam_data['exams']]
+            patient = normalized_data.get('patient') or {}
+            # Resultados em unidade diferente da referência (glicose em mmol/L
+            # com faixa em mg/dL) são convertidos antes da comparação
+            unit_factors = self.unit_converter.reference_factors(
+                [exam.get('name') for exam in normalized_exams],
+                [exam.get('unit') for exam in normalized_exams],
+                normalized_exams
+            )
+            annotate_exams(normalized_exams, patient.get('gender'), patient.get('age'), raw_results, unit_factors)
+            
+            # Resultado na unidade canônica do analito, para comparações e agregações
+            self.unit_converter.convert_exams(normalized_exams, parse_results(raw_results))
         
         return normalized_data
     
@@ -201,11 +233,10 @@ class ExamNormalizer:
         name = re.sub(r'[^\w\s]', '', exam_name)
         name = re.sub(r'\s+', ' ', name).strip()
         
-        # Verificar mapeamento de nomes
-        name_lower = name.lower()
-        for pattern, normalized in self.rules['exam_names'].items():
-            if pattern.lower() in name_lower or name_lower in pattern.lower():
-                return normalized
+        # Verificar mapeamento de nomes (sinônimo mais específico, ver ExamNameCanonicalizer)
+        normalized = self.exam_name_canonicalizer.canonicalize(exam_name)
+        if normalized:
+            return normalized
         
         # Se não encontrar no mapeamento, retornar o nome limpo
         return name.title()
@@ -248,12 +279,7 @@ class ExamNormalizer:
         unit = unit.strip()
         
         # Verificar mapeamento de unidades
-        unit_lower = unit.lower()
-        for pattern, normalized in self.rules['units'].items():
-            if pattern.lower() == unit_lower:
-                return normalized
-        
-        return unit
+        return self._unit_lookup.get(unit_key(unit), unit)
     
     def _get_default_rules(self) -> Dict[str, Any]:
         """
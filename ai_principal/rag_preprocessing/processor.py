@@ -10,7 +10,9 @@ from typing import Dict, List, Any, Optional, Tuple, Union
 from pathlib import Path
 from .chunking import ExamChunker
 from .normalizer import ExamNormalizer
+from .batch_normalizer import BatchNormalizer
 from .embeddings import EmbeddingGenerator
+from .embedding_cache import EmbeddingCache
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -26,19 +28,29 @@ class RAGProcessor:
                 chunk_size: int = 1000, 
                 chunk_overlap: int = 200,
                 embedding_model: Optional[str] = None,
-                normalization_rules: Optional[Dict[str, Any]] = None):
+                normalization_rules: Optional[Dict[str, Any]] = None,
+                chunk_unit: str = "chars",
+                chunk_strategy: str = "grouped",
+                embedding_cache_dir: Optional[str] = None):
         """
         Inicializa o processador RAG com configurações
         
         Args:
-            chunk_size: Tamanho máximo de cada chunk em caracteres
-            chunk_overlap: Sobreposição entre chunks em caracteres
+            chunk_size: Tamanho máximo de cada chunk (em caracteres ou tokens)
+            chunk_overlap: Sobreposição entre chunks (em caracteres ou tokens)
             embedding_model: Nome do modelo de embedding a ser usado
             normalization_rules: Regras de normalização para exames
+            chunk_unit: Unidade de chunk_size e chunk_overlap ('chars' ou 'tokens')
+            chunk_strategy: Estratégia de chunking ('grouped', 'per_exam', 'per_panel' ou 'summary_only')
+            embedding_cache_dir: Diretório do cache de embeddings (None desativa o cache)
         """
         self.normalizer = ExamNormalizer(normalization_rules)
-        self.chunker = ExamChunker(chunk_size, chunk_overlap)
-        self.embedding_generator = EmbeddingGenerator(embedding_model)
+        self.batch_normalizer = BatchNormalizer(self.normalizer)
+        self.embedding_cache = EmbeddingCache(embedding_cache_dir) if embedding_cache_dir else None
+        self.embedding_generator = EmbeddingGenerator(embedding_model, cache=self.embedding_cache)
+        self.chunker = ExamChunker(chunk_size, chunk_overlap, length_unit=chunk_unit,
+                                   encoding_model=self.embedding_generator.model,
+                                   strategy=chunk_strategy)
     
     def process_exam_data(self, exam_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -54,6 +66,18 @@ class RAGProcessor:
         logger.info("Normalizando dados do exame...")
         normalized_data = self.normalizer.normalize_exam_data(exam_data)
         
+        return self.process_normalized_data(normalized_data)
+    
+    def process_normalized_data(self, normalized_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Executa chunking e geração de embeddings sobre dados já normalizados
+        
+        Args:
+            normalized_data: Dados do exame normalizados
+            
+        Returns:
+            Lista de chunks prontos para indexação
+        """
         # 2. Chunking
         logger.info("Dividindo dados em chunks significativos...")
         chunks = self.chunker.chunk_exam_data(normalized_data)
@@ -88,7 +112,21 @@ class RAGProcessor:
         logger.info(f"Processando arquivo: {json_file_path}")
         chunks = self.process_exam_data(exam_data)
         
-        # Salvar chunks em arquivo
+        self._save_chunks(json_file_path, chunks)
+        
+        return chunks
+    
+    def _save_chunks(self, json_file_path: str, chunks: List[Dict[str, Any]]) -> str:
+        """
+        Salva os chunks de um arquivo ao lado dele (`_rag.json`)
+        
+        Args:
+            json_file_path: Caminho do arquivo JSON de origem
+            chunks: Chunks processados
+            
+        Returns:
+            Caminho do arquivo salvo
+        """
         output_path = json_file_path.replace('.json', '_rag.json')
         if json_file_path == output_path:
             output_path = json_file_path.replace('.json', '_processed_rag.json')
@@ -98,15 +136,20 @@ class RAGProcessor:
         
         logger.info(f"Chunks RAG salvos em: {output_path}")
         
-        return chunks
+        return output_path
     
-    def process_directory(self, dir_path: str, file_pattern: str = "*_extracted.json") -> List[List[Dict[str, Any]]]:
+    def process_directory(self, dir_path: str, file_pattern: str = "*_extracted.json",
+                          batch_size: int = 500) -> List[List[Dict[str, Any]]]:
         """
         Processa todos os arquivos JSON em um diretório
         
+        Os arquivos são normalizados em lotes, em colunas (`BatchNormalizer`),
+        e depois divididos em chunks um a um.
+        
         Args:
             dir_path: Caminho para o diretório
             file_pattern: Padrão para filtrar arquivos
+            batch_size: Quantidade de arquivos normalizados de uma vez
             
         Returns:
             Lista de listas de chunks prontos para indexação
@@ -122,13 +165,37 @@ class RAGProcessor:
             logger.warning(f"Nenhum arquivo correspondente ao padrão '{file_pattern}' encontrado em: {dir_path}")
             return []
         
-        # Processar cada arquivo
+        # Processar os arquivos em lotes
         results = []
-        for json_file in json_files:
+        for start in range(0, len(json_files), batch_size):
+            batch = [str(json_file) for json_file in json_files[start:start + batch_size]]
+            
             try:
-                chunks = self.process_exam_file(str(json_file))
-                results.append(chunks)
+                logger.info(f"Normalizando lote de {len(batch)} arquivos...")
+                normalized_batch = self.batch_normalizer.normalize_files(batch)
             except Exception as e:
-                logger.error(f"Erro ao processar arquivo {json_file}: {e}")
-        
-        return results
\ No newline at end of file
+                # Um arquivo inválido não deve descartar o lote: processar um a um
+                logger.error(f"Erro ao normalizar lote, processando arquivo a arquivo: {e}")
+                normalized_batch = [None] * len(batch)
+            
+            for json_file, normalized_data in zip(batch, normalized_batch):
+                try:
+                    if normalized_data is None:
+                        chunks = self.process_exam_file(json_file)
+                    else:
+                        logger.info(f"Processando arquivo: {json_file}")
+                        chunks = self.process_normalized_data(normalized_data)
+                        self._save_chunks(json_file, chunks)
+                    results.append(chunks)
+                except Exception as e:
+                    logger.error(f"Erro ao processar arquivo {json_file}: {e}")
+        
+        # O cache das colunas só é útil entre os lotes de uma mesma execução
+        self.batch_normalizer.clear_cache()
+        
+        if self.embedding_cache:
+            stats = self.embedding_cache.stats()
+            logger.info(f"Cache de embeddings: {stats['hits']} acertos, {stats['misses']} falhas, "
+                        f"{stats['evictions']} removidos; {self.embedding_generator.requests} requisições à API")
+        
+        return results
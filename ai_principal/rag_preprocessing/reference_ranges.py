@@ -0,0 +1,380 @@
+"""
+Interpretação das faixas de referência
+Converte os textos de referência dos laudos ("0,54 - 1,24 ng", "Até 1,0 mg",
+"Homens 13,0 a 16,5 Mulheres 12,0 a 15,8") em limites numéricos e calcula,
+na ingestão, se cada resultado está fora da faixa
+"""
+
+import re
+import logging
+import numpy as np
+from typing import Dict, List, Any, NamedTuple, Optional, Sequence
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rótulos de grupo (sexo/idade) reconhecidos nas referências
+LABEL_NONE = 0
+LABEL_MALE = 1
+LABEL_FEMALE = 2
+LABEL_CHILD = 3
+LABEL_ADULT = 4
+
+_LABEL_CODES = {
+    "homem": LABEL_MALE, "homens": LABEL_MALE, "masculino": LABEL_MALE, "masc": LABEL_MALE,
+    "mulher": LABEL_FEMALE, "mulheres": LABEL_FEMALE, "feminino": LABEL_FEMALE, "fem": LABEL_FEMALE,
+    "criança": LABEL_CHILD, "crianças": LABEL_CHILD, "crianca": LABEL_CHILD, "criancas": LABEL_CHILD,
+    "infantil": LABEL_CHILD,
+    "adulto": LABEL_ADULT, "adultos": LABEL_ADULT
+}
+
+# Idade a partir da qual o paciente é considerado adulto (mesmo corte do painel web)
+ADULT_AGE = 13
+
+# Número com vírgula ou ponto decimal e ponto de milhar ("0,54", "150.000", "1.500,0")
+_NUMBER = r"(?<![\w.,])\d+(?:[.,]\d+)*(?![.,]?\d)"
+
+# Números seguidos de unidade de tempo são faixas etárias, não limites
+_NOT_AGE = r"(?!\s*(?:anos?|mes(?:es)?|dias?)\b)"
+
+_LABEL = "|".join(sorted(map(re.escape, _LABEL_CODES), key=len, reverse=True))
+
+# Uma única expressão com todas as formas de limite e os rótulos de grupo
+_REFERENCE_PATTERN = re.compile(
+    rf"(?P<label>\b(?:{_LABEL})\b)"
+    rf"|(?P<low>{_NUMBER})\s*(?:a|-|–|at[ée])\s*(?P<high>{_NUMBER}){_NOT_AGE}"
+    rf"|(?:\bat[ée]|<=?|≤|inferior a|menor que|abaixo de)\s*(?P<upper>{_NUMBER}){_NOT_AGE}"
+    rf"|(?:>=?|≥|superior a|maior que|acima de)\s*(?P<lower>{_NUMBER}){_NOT_AGE}",
+    re.IGNORECASE
+)
+
+# Resultado exclusivamente numérico
+_RESULT_PATTERN = re.compile(rf"\s*({_NUMBER})\s*")
+
+# Ponto de milhar: seguido de exatamente três dígitos e precedido por uma
+# parte inteira diferente de "0" ("150.000", mas não "0.540")
+_THOUSANDS_DOT = re.compile(r"(?:(?<=[1-9])|(?<=\d\d))\.(?=\d{3}(?!\d))")
+
+class ReferenceGroups(NamedTuple):
+    """Grupos de referência em colunas: uma posição por faixa encontrada"""
+    row: np.ndarray      # Índice da referência de origem
+    label: np.ndarray    # Rótulo do grupo (LABEL_*)
+    low: np.ndarray      # Limite inferior (-inf quando não há)
+    high: np.ndarray     # Limite superior (+inf quando não há)
+
+def parse_numbers(values: Sequence[str]) -> np.ndarray:
+    """
+    Converte números no formato brasileiro em float64, todos de uma vez
+
+    Args:
+        values: Números como texto ("0,54", "150.000", "1.500,0")
+
+    Returns:
+        Vetor float64
+    """
+    if not values:
+        return np.empty(0, dtype=np.float64)
+    joined = _THOUSANDS_DOT.sub("", "\n".join(values)).replace(",", ".")
+    return np.array(joined.split("\n"), dtype=np.float64)
+
+def parse_reference_ranges(references: Sequence[Optional[str]]) -> ReferenceGroups:
+    """
+    Extrai os grupos de faixas de um lote de referências
+
+    Todas as referências são varridas em uma única passada da expressão
+    regular. Cada faixa herda o rótulo (sexo/idade) mais recente do mesmo
+    texto; quando vários rótulos aparecem seguidos, como no cabeçalho de uma
+    tabela em colunas ("Homens Mulheres 13,0 a 16,5 12,0 a 15,8"), as faixas
+    seguintes recebem os rótulos na ordem das colunas.
+
+    Args:
+        references: Textos de referência (None ou vazio quando ausente)
+
+    Returns:
+        Grupos encontrados, em colunas
+    """
+    rows: List[int] = []
+    labels: List[int] = []
+    bounds: List[str] = []
+
+    for row, reference in enumerate(references):
+        if not reference:
+            continue
+
+        header: List[int] = []
+        column = 0
+        for match in _REFERENCE_PATTERN.finditer(str(reference)):
+            label = match.group("label")
+            if label:
+                if column:
+                    header, column = [], 0
+                header.append(_LABEL_CODES[label.lower()])
+                continue
+
+            if not header:
+                code = LABEL_NONE
+            elif len(header) == 1:
+                code = header[0]
+            else:
+                code = header[column % len(header)]
+            column += 1
+
+            low, high, upper, lower = match.group("low", "high", "upper", "lower")
+            rows.append(row)
+            labels.append(code)
+            if low is not None:
+                bounds.extend((low, high))
+            elif upper is not None:
+                bounds.extend(("-inf", upper))
+            else:
+                bounds.extend((lower, "inf"))
+
+    values = parse_numbers(bounds).reshape(-1, 2)
+    return ReferenceGroups(
+        row=np.asarray(rows, dtype=np.int64),
+        label=np.asarray(labels, dtype=np.int8),
+        low=values[:, 0],
+        high=values[:, 1]
+    )
+
+def parse_results(results: Sequence[Any]) -> np.ndarray:
+    """
+    Converte resultados em float64 (NaN quando não numéricos, como "Não reagente")
+
+    Args:
+        results: Resultados como texto ou números já normalizados
+
+    Returns:
+        Vetor float64
+    """
+    values = np.full(len(results), np.nan)
+    text_rows: List[int] = []
+    text_values: List[str] = []
+
+    for i, result in enumerate(results):
+        if isinstance(result, bool) or result is None:
+            continue
+        if isinstance(result, (int, float)):
+            values[i] = result
+            continue
+        match = _RESULT_PATTERN.fullmatch(str(result))
+        if match:
+            text_rows.append(i)
+            text_values.append(match.group(1))
+
+    values[text_rows] = parse_numbers(text_values)
+    return values
+
+def select_bounds(groups: ReferenceGroups, count: int,
+                  sexes: Sequence[Optional[str]],
+                  ages: Sequence[Optional[int]]) -> np.ndarray:
+    """
+    Escolhe os limites aplicáveis a cada referência, conforme o paciente
+
+    Usa os grupos cujo rótulo corresponde ao sexo/idade do paciente; se não
+    houver, os grupos sem rótulo; se também não houver, todos os grupos. Os
+    limites são a envoltória (menor inferior, maior superior) dos grupos
+    escolhidos, de modo que um resultado só é sinalizado quando está fora de
+    todas as faixas possíveis.
+
+    Args:
+        groups: Grupos de `parse_reference_ranges`
+        count: Quantidade de referências
+        sexes: Sexo do paciente de cada referência ('M', 'F' ou None)
+        ages: Idade do paciente de cada referência (ou None)
+
+    Returns:
+        Matriz (count, 2) com os limites inferior e superior (NaN sem faixa)
+    """
+    sex_codes = np.array([
+        LABEL_MALE if sex == 'M' else LABEL_FEMALE if sex == 'F' else LABEL_NONE
+        for sex in sexes
+    ], dtype=np.int8)
+    age_values = np.array([np.nan if age is None else float(age) for age in ages], dtype=np.float64)
+
+    row = groups.row
+    label = groups.label
+    patient_age = age_values[row]
+    compatible = (
+        ((label == LABEL_MALE) | (label == LABEL_FEMALE)) & (label == sex_codes[row])
+        | (label == LABEL_CHILD) & (patient_age < ADULT_AGE)
+        | (label == LABEL_ADULT) & (patient_age >= ADULT_AGE)
+    )
+    unlabeled = label == LABEL_NONE
+
+    has_compatible = np.bincount(row[compatible], minlength=count) > 0
+    has_unlabeled = np.bincount(row[unlabeled], minlength=count) > 0
+    selected = (
+        compatible
+        | ~has_compatible[row] & unlabeled
+        | ~has_compatible[row] & ~has_unlabeled[row]
+    )
+
+    low = np.full(count, np.inf)
+    high = np.full(count, -np.inf)
+    np.minimum.at(low, row[selected], groups.low[selected])
+    np.maximum.at(high, row[selected], groups.high[selected])
+
+    bounds = np.column_stack((low, high))
+    bounds[np.bincount(row, minlength=count) == 0] = np.nan
+    return bounds
+
+def _expand_groups(references: Sequence[Optional[str]]) -> ReferenceGroups:
+    """
+    Grupos de um lote em que as referências se repetem muito (o mesmo exame
+    em vários laudos): cada texto distinto é interpretado uma única vez e os
+    seus grupos são replicados para as linhas em que aparece
+    """
+    positions: Dict[Optional[str], int] = {}
+    codes = np.array([positions.setdefault(reference, len(positions)) for reference in references],
+                     dtype=np.int64)
+    unique = parse_reference_ranges(list(positions))
+
+    unique_counts = np.bincount(unique.row, minlength=len(positions))
+    unique_starts = np.cumsum(unique_counts) - unique_counts
+    counts = unique_counts[codes]
+    offsets = np.cumsum(counts) - counts
+    index = (np.arange(counts.sum())
+             - np.repeat(offsets, counts)
+             + np.repeat(unique_starts[codes], counts))
+
+    return ReferenceGroups(
+        row=np.repeat(np.arange(len(references)), counts),
+        label=unique.label[index],
+        low=unique.low[index],
+        high=unique.high[index]
+    )
+
+def evaluate_reference_ranges(references: Sequence[Optional[str]],
+                              results: Sequence[Any],
+                              sexes: Sequence[Optional[str]],
+                              ages: Sequence[Optional[int]],
+                              unit_factors: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Compara resultados com as suas faixas de referência, em colunas
+
+    O desvio é relativo ao limite violado: 0 dentro da faixa, negativo abaixo
+    do limite inferior e positivo acima do superior ((resultado - limite) /
+    |limite|, ou a diferença absoluta quando o limite é 0). Os limites são
+    inclusivos. Resultados em unidade diferente da referência são
+    comparados após a conversão por `unit_factors`; sem conversão possível
+    (fator NaN), não são avaliados.
+
+    Args:
+        references: Texto de referência de cada exame
+        results: Resultado de cada exame
+        sexes: Sexo do paciente de cada exame
+        ages: Idade do paciente de cada exame
+        unit_factors: Fator que leva cada resultado à unidade da referência
+                      (`UnitConverter.reference_factors`; padrão: sem conversão)
+
+    Returns:
+        Dicionário de vetores: 'low', 'high', 'value' (na unidade do
+        resultado), 'evaluated', 'out_of_range' e 'deviation'
+    """
+    count = len(references)
+    bounds = select_bounds(_expand_groups(references), count, sexes, ages)
+    low, high = bounds[:, 0], bounds[:, 1]
+    value = parse_results(results)
+    compared = value * unit_factors if unit_factors is not None else value
+
+    evaluated = ~np.isnan(compared) & ~np.isnan(low)
+    below = evaluated & (compared < low)
+    above = evaluated & (compared > high)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bound = np.where(above, high, np.where(below, low, 0.0))
+        scale = np.where(bound == 0, 1.0, np.abs(bound))
+        deviation = np.where(above | below, (compared - bound) / scale, 0.0)
+
+    return {
+        "low": low,
+        "high": high,
+        "value": value,
+        "evaluated": evaluated,
+        "out_of_range": below | above,
+        "deviation": deviation
+    }
+
+def exam_reference_text(exam: Dict[str, Any]) -> Optional[str]:
+    """
+    Texto de referência de um exame: a referência do laudo ou, na falta
+    dela, os valores da planilha de referência (`reference_data`)
+
+    Args:
+        exam: Dicionário com dados do exame
+
+    Returns:
+        Texto de referência ou None
+    """
+    if exam.get('reference'):
+        return exam['reference']
+    references = (exam.get('reference_data') or {}).get('references') or []
+    values = [str(ref.get('value', '')) for ref in references if ref.get('value')]
+    return " ".join(values) or None
+
+def annotate_exams(exams: List[Dict[str, Any]],
+                   sex: Optional[str] = None,
+                   age: Optional[int] = None,
+                   results: Optional[Sequence[Any]] = None,
+                   unit_factors: Optional[np.ndarray] = None) -> int:
+    """
+    Anota cada exame com os limites da referência e a sinalização de resultado alterado
+
+    Adiciona 'reference_low', 'reference_high' (None quando ilimitado ou sem
+    faixa), 'out_of_range' (None quando não avaliável) e 'deviation'.
+
+    Args:
+        exams: Exames do laudo (modificados no próprio lugar)
+        sex: Sexo do paciente ('M' ou 'F')
+        age: Idade do paciente
+        results: Resultados como aparecem no laudo, na ordem dos exames
+                 (padrão: 'result' de cada exame). Devem ser os textos
+                 originais: `_normalize_result_value` lê o ponto de milhar
+                 como decimal ("5.900" vira 5.9)
+        unit_factors: Fator que leva cada resultado à unidade da referência
+                      (`UnitConverter.reference_factors`; padrão: sem conversão)
+
+    Returns:
+        Quantidade de exames fora da faixa
+    """
+    if not exams:
+        return 0
+
+    flags = evaluate_reference_ranges(
+        [exam_reference_text(exam) for exam in exams],
+        list(results) if results is not None else [exam.get('result') for exam in exams],
+        [sex] * len(exams),
+        [age] * len(exams),
+        unit_factors
+    )
+    apply_flags(exams, flags)
+    return int(flags["out_of_range"].sum())
+
+def apply_flags(exams: Sequence[Dict[str, Any]], flags: Dict[str, np.ndarray]) -> None:
+    """
+    Grava nos exames as colunas calculadas por `evaluate_reference_ranges`
+
+    Args:
+        exams: Exames, na mesma ordem das colunas (modificados no próprio lugar)
+        flags: Resultado de `evaluate_reference_ranges`
+    """
+    low = flags["low"].astype(object)
+    low[~np.isfinite(flags["low"])] = None
+    high = flags["high"].astype(object)
+    high[~np.isfinite(flags["high"])] = None
+    evaluated = flags["evaluated"]
+    out_of_range = flags["out_of_range"].astype(object)
+    out_of_range[~evaluated] = None
+    deviation = [
+        round(value, 4) if ok else None
+        for value, ok in zip(flags["deviation"].tolist(), evaluated.tolist())
+    ]
+
+    for exam, exam_low, exam_high, exam_flag, exam_deviation in zip(
+            exams, low.tolist(), high.tolist(), out_of_range.tolist(), deviation):
+        exam['reference_low'] = exam_low
+        exam['reference_high'] = exam_high
+        exam['out_of_range'] = exam_flag
+        exam['deviation'] = exam_deviation
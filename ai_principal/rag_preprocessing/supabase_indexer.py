@@ -51,7 +51,7 @@ class SupabaseIndexer:
         for chunk in chunks:
             # Verificar se tem embedding
             if 'embedding' not in chunk or not chunk['embedding']:
-                logger.warning(f"Chunk sem embedding. Pulando...")
+                logger.warning(f"Chunk sem embedding ({chunk.get('embedding_error', 'não gerado')}). Pulando...")
                 continue
             
             try:
@@ -76,6 +76,34 @@ class SupabaseIndexer:
         
         return responses
     
+    def get_out_of_range_chunks(self, patient_name: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Busca os chunks de resultados com exames fora da faixa de referência
+        
+        A sinalização é calculada na ingestão e gravada nos metadados, então a
+        consulta é um filtro de contenção JSONB (coberto por um índice GIN em
+        `metadata`), sem reinterpretar as referências.
+        
+        Args:
+            patient_name: Restringir a um paciente (opcional)
+            limit: Quantidade máxima de chunks
+            
+        Returns:
+            Lista de chunks (content, metadata, chunk_type)
+        """
+        criteria: Dict[str, Any] = {"section": "exam_results", "out_of_range": True}
+        if patient_name:
+            criteria["patient_name"] = patient_name
+        
+        response = (
+            self.client.table(self.vector_collection)
+            .select("content, metadata, chunk_type")
+            .contains("metadata", criteria)
+            .limit(limit)
+            .execute()
+        )
+        return response.data
+    
     def index_from_file(self, file_path: str) -> List[Dict[str, Any]]:
         """
         Indexa chunks a partir de um arquivo JSON
@@ -0,0 +1,59 @@
+"""
+Testes da normalização em colunas
+"""
+
+from .normalizer import ExamNormalizer
+from .batch_normalizer import BatchNormalizer
+from .benchmark_normalizer import build_documents
+
+def _thousands_documents():
+    return [
+        {
+            'metadata': {'filename': 'laudo_a.pdf'},
+            'patient': {'name': 'paciente a', 'gender': 'Masculino', 'age': 40},
+            'exams': [
+                {'name': 'Leucócitos', 'result': '5.900', 'unit': '/mm3', 'reference': '3.600 a 11.000'},
+                {'name': 'Plaquetas', 'result': '250.000', 'unit': '/mm3', 'reference': '150.000 a 450.000'},
+                {'name': 'Glicose', 'result': '5,9', 'unit': 'mmol/l', 'reference': '70 a 99 mg/dL'}
+            ]
+        },
+        {
+            'metadata': {'filename': 'laudo_b.pdf'},
+            'patient': {'name': 'paciente b', 'gender': 'F', 'age': 8},
+            'exams': [
+                {'name': 'Leucócitos', 'result': '12.100', 'unit': '/mm3', 'reference': '3.600 a 11.000'},
+                {'name': 'Plaquetas', 'result': '250.000', 'unit': '/mm3', 'reference': '150.000 a 450.000'},
+                {'name': 'Hemoglobina', 'result': '13,2', 'unit': 'g/dl',
+                 'reference': 'Homens 13,0 a 16,5 Mulheres 12,0 a 15,8'}
+            ]
+        }
+    ]
+
+def test_batch_matches_per_document():
+    """O resultado em colunas é idêntico ao documento a documento"""
+    documents = _thousands_documents() + build_documents(400)
+    normalizer = ExamNormalizer()
+
+    expected = [normalizer.normalize_exam_data(doc) for doc in documents]
+    assert BatchNormalizer(normalizer).normalize_documents(documents) == expected
+
+def test_batch_thousands_results():
+    """Resultados com ponto de milhar são avaliados e convertidos sem perder a escala"""
+    normalized = BatchNormalizer().normalize_documents(_thousands_documents())
+    leukocytes, platelets, _ = normalized[0]['exams']
+
+    assert leukocytes['out_of_range'] is False
+    assert leukocytes['result_canonical'] == 5900.0
+    assert platelets['out_of_range'] is False
+    assert platelets['result_canonical'] == 250000.0
+    assert normalized[1]['exams'][0]['out_of_range'] is True
+
+def test_batch_cache_bounded():
+    """O cache de cada coluna não passa do limite entre lotes"""
+    batch = BatchNormalizer(max_cache_entries=50)
+    for seed in range(3):
+        batch.normalize_documents(build_documents(200, seed=seed))
+        assert all(size <= 50 for size in batch.cache_info().values())
+
+    batch.clear_cache()
+    assert batch.cache_info() == {}
@@ -0,0 +1,38 @@
+"""
+Testes do chunking dos resultados de exames
+"""
+
+from .normalizer import ExamNormalizer
+from .chunking import ExamChunker
+from .benchmark_normalizer import build_documents
+
+SEPARATOR = len(ExamChunker.EXAM_SEPARATOR)
+
+def _document(exams=40):
+    return ExamNormalizer().normalize_exam_data(build_documents(exams, exams)[0])
+
+def _ranges(chunker, document):
+    texts = chunker._format_exams(document['exams']).texts
+    return [len(text) for text in texts], [(start, end) for start, end, _ in chunker._pack(texts)]
+
+def test_grouped_chars_honors_overlap():
+    """Chunks agrupados por caracteres respeitam chunk_size e chunk_overlap"""
+    chunker = ExamChunker(chunk_size=400, chunk_overlap=150)
+    lengths, ranges = _ranges(chunker, _document())
+
+    assert len(ranges) > 2
+    for (_, previous_end), (start, end) in zip(ranges, ranges[1:]):
+        assert start < previous_end
+        overlap = lengths[start:previous_end]
+        assert sum(overlap) + SEPARATOR * (len(overlap) - 1) <= 150
+        assert sum(lengths[start:end]) + SEPARATOR * (end - start - 1) <= 400
+
+    chunks = [c for c in chunker.chunk_exam_data(_document()) if c['chunk_type'] == 'exam_results']
+    assert all(len(c['text']) <= 400 and not c['text'].startswith("\n") for c in chunks)
+
+def test_grouped_chars_without_overlap():
+    """Com chunk_overlap=0 cada exame aparece em um único chunk"""
+    lengths, ranges = _ranges(ExamChunker(chunk_size=400, chunk_overlap=0), _document())
+
+    assert [start for start, _ in ranges[1:]] == [end for _, end in ranges[:-1]]
+    assert ranges[-1][1] == len(lengths)
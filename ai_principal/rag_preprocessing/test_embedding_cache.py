@@ -0,0 +1,74 @@
+"""
+Testes do cache persistente de embeddings
+"""
+
+from . import embedding_cache
+from .embedding_cache import EmbeddingCache
+from .embeddings import EmbeddingGenerator
+from .fake_embeddings import FakeEmbeddingClient
+
+def _clock(monkeypatch, start=1_000_000.0):
+    """Relógio controlado pelo teste para `time.time` do cache"""
+    now = [start]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    return now
+
+def test_reprocessing_uses_cache(tmp_path):
+    """Um segundo processamento dos mesmos chunks não faz requisições"""
+    chunks = [{'text': f"Exame: Sintético {i}\nResultado: {i} mg/dL"} for i in range(30)]
+
+    first_cache = EmbeddingCache(str(tmp_path))
+    first = EmbeddingGenerator("text-embedding-3-small", client=FakeEmbeddingClient(dimensions=8),
+                               cache=first_cache, max_batch_items=8)
+    expected = [chunk['embedding'] for chunk in first.generate_embeddings([c.copy() for c in chunks])]
+    first_cache.close()
+    assert first.requests == 4
+
+    cache = EmbeddingCache(str(tmp_path))
+    second = EmbeddingGenerator("text-embedding-3-small", client=FakeEmbeddingClient(dimensions=8),
+                                cache=cache, max_batch_items=8)
+    result = second.generate_embeddings([c.copy() for c in chunks])
+
+    assert second.requests == 0
+    assert cache.stats()["hits"] == 30
+    assert all(abs(a - b) < 1e-6 for chunk, vector in zip(result, expected)
+               for a, b in zip(chunk['embedding'], vector))
+
+    # Outro modelo não reaproveita os vetores
+    other = EmbeddingGenerator("text-embedding-3-large", client=FakeEmbeddingClient(dimensions=8),
+                               cache=cache, max_batch_items=8)
+    other.generate_embeddings([c.copy() for c in chunks])
+    assert other.requests == 4
+    cache.close()
+
+def test_evict_by_age(tmp_path, monkeypatch):
+    """Entradas sem acesso há mais de `max_age_days` expiram; as acessadas recentemente ficam"""
+    now = _clock(monkeypatch)
+    cache = EmbeddingCache(str(tmp_path), max_age_days=1)
+    cache.put_many("m", ["velho", "consultado"], [[1.0, 2.0], [3.0, 4.0]])
+
+    now[0] += 0.5 * 86400
+    assert cache.get_many("m", ["consultado"])[0] == [3.0, 4.0]
+
+    now[0] += 0.75 * 86400
+    assert cache.evict() == 1
+    assert cache.get_many("m", ["velho", "consultado"]) == [None, [3.0, 4.0]]
+    cache.close()
+
+def test_evict_by_size(tmp_path, monkeypatch):
+    """Acima do limite de tamanho, saem primeiro as entradas acessadas há mais tempo"""
+    now = _clock(monkeypatch)
+    # Vetores de 4 floats (16 bytes): cabem três no limite de 50 bytes
+    cache = EmbeddingCache(str(tmp_path), max_bytes=50)
+    for i, text in enumerate(["a", "b", "c"]):
+        now[0] += 1
+        cache.put_many("m", [text], [[float(i)] * 4])
+
+    now[0] += 1
+    cache.get_many("m", ["a"])
+    now[0] += 1
+    cache.put_many("m", ["d"], [[3.0] * 4])
+
+    assert cache.stats()["evictions"] == 1
+    assert [vector is not None for vector in cache.get_many("m", ["a", "b", "c", "d"])] == [True, False, True, True]
+    cache.close()
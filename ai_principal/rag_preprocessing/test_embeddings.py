@@ -0,0 +1,71 @@
+"""
+Testes do envio de embeddings em lotes com o cliente falso
+"""
+
+from .embeddings import EmbeddingGenerator
+from .fake_embeddings import FakeEmbeddingClient
+
+def _generator(client, **kwargs):
+    options = dict(max_batch_items=8, max_concurrency=4, max_retries=3, backoff_base=0.0)
+    options.update(kwargs)
+    return EmbeddingGenerator("text-embedding-3-small", client=client, **options)
+
+def _chunks(count):
+    return [{'text': f"Exame: Sintético {i}\nResultado: {i} mg/dL"} for i in range(count)]
+
+def test_order_with_shuffled_responses():
+    """Os embeddings seguem a ordem dos chunks, com respostas fora de ordem e lotes concorrentes"""
+    client = FakeEmbeddingClient(dimensions=8, latency=0.005, shuffle=True, max_items=8)
+    chunks = _chunks(50) + [{'text': "Exame: Sintético 3\nResultado: 3 mg/dL"}]
+    result = _generator(client).generate_embeddings(chunks)
+
+    assert [chunk['embedding'] for chunk in result] == [client.embed(chunk['text']) for chunk in chunks]
+    assert not any('embedding_error' in chunk for chunk in result)
+    assert sum(client.calls) == 50
+    assert max(client.calls) <= 8
+    assert client.max_active > 1
+
+def test_transient_errors_are_retried():
+    """Erros transitórios são repetidos até o lote ser aceito"""
+    client = FakeEmbeddingClient(dimensions=8, transient_failures=2)
+    generator = _generator(client, max_concurrency=1)
+    result = generator.generate_embeddings(_chunks(20))
+
+    assert all(chunk['embedding'] for chunk in result)
+    assert generator.requests == 3 + 2
+
+def test_exhausted_retries_fail_the_batch():
+    """Esgotadas as tentativas, o lote inteiro fica sem embedding, sem ser dividido"""
+    client = FakeEmbeddingClient(dimensions=8, transient_failures=10)
+    generator = _generator(client, max_retries=2)
+    result = generator.generate_embeddings(_chunks(4))
+
+    assert generator.requests == 3
+    assert all(chunk['embedding'] == [] and chunk['embedding_error'] for chunk in result)
+
+def test_invalid_text_only_fails_itself():
+    """Um lote recusado é dividido até isolar o texto inválido, sem novas tentativas do mesmo lote"""
+    client = FakeEmbeddingClient(dimensions=8, fail_texts=("#falha",), shuffle=True)
+    chunks = _chunks(20)
+    chunks[11]['text'] += " #falha"
+    generator = _generator(client)
+    result = generator.generate_embeddings(chunks)
+
+    failed = [i for i, chunk in enumerate(result) if 'embedding_error' in chunk]
+    assert failed == [11]
+    assert result[11]['embedding'] == []
+    for i, chunk in enumerate(result):
+        if i != 11:
+            assert chunk['embedding'] == client.embed(chunk['text'])
+    # Lote de 8 recusado: 8 -> 4 + 4 -> 2 + 2 -> 1 + 1, além dos dois lotes aceitos
+    assert generator.requests == 2 + 1 + 2 + 2 + 2
+
+def test_single_invalid_text_is_not_retried():
+    """Um texto recusado sozinho falha na primeira requisição"""
+    client = FakeEmbeddingClient(dimensions=8, fail_texts=("#falha",))
+    generator = _generator(client)
+    result = generator.generate_embeddings([{'text': "texto #falha"}])
+
+    assert generator.requests == 1
+    assert result[0]['embedding'] == []
+    assert result[0]['embedding_error'] == "Lote inválido simulado"
@@ -0,0 +1,96 @@
+"""
+Testes da sinalização de resultados fora da faixa de referência
+"""
+
+from .normalizer import ExamNormalizer
+from .batch_normalizer import BatchNormalizer
+from .reference_ranges import annotate_exams, parse_results
+
+def _document(exams):
+    return {'patient': {'name': 'Paciente Teste', 'gender': 'M', 'age': 40}, 'exams': exams}
+
+def test_parse_results_thousands():
+    """Resultados com ponto de milhar e vírgula decimal"""
+    values = parse_results(["5.900", "250.000", "1.500,5", "0,54", "13,2", "Não reagente"])
+    assert values[:5].tolist() == [5900.0, 250000.0, 1500.5, 0.54, 13.2]
+    assert values[5] != values[5]
+
+def test_thousands_results_within_range():
+    """Leucócitos e plaquetas no formato brasileiro não são sinalizados"""
+    normalized = ExamNormalizer().normalize_exam_data(_document([
+        {'name': 'Leucócitos', 'result': '5.900', 'reference': '3.600 a 11.000'},
+        {'name': 'Plaquetas', 'result': '250.000', 'reference': '150.000 a 450.000'},
+        {'name': 'Hemácias', 'result': '4.500.000', 'reference': '4.300.000 a 5.700.000'}
+    ]))
+
+    for exam in normalized['exams']:
+        assert exam['out_of_range'] is False, exam
+        assert exam['deviation'] == 0.0, exam
+
+def test_thousands_results_out_of_range():
+    """Resultados com ponto de milhar fora da faixa têm o desvio relativo ao limite"""
+    leukocytes, platelets = ExamNormalizer().normalize_exam_data(_document([
+        {'name': 'Leucócitos', 'result': '12.100', 'reference': '3.600 a 11.000'},
+        {'name': 'Plaquetas', 'result': '120.000', 'reference': '150.000 a 450.000'}
+    ]))['exams']
+
+    assert leukocytes['out_of_range'] is True
+    assert leukocytes['deviation'] == 0.1
+    assert platelets['out_of_range'] is True
+    assert platelets['deviation'] == -0.2
+
+def test_decimal_results_unchanged():
+    """Resultados decimais continuam avaliados como antes"""
+    creatinine, glucose = ExamNormalizer().normalize_exam_data(_document([
+        {'name': 'Creatinina', 'result': '1,30', 'unit': 'mg/dl', 'reference': '0,70 a 1,30'},
+        {'name': 'Glicose', 'result': '120', 'unit': 'mg/dl', 'reference': '70 a 99'}
+    ]))['exams']
+
+    assert creatinine['out_of_range'] is False
+    assert glucose['out_of_range'] is True
+    assert glucose['result_canonical'] == 120.0
+
+def test_annotate_exams_raw_results():
+    """`annotate_exams` avalia os resultados originais quando informados"""
+    exams = [{'name': 'Leucócitos', 'result': 5.9, 'reference': '3.600 a 11.000'}]
+    assert annotate_exams(exams, 'M', 40, results=["5.900"]) == 0
+    assert exams[0]['out_of_range'] is False
+
+def test_result_unit_differs_from_reference():
+    """Resultados em outra unidade são convertidos para a unidade da referência antes da comparação"""
+    within, above, hemoglobin = ExamNormalizer().normalize_exam_data(_document([
+        {'name': 'Glicose', 'result': '5,0', 'unit': 'mmol/L', 'reference': '70 a 99 mg/dL'},
+        {'name': 'Glicose', 'result': '5,9', 'unit': 'mmol/L', 'reference': '70 a 99 mg/dL'},
+        {'name': 'Hemoglobina', 'result': '150', 'unit': 'g/L', 'reference': '13,5 a 17,5 g/dL'}
+    ]))['exams']
+
+    assert within['out_of_range'] is False
+    assert above['out_of_range'] is True
+    assert above['deviation'] > 0
+    assert hemoglobin['out_of_range'] is False
+    assert above['reference_low'] == 70.0
+
+def test_incompatible_units_not_evaluated():
+    """Sem conversão entre as unidades do resultado e da referência, o resultado não é avaliado"""
+    sodium, glucose = ExamNormalizer().normalize_exam_data(_document([
+        {'name': 'Sódio', 'result': '320', 'unit': 'mg/dL', 'reference': '135 a 145 mEq/L'},
+        {'name': 'Glicose', 'result': '95', 'unit': 'mg/dL', 'reference': '70 a 99 mg'}
+    ]))['exams']
+
+    assert sodium['out_of_range'] is None
+    assert sodium['deviation'] is None
+    assert glucose['out_of_range'] is False
+
+def test_batch_normalizer_converts_reference_units():
+    """O normalizador em lote aplica a mesma conversão para a unidade da referência"""
+    exams = [
+        {'name': 'Glicose', 'result': '5,0', 'unit': 'mmol/L', 'reference': '70 a 99 mg/dL'},
+        {'name': 'Glicose', 'result': '5,9', 'unit': 'mmol/L', 'reference': '70 a 99 mg/dL'},
+        {'name': 'Sódio', 'result': '320', 'unit': 'mg/dL', 'reference': '135 a 145 mEq/L'}
+    ]
+    batch, = BatchNormalizer().normalize_documents([_document([exam.copy() for exam in exams])])
+    single = ExamNormalizer().normalize_exam_data(_document(exams))
+
+    assert [exam['out_of_range'] for exam in batch['exams']] == [False, True, None]
+    for batch_exam, exam in zip(batch['exams'], single['exams']):
+        assert batch_exam['deviation'] == exam['deviation']
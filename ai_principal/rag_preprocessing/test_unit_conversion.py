@@ -0,0 +1,51 @@
+"""
+Testes da conversão de resultados para a unidade canônica do analito
+"""
+
+import numpy as np
+import pytest
+from .unit_conversion import UnitConverter, unit_key
+from .normalizer import ExamNormalizer
+
+def _convert(analyte, value, unit):
+    converted, units = UnitConverter().convert([analyte], np.array([value]), [unit])
+    return converted[0], units[0]
+
+@pytest.mark.parametrize("analyte, value, unit, expected, canonical", [
+    ("Creatinina", 97, "µmol/L", 1.097, "mg/dL"),
+    ("Glicose", 5.5, "mmol/L", 99.09, "mg/dL"),
+    ("Hemoglobina", 150, "g/L", 15.0, "g/dL"),
+])
+def test_known_conversions(analyte, value, unit, expected, canonical):
+    """Fatores específicos do analito e conversões de massa por volume"""
+    converted, converted_unit = _convert(analyte, value, unit)
+    assert converted == pytest.approx(expected, abs=0.005)
+    assert converted_unit == canonical
+
+def test_micro_sign_spellings():
+    """O sinal de micro (µ, U+00B5) e a letra grega (μ, U+03BC) são a mesma unidade"""
+    assert unit_key("µmol/L") == unit_key("μmol/L")
+    assert _convert("Creatinina", 97, "µmol/L") == _convert("Creatinina", 97, "μmol/L")
+    assert _convert("Creatinina", 97, " µMOL/L ")[1] == "mg/dL"
+
+def test_unknown_units_pass_through():
+    """Unidades e analitos sem conversão mantêm o valor e a unidade originais"""
+    assert _convert("Glicose", 95, "mg/dL") == (95.0, "mg/dL")
+    assert _convert("Glicose", 95, "furlong") == (95.0, "furlong")
+    assert _convert("Exame Desconhecido", 3.2, "mmol/L") == (3.2, "mmol/L")
+    assert _convert("Glicose", 95, None) == (95.0, None)
+
+    converted, units = UnitConverter().convert(["Glicose"], np.array([np.nan]), ["mmol/L"])
+    assert np.isnan(converted[0]) and units == [None]
+
+def test_normalizer_adds_canonical_columns():
+    """O normalizador anexa o resultado na unidade canônica a cada exame"""
+    glucose, creatinine = ExamNormalizer().normalize_exam_data({'exams': [
+        {'name': 'Glicose', 'result': '5,5', 'unit': 'mmol/L'},
+        {'name': 'Creatinina', 'result': '97', 'unit': 'µmol/L'}
+    ]})['exams']
+
+    assert glucose['result_canonical'] == pytest.approx(99.088, abs=0.001)
+    assert glucose['unit_canonical'] == 'mg/dL'
+    assert creatinine['result_canonical'] == pytest.approx(1.097, abs=0.001)
+    assert creatinine['unit_canonical'] == 'mg/dL'
@@ -0,0 +1,90 @@
+"""
+Contagem de tokens para chunking e estimativa de custo de embeddings
+Usa o tokenizador do modelo de embedding (tiktoken) e, se a codificação não
+puder ser carregada, uma aproximação
+"""
+
+import re
+import logging
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Codificação usada quando o modelo não é reconhecido pelo tiktoken
+DEFAULT_ENCODING = "cl100k_base"
+
+# Aproximação: palavras com até 4 caracteres por token, números em grupos de
+# até 3 dígitos, cada sinal de pontuação e cada sequência de quebras de linha
+_APPROXIMATE_TOKEN = re.compile(r"[^\W\d_]{1,4}|\d{1,3}|\n+|[^\w\s]")
+
+@lru_cache(maxsize=None)
+def _load_encoding(model: Optional[str]):
+    """
+    Codificação do tiktoken de um modelo, carregada uma vez por processo
+
+    Returns:
+        Codificação ou None se não puder ser carregada (ex.: sem acesso à rede
+        para baixar o arquivo da codificação)
+    """
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        logger.warning(f"Tokenizador do tiktoken indisponível ({type(e).__name__}); usando contagem aproximada de tokens")
+        return None
+
+class TokenCounter:
+    """
+    Contador de tokens do modelo de embedding
+
+    Os textos de um lote são codificados de uma vez (`encode_ordinary_batch`).
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        """
+        Carrega a codificação do modelo
+
+        Args:
+            model: Nome do modelo de embedding (padrão: codificação cl100k_base)
+        """
+        self.model = model
+        self.encoding = _load_encoding(model)
+
+    @property
+    def exact(self) -> bool:
+        """Se a contagem usa o tokenizador do modelo"""
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        """
+        Quantidade de tokens de um texto
+
+        Args:
+            text: Texto
+
+        Returns:
+            Quantidade de tokens
+        """
+        if self.encoding is not None:
+            return len(self.encoding.encode_ordinary(text))
+        return len(_APPROXIMATE_TOKEN.findall(text))
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        """
+        Quantidade de tokens de cada texto de um lote
+
+        Args:
+            texts: Textos
+
+        Returns:
+            Quantidade de tokens de cada texto
+        """
+        if self.encoding is not None:
+            return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(list(texts))]
+        return [len(_APPROXIMATE_TOKEN.findall(text)) for text in texts]
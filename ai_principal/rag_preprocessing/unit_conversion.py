@@ -0,0 +1,239 @@
+"""
+Conversão de unidades de resultados de exames
+Converte resultados para uma unidade canônica por analito (ex.: glicose em
+mmol/L para mg/dL), para que valores de laboratórios diferentes possam ser
+comparados e agregados
+"""
+
+import re
+import math
+import logging
+import numpy as np
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+from .reference_ranges import parse_results
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Unidade canônica de cada analito (nome canônico do ExamNormalizer) e fatores
+# específicos do analito: unidade de origem -> fator (canônico = valor × fator)
+DEFAULT_ANALYTE_UNITS: Dict[str, Tuple[str, Dict[str, float]]] = {
+    "Glicose": ("mg/dL", {"mmol/L": 18.016}),
+    "Colesterol Total": ("mg/dL", {"mmol/L": 38.67}),
+    "HDL-Colesterol": ("mg/dL", {"mmol/L": 38.67}),
+    "LDL-Colesterol": ("mg/dL", {"mmol/L": 38.67}),
+    "Triglicerídeos": ("mg/dL", {"mmol/L": 88.57}),
+    "Creatinina": ("mg/dL", {"μmol/L": 1 / 88.42}),
+    "Ureia": ("mg/dL", {"mmol/L": 6.006}),
+    "Ácido Úrico": ("mg/dL", {"μmol/L": 1 / 59.48, "mmol/L": 1000 / 59.48}),
+    "Cálcio": ("mg/dL", {"mmol/L": 4.008, "mEq/L": 2.004}),
+    "Magnésio": ("mg/dL", {"mmol/L": 2.431, "mEq/L": 1.2155}),
+    "Sódio": ("mEq/L", {"mmol/L": 1.0}),
+    "Potássio": ("mEq/L", {"mmol/L": 1.0}),
+    "Hemoglobina": ("g/dL", {"mmol/L": 1.611}),
+    "Ferritina": ("ng/mL", {"μg/L": 1.0}),
+    "Ferro Sérico": ("μg/dL", {"μmol/L": 5.585}),
+    "Vitamina D": ("ng/mL", {"nmol/L": 1 / 2.496}),
+    "Vitamina B12": ("pg/mL", {"pmol/L": 1.355})
+}
+
+# Conversões de massa ou quantidade por volume, válidas para qualquer analito
+GENERIC_FACTORS: Dict[Tuple[str, str], float] = {
+    ("g/L", "g/dL"): 0.1,
+    ("g/dL", "g/L"): 10.0,
+    ("mg/L", "mg/dL"): 0.1,
+    ("mg/dL", "mg/L"): 10.0,
+    ("g/dL", "mg/dL"): 1000.0,
+    ("mg/dL", "g/dL"): 0.001,
+    ("μg/L", "μg/dL"): 0.1,
+    ("μg/dL", "μg/L"): 10.0,
+    ("ng/mL", "μg/L"): 1.0,
+    ("μg/L", "ng/mL"): 1.0,
+    ("pg/mL", "ng/L"): 1.0,
+    ("ng/L", "pg/mL"): 1.0
+}
+
+# Palavra logo após um número na referência ("70 a 99 mg/dL"), candidata a unidade
+_REFERENCE_UNIT_PATTERN = re.compile(r"\d\s*([^\s\d,;()]+)")
+
+def unit_key(unit: Optional[str]) -> str:
+    """
+    Chave de comparação de uma unidade: sem espaços nas bordas e com
+    `casefold`, que também unifica o sinal de micro (µ) e a letra grega (μ)
+
+    Args:
+        unit: Unidade de medida
+
+    Returns:
+        Chave da unidade
+    """
+    return unit.strip().casefold() if unit else ""
+
+class UnitConverter:
+    """
+    Conversor de resultados para a unidade canônica do analito
+
+    A tabela de fatores é compilada uma vez em um dicionário indexado por
+    (analito, chave da unidade). Uma conversão em lote consulta o fator de
+    cada par distinto uma única vez e multiplica todos os resultados de uma
+    vez com NumPy.
+    """
+
+    def __init__(self, analyte_units: Optional[Dict[str, Tuple[str, Dict[str, float]]]] = None):
+        """
+        Compila a tabela de conversões
+
+        Args:
+            analyte_units: Analito -> (unidade canônica, {unidade de origem: fator})
+                           (padrão: DEFAULT_ANALYTE_UNITS)
+        """
+        analyte_units = analyte_units if analyte_units is not None else DEFAULT_ANALYTE_UNITS
+        self._factors: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._generic_factors = {
+            (unit_key(source), unit_key(target)): factor for (source, target), factor in GENERIC_FACTORS.items()
+        }
+        self._known_units = {unit for pair in self._generic_factors for unit in pair}
+
+        for analyte, (canonical_unit, factors) in analyte_units.items():
+            self._factors[(analyte, unit_key(canonical_unit))] = (1.0, canonical_unit)
+            for (source, target), factor in GENERIC_FACTORS.items():
+                if unit_key(target) == unit_key(canonical_unit):
+                    self._factors[(analyte, unit_key(source))] = (factor, canonical_unit)
+            for source, factor in factors.items():
+                self._factors[(analyte, unit_key(source))] = (factor, canonical_unit)
+        self._known_units.update(unit for _, unit in self._factors)
+
+    def factor(self, analyte: Optional[str], unit: Optional[str]) -> Optional[Tuple[float, str]]:
+        """
+        Fator de conversão de uma unidade para a unidade canônica do analito
+
+        Args:
+            analyte: Nome canônico do exame
+            unit: Unidade do resultado
+
+        Returns:
+            Tupla (fator, unidade canônica) ou None se não houver conversão
+        """
+        return self._factors.get((analyte, unit_key(unit)))
+
+    def reference_unit(self, exam: Dict[str, Any]) -> Optional[str]:
+        """
+        Unidade da faixa de referência de um exame
+
+        A primeira unidade conhecida após um número no texto de referência do
+        laudo ("70 a 99 mg/dL") ou, sem referência no laudo, a unidade da
+        planilha (`reference_data`). Textos truncados ("70 a 99 mg") não
+        indicam unidade.
+
+        Args:
+            exam: Dicionário com dados do exame
+
+        Returns:
+            Unidade ou None se não houver unidade reconhecida
+        """
+        if exam.get('reference'):
+            candidates = (match.group(1).rstrip(".:") for match in
+                          _REFERENCE_UNIT_PATTERN.finditer(str(exam['reference'])))
+        else:
+            references = (exam.get('reference_data') or {}).get('references') or []
+            candidates = (ref.get('unit') for ref in references)
+
+        for unit in candidates:
+            if unit_key(unit) in self._known_units:
+                return unit
+        return None
+
+    def reference_factors(self, analytes: Sequence[Optional[str]],
+                          units: Sequence[Optional[str]],
+                          exams: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """
+        Fatores que levam cada resultado à unidade da sua faixa de referência
+
+        1 quando as unidades coincidem ou uma delas não é reconhecida; NaN
+        quando as duas são reconhecidas, diferem e não há conversão entre
+        elas (o resultado não pode ser comparado com a faixa).
+
+        Args:
+            analytes: Nome canônico de cada exame
+            units: Unidade de cada resultado
+            exams: Exames, com a referência do laudo ou da planilha
+
+        Returns:
+            Vetor float64 de fatores
+        """
+        pairs = [(analyte, unit_key(unit), unit_key(self.reference_unit(exam)))
+                 for analyte, unit, exam in zip(analytes, units, exams)]
+        factors: Dict[Tuple[Optional[str], str, str], float] = {}
+        for analyte, unit, reference_unit in pairs:
+            if (analyte, unit, reference_unit) in factors:
+                continue
+            factor = 1.0
+            if (unit != reference_unit and unit in self._known_units
+                    and reference_unit in self._known_units):
+                source = self._factors.get((analyte, unit))
+                target = self._factors.get((analyte, reference_unit))
+                if source and target and source[1] == target[1]:
+                    factor = source[0] / target[0]
+                else:
+                    factor = self._generic_factors.get((unit, reference_unit), math.nan)
+            factors[(analyte, unit, reference_unit)] = factor
+
+        return np.array([factors[pair] for pair in pairs], dtype=np.float64)
+
+    def convert(self, analytes: Sequence[Optional[str]],
+                values: np.ndarray,
+                units: Sequence[Optional[str]]) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """
+        Converte um lote de resultados
+
+        Resultados sem conversão conhecida mantêm o valor e a unidade
+        originais; resultados não numéricos (NaN) ficam sem unidade canônica.
+
+        Args:
+            analytes: Nome canônico de cada exame
+            values: Resultados numéricos (NaN quando não numéricos)
+            units: Unidade de cada resultado
+
+        Returns:
+            Tupla (valores canônicos, unidades canônicas)
+        """
+        positions: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        codes = np.array([positions.setdefault(pair, len(positions)) for pair in zip(analytes, units)],
+                         dtype=np.int64)
+
+        factors = np.ones(len(positions))
+        canonical_units = np.empty(len(positions), dtype=object)
+        for i, (analyte, unit) in enumerate(positions):
+            conversion = self.factor(analyte, unit)
+            if conversion is None:
+                canonical_units[i] = unit
+            else:
+                factors[i], canonical_units[i] = conversion
+
+        converted = values * factors[codes] if len(codes) else np.empty(0)
+        row_units = canonical_units[codes] if len(codes) else np.empty(0, dtype=object)
+        row_units[np.isnan(converted)] = None
+        return converted, row_units.tolist()
+
+    def convert_exams(self, exams: Sequence[Dict[str, Any]],
+                      values: Optional[np.ndarray] = None) -> None:
+        """
+        Adiciona 'result_canonical' e 'unit_canonical' a exames normalizados
+
+        Args:
+            exams: Exames normalizados (modificados no próprio lugar)
+            values: Resultados já convertidos em números (opcional; padrão:
+                    interpretados a partir de 'result')
+        """
+        if not exams:
+            return
+        if values is None:
+            values = parse_results([exam.get('result') for exam in exams])
+
+        converted, units = self.convert(
+            [exam.get('name') for exam in exams], values, [exam.get('unit') for exam in exams]
+        )
+        for exam, value, unit in zip(exams, converted.tolist(), units):
+            exam['result_canonical'] = None if math.isnan(value) else round(value, 4)
+            exam['unit_canonical'] = unit